@@ -11,9 +11,8 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 from app import app
-from models import TeamMember
+from models import TeamMember, User, phone_to_e164
 from database import db
-import re
 
 def validate_phone(phone):
     """
@@ -21,22 +20,12 @@ def validate_phone(phone):
     Accepts formats like: +15551234567, 5551234567, (555) 123-4567, etc.
     Returns normalized format: +15551234567
     """
-    # Remove all non-digit characters except +
-    cleaned = re.sub(r'[^\d+]', '', phone)
+    # Same normalization as SMSRecipient.normalize_phone / users.phone_e164
+    return phone_to_e164(phone)
 
-    # Remove leading 1 if present (but not +1)
-    if cleaned.startswith('1') and not cleaned.startswith('+'):
-        cleaned = cleaned[1:]
-
-    # If it doesn't start with +, add +1
-    if not cleaned.startswith('+'):
-        cleaned = '+1' + cleaned
-
-    # Validate length (should be +1 followed by 10 digits)
-    if len(cleaned) != 12 or not cleaned[1:].isdigit():
-        return None
-
-    return cleaned
+def phone_owner(phone, member):
+    """Return another user already using this normalized phone number, if any"""
+    return User.query.filter(User.phone_e164 == phone, User.id != member.id).first()
 
 def display_employees():
     """Display numbered list of employees"""
@@ -141,6 +130,11 @@ def add_phone_interactive():
                 else:
                     continue
 
+            owner = phone_owner(normalized_phone, selected)
+            if owner:
+                print(f"\n[ERROR] {normalized_phone} is already assigned to {owner.name}")
+                continue
+
             # Confirm update
             print(f"\n[OK] Normalized to: {normalized_phone}")
             confirm = input(f"   Update {selected.name} to {normalized_phone}? (y/n): ").strip().lower()
@@ -200,9 +194,15 @@ def bulk_add_phones():
     with app.app_context():
         for name, phone in phone_data.items():
             member = TeamMember.query.filter_by(name=name).first()
-            if member:
-                member.phone = phone
-                print(f'[OK] Updated {name}: {phone}')
+            normalized = validate_phone(phone)
+            if member and not normalized:
+                print(f'[--] Invalid phone for {name}: {phone}')
+            elif member and phone_owner(normalized, member):
+                print(f'[--] {normalized} already assigned, skipping {name}')
+            elif member:
+                member.phone = normalized
+                db.session.flush()
+                print(f'[OK] Updated {name}: {normalized}')
             else:
                 print(f'[--] Employee not found: {name}')
 
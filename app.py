@@ -1,9 +1,17 @@
+import startup_profiler
+startup_profiler.install()
+
 import os
 import logging
 from flask import Flask, send_from_directory
 from werkzeug.middleware.proxy_fix import ProxyFix
 from database import db
 from models import User, TeamMember, PTORequest, Manager, Position, CallOutRecord, SMSRecipient
+import data_versions
+import usage_rollups
+import migrations
+from json_provider import init_json_provider
+from compression import init_compression
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -27,10 +35,19 @@ app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
     "pool_pre_ping": True,
 }
+# Raise on lazy loads of request-list relationships (see query_helpers.py)
+app.config["STRICT_LOADING"] = os.environ.get("STRICT_LOADING", "").lower() in ("1", "true", "yes")
+
+# Compress JSON/HTML responses larger than this many bytes (0 turns compression off)
+app.config["COMPRESS_MIN_SIZE"] = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
 
 # Initialize the app with the extension
 db.init_app(app)
 
+# orjson-backed jsonify/tojson when installed, and gzip/brotli responses
+init_json_provider(app)
+init_compression(app)
+
 def run_migrations():
     """Add new columns to existing tables if they don't exist"""
     from sqlalchemy import text, inspect
@@ -42,13 +59,12 @@ def run_migrations():
         ('users', 'starting_sick_hours', 'NUMERIC(5,2)', '60.0'),
         ('users', 'pto_blocked', 'BOOLEAN', 'FALSE'),
         ('pto_requests', 'callout_classification', 'VARCHAR(10)', None),
+        ('pto_requests', 'business_days', 'INTEGER', None),
+        ('pto_requests', 'total_hours', 'NUMERIC(6,2)', None),
+        ('users', 'phone_e164', 'VARCHAR(16)', None),
     ]
 
-    try:
-        inspector = inspect(db.engine)
-    except Exception as e:
-        print(f'Could not inspect database: {e}')
-        return
+    inspector = inspect(db.engine)
 
     # Cache column lookups per table
     columns_by_table = {}
@@ -67,29 +83,128 @@ def run_migrations():
 
         default_clause = f' DEFAULT {default}' if default is not None else ''
         sql = f'ALTER TABLE {table} ADD COLUMN {column} {col_type}{default_clause}'
+        db.session.execute(text(sql))
+        db.session.commit()
+        print(f'Added column {column} to {table}')
+        # Invalidate cache for this table so later migrations see the new column
+        columns_by_table.pop(table, None)
+
+    # List of indexes: (name, table, columns, unique)
+    indexes = [
+        ('ix_pto_requests_team_status_dates', 'pto_requests', 'manager_team, status, start_date, end_date', False),
+        ('ix_pto_requests_member_created', 'pto_requests', 'member_id, created_at', False),
+        ('ix_pto_requests_status_end', 'pto_requests', 'status, end_date', False),
+        ('ix_pto_requests_status_updated', 'pto_requests', 'status, updated_at, id', False),
+        ('ix_call_out_records_pto_request', 'call_out_records', 'pto_request_id', False),
+        ('ix_call_out_records_member', 'call_out_records', 'member_id', False),
+        ('ix_tardiness_records_member_date', 'tardiness_records', 'member_id, "date"', False),
+        ('ix_users_phone_e164', 'users', 'phone_e164', True),
+    ]
+
+    for name, table, columns, unique in indexes:
+        unique_clause = 'UNIQUE ' if unique else ''
+        db.session.execute(text(f'CREATE {unique_clause}INDEX IF NOT EXISTS {name} ON {table} ({columns})'))
+        db.session.commit()
+
+
+LEGACY_DATE_FORMATS = ('%m/%d/%Y', '%Y/%m/%d', '%m-%d-%Y')
+
+def coerce_legacy_date(value):
+    """ISO date for a legacy date string (ISO date or datetime, or one of
+    LEGACY_DATE_FORMATS); None if it can't be read as a date."""
+    from datetime import datetime
+
+    value = str(value or '').strip()
+    try:
+        return datetime.fromisoformat(value).date().isoformat()
+    except ValueError:
+        pass
+    for fmt in LEGACY_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return None
+
+def migrate_date_columns():
+    """Convert legacy VARCHAR date columns to native DATE columns.
+
+    Values in another readable format are rewritten as YYYY-MM-DD first. If
+    any value still isn't a date, the step raises and leaves the schema
+    untouched (the migration stays pending), since the models read these
+    columns as Date: fix or remove the listed rows and restart.
+    """
+    from sqlalchemy import text, inspect
+
+    date_columns = [
+        ('pto_requests', 'start_date'),
+        ('pto_requests', 'end_date'),
+        ('tardiness_records', 'date'),
+    ]
+
+    inspector = inspect(db.engine)
+    is_postgres = db.engine.dialect.name == 'postgresql'
+
+    for table, column in date_columns:
         try:
-            db.session.execute(text(sql))
+            col_info = {c['name']: c for c in inspector.get_columns(table)}.get(column)
+        except Exception:
+            col_info = None
+        if col_info is None:
+            continue
+        if is_postgres and str(col_info['type']).upper() == 'DATE':
+            continue
+
+        quoted = f'"{column}"'
+        if is_postgres:
+            not_iso = f"{quoted} IS NULL OR {quoted} !~ '^[0-9]{{4}}-[0-9]{{2}}-[0-9]{{2}}$'"
+        else:
+            # SQLite stores dates as ISO text; anything else breaks range comparisons
+            not_iso = f'date({quoted}) IS NULL OR {quoted} != date({quoted})'
+
+        try:
+            unreadable = []
+            fixed = 0
+            for row_id, value in db.session.execute(text(
+                f'SELECT id, {quoted} FROM {table} WHERE {not_iso}'
+            )).fetchall():
+                iso = coerce_legacy_date(value)
+                if iso is None:
+                    unreadable.append((row_id, value))
+                    continue
+                db.session.execute(
+                    text(f'UPDATE {table} SET {quoted} = :value WHERE id = :id'),
+                    {'value': iso, 'id': row_id},
+                )
+                fixed += 1
+
+            if unreadable:
+                raise RuntimeError(
+                    f'{table}.{column} has {len(unreadable)} value(s) that are not dates, '
+                    f'e.g. {unreadable[:5]}. Fix or delete these rows and restart to finish '
+                    f'the DATE migration.'
+                )
+            if fixed:
+                print(f'Normalized {fixed} value(s) in {table}.{column}')
+
+            if is_postgres:
+                db.session.execute(text(
+                    f'ALTER TABLE {table} ALTER COLUMN {quoted} TYPE DATE USING {quoted}::date'
+                ))
+                print(f'Converted {table}.{column} to DATE')
             db.session.commit()
-            print(f'Added column {column} to {table}')
-            # Invalidate cache for this table so later migrations see the new column
-            columns_by_table.pop(table, None)
-        except Exception as e:
+        except Exception:
             db.session.rollback()
-            print(f'Could not add column {column} to {table}: {e}')
-
+            raise
 
 def backfill_callout_classifications():
     """Classify any existing call-outs that don't have a classification yet."""
     from call_out_classifier import classify_call_out
 
-    try:
-        unclassified = PTORequest.query.filter(
-            PTORequest.is_call_out == True,  # noqa: E712
-            PTORequest.callout_classification.is_(None)
-        ).all()
-    except Exception as e:
-        print(f'Could not query for unclassified call-outs: {e}')
-        return
+    unclassified = PTORequest.query.filter(
+        PTORequest.is_call_out == True,  # noqa: E712
+        PTORequest.callout_classification.is_(None)
+    ).all()
 
     if not unclassified:
         return
@@ -104,15 +219,97 @@ def backfill_callout_classifications():
         elif req.reason:
             text = req.reason
 
+        usage_rollups.retract_request(req)
         req.callout_classification = classify_call_out(text)
+        usage_rollups.apply_request(req)
         count += 1
 
-    try:
-        db.session.commit()
-        print(f'Backfilled callout_classification for {count} call-out(s)')
-    except Exception as e:
-        db.session.rollback()
-        print(f'Could not backfill call-out classifications: {e}')
+    db.session.commit()
+    print(f'Backfilled callout_classification for {count} call-out(s)')
+
+def backfill_request_durations():
+    """Store business_days/total_hours on requests saved before they were persisted."""
+    missing = PTORequest.query.filter(PTORequest.business_days.is_(None)).all()
+
+    if not missing:
+        return
+
+    # One batch business-day calculation for the whole backlog
+    PTORequest.prime_durations(missing)
+    for req in missing:
+        req.refresh_duration()
+
+    db.session.commit()
+    print(f'Backfilled stored duration for {len(missing)} PTO request(s)')
+
+def backfill_request_updated_at():
+    """Give requests saved without an updated_at/created_at one, so keyset pagination can page past them."""
+    from sqlalchemy import func, update
+    from models import get_eastern_time
+
+    result = db.session.execute(
+        update(PTORequest)
+        .where(PTORequest.updated_at.is_(None))
+        .values(updated_at=func.coalesce(PTORequest.submitted_at, PTORequest.created_at, get_eastern_time()))
+    )
+    created = db.session.execute(
+        update(PTORequest)
+        .where(PTORequest.created_at.is_(None))
+        .values(created_at=func.coalesce(PTORequest.submitted_at, PTORequest.updated_at))
+    )
+    db.session.commit()
+
+    if result.rowcount:
+        print(f'Backfilled updated_at for {result.rowcount} PTO request(s)')
+    if created.rowcount:
+        print(f'Backfilled created_at for {created.rowcount} PTO request(s)')
+
+def backfill_usage_rollups():
+    """Build the usage rollups from the raw rows the first time the table is empty."""
+    from models import UsageRollup, TardinessRecord
+
+    if UsageRollup.query.first() is not None:
+        return
+    has_usage = (
+        PTORequest.query.filter(PTORequest.status.in_(usage_rollups.USED_STATUSES)).first() is not None
+        or TardinessRecord.query.first() is not None
+    )
+    if not has_usage:
+        return
+    count = usage_rollups.rebuild()
+    db.session.commit()
+    print(f'Built {count} usage rollup row(s)')
+
+def backfill_phone_e164():
+    """Fill users.phone_e164 for rows saved before the column existed.
+
+    Numbers already claimed by another user are left unset and reported,
+    since the column carries a unique index.
+    """
+    from models import phone_to_e164
+
+    missing = User.query.filter(User.phone.isnot(None), User.phone_e164.is_(None)).all()
+
+    if not missing:
+        return
+
+    taken = {u.phone_e164: u.name for u in User.query.filter(User.phone_e164.isnot(None)).all()}
+    count = 0
+    for user in missing:
+        e164 = phone_to_e164(user.phone)
+        if not e164:
+            continue
+        if e164 in taken:
+            print(f'Warning: {user.name} shares phone {e164} with {taken[e164]}; '
+                  f'leaving it out of SMS sender lookup until one is corrected')
+            continue
+        user.phone_e164 = e164
+        taken[e164] = user.name
+        count += 1
+
+    db.session.commit()
+    if count:
+        print(f'Backfilled phone_e164 for {count} user(s)')
 
 def migrate_admin_positions():
     """Migrate old admin positions (Front Desk, CT Desk, etc.) to Secretary II"""
@@ -125,9 +322,11 @@ def migrate_admin_positions():
     # Old admin positions to migrate
     old_positions = ['Front Desk/Admin', 'CT Desk', 'Front Desk Coordinator', 'Admin Assistant']
 
+    changed = False
     for old_name in old_positions:
         old_pos = Position.query.filter_by(name=old_name).first()
         if old_pos:
+            changed = True
             # Update all team members with this position to Secretary II
             members_updated = TeamMember.query.filter_by(position_id=old_pos.id).update(
                 {'position_id': secretary_pos.id}
@@ -139,6 +338,9 @@ def migrate_admin_positions():
             db.session.delete(old_pos)
             print(f'Deleted old position: {old_name}')
 
+    if changed:
+        # Refreshes cached position lists and the employee search index
+        data_versions.bump(data_versions.MEMBERS)
     db.session.commit()
 
 def seed_sms_recipients_from_env():
@@ -151,11 +353,7 @@ def seed_sms_recipients_from_env():
     def _digits(s):
         return ''.join(ch for ch in (s or '') if ch.isdigit())
 
-    try:
-        count = SMSRecipient.query.count()
-    except Exception as e:
-        print(f'Could not check sms_recipients: {e}')
-        return
+    count = SMSRecipient.query.count()
 
     # --- First-time seed from env vars ---
     if count == 0:
@@ -211,179 +409,236 @@ def seed_sms_recipients_from_env():
         db.session.commit()
 
 
-def initialize_database():
-    with app.app_context():
-        # Create tables if they don't exist (but don't drop existing data)
-        # WARNING: Only use db.drop_all() during development if you need to reset schema
-        # db.drop_all()  # COMMENTED OUT - Enable ONLY to update schema during development
-        db.create_all()
-
-        # Run migrations to add new columns to existing tables
-        run_migrations()
-
-        # Initialize positions if they don't exist
-        positions_to_create = [
-            {'name': 'RNs', 'team': 'clinical'},
-            {'name': 'CVI MOAs', 'team': 'clinical'},
-            {'name': 'Echo Techs', 'team': 'clinical'},
-            {'name': 'Secretary II', 'team': 'admin'},
-            {'name': 'Leadership', 'team': 'admin'},
-            {'name': 'Other', 'team': 'admin'},
-        ]
-
-        for pos_data in positions_to_create:
-            existing_pos = Position.query.filter_by(name=pos_data['name']).first()
-            if not existing_pos:
-                new_pos = Position(name=pos_data['name'], team=pos_data['team'])
-                db.session.add(new_pos)
-        db.session.commit()
+def seed_positions():
+    """Create the standard positions that don't exist yet."""
+    positions_to_create = [
+        {'name': 'RNs', 'team': 'clinical'},
+        {'name': 'CVI MOAs', 'team': 'clinical'},
+        {'name': 'Echo Techs', 'team': 'clinical'},
+        {'name': 'Secretary II', 'team': 'admin'},
+        {'name': 'Leadership', 'team': 'admin'},
+        {'name': 'Other', 'team': 'admin'},
+    ]
+
+    created_positions = False
+    for pos_data in positions_to_create:
+        existing_pos = Position.query.filter_by(name=pos_data['name']).first()
+        if not existing_pos:
+            new_pos = Position(name=pos_data['name'], team=pos_data['team'])
+            db.session.add(new_pos)
+            created_positions = True
+    if created_positions:
+        # Positions are served with the members version as their ETag
+        data_versions.bump(data_versions.MEMBERS)
+    db.session.commit()
 
-        # Migrate old admin positions to Secretary II
-        migrate_admin_positions()
+def rename_positions():
+    """Migrate deprecated positions to their correct names and remove APP."""
+    position_renames = {
+        'CVI Echo Techs': 'Echo Techs',
+        'CVI RNs': 'RNs',
+    }
+    changed = False
+    for old_name, new_name in position_renames.items():
+        old_pos = Position.query.filter_by(name=old_name).first()
+        if old_pos:
+            changed = True
+            new_pos = Position.query.filter_by(name=new_name).first()
+            if new_pos:
+                # Move employees to the existing correct position
+                moved = TeamMember.query.filter_by(position_id=old_pos.id).update({'position_id': new_pos.id})
+                db.session.delete(old_pos)
+                print(f'Migrated {moved} employees from {old_name} to {new_name}')
+            else:
+                # Just rename the position
+                old_pos.name = new_name
+                print(f'Renamed position {old_name} to {new_name}')
+
+    # Remove APP position and its employees
+    app_pos = Position.query.filter_by(name='APP').first()
+    if app_pos:
+        members = TeamMember.query.filter_by(position_id=app_pos.id).all()
+        for member in members:
+            PTORequest.query.filter_by(member_id=member.id).delete()
+            usage_rollups.clear_member(member.id)
+            db.session.delete(member)
+        db.session.delete(app_pos)
+        print(f'Removed APP position ({len(members)} employees)')
+        data_versions.bump_requests()
+        changed = True
+    if changed:
+        # Refreshes cached position lists and the employee search index
+        data_versions.bump(data_versions.MEMBERS)
+    db.session.commit()
 
-        # Migrate deprecated positions to their correct names
-        position_renames = {
-            'CVI Echo Techs': 'Echo Techs',
-            'CVI RNs': 'RNs',
+def seed_managers():
+    """Create any default managers that don't exist yet. Existing managers keep
+    their passwords; only their name and role are brought in line."""
+    from werkzeug.security import generate_password_hash
+
+    managers_to_create = [
+        {
+            'name': 'Lauryn Padron',
+            'email': 'lauryn.padron@mountsinai.org',
+            'role': 'superadmin',
+            'password': 'Carlostylermila5!'
+        },
+        {
+            'name': 'Ashley Stark',
+            'email': 'ashley.stark@mountsinai.org',
+            'role': 'clinical',
+            'password': 'Heart123!'
+        },
+        {
+            'name': 'Samantha Zakow',
+            'email': 'htn.prevention@mountsinai.org',
+            'role': 'superadmin',
+            'password': 'Password123'
+        },
+        {
+            'name': 'Darline Saint-Victor',
+            'email': 'darline.saintvictor@mountsinai.org',
+            'role': 'clinical',
+            'password': 'password#1'
+        },
+        {
+            'name': 'Sukhjeet Dhaliwal',
+            'email': 'Sukhjeet.Dhaliwal@mountsinai.org',
+            'role': 'echo_supervisor',
+            'password': 'password#1'
+        },
+        {
+            'name': 'Stephen Handzel',
+            'email': 'Stephen.Handzel@mountsinai.org',
+            'role': 'clinical',
+            'password': 'password#1'
+        },
+        {
+            'name': 'Samantha Mason',
+            'email': 'samantha.mason@mountsinai.org',
+            'role': 'admin',
+            'password': 'password#1'
         }
-        for old_name, new_name in position_renames.items():
-            old_pos = Position.query.filter_by(name=old_name).first()
-            if old_pos:
-                new_pos = Position.query.filter_by(name=new_name).first()
-                if new_pos:
-                    # Move employees to the existing correct position
-                    moved = TeamMember.query.filter_by(position_id=old_pos.id).update({'position_id': new_pos.id})
-                    db.session.delete(old_pos)
-                    print(f'Migrated {moved} employees from {old_name} to {new_name}')
-                else:
-                    # Just rename the position
-                    old_pos.name = new_name
-                    print(f'Renamed position {old_name} to {new_name}')
-
-        # Remove APP position and its employees
-        app_pos = Position.query.filter_by(name='APP').first()
-        if app_pos:
-            members = TeamMember.query.filter_by(position_id=app_pos.id).all()
-            for member in members:
-                PTORequest.query.filter_by(member_id=member.id).delete()
-                db.session.delete(member)
-            db.session.delete(app_pos)
-            print(f'Removed APP position ({len(members)} employees)')
-        db.session.commit()
+    ]
 
-        # Initialize default managers in Manager table
-        from werkzeug.security import generate_password_hash
-
-        managers_to_create = [
-            {
-                'name': 'Lauryn Padron',
-                'email': 'lauryn.padron@mountsinai.org',
-                'role': 'superadmin',
-                'password': 'Carlostylermila5!'
-            },
-            {
-                'name': 'Ashley Stark',
-                'email': 'ashley.stark@mountsinai.org',
-                'role': 'clinical',
-                'password': 'Heart123!'
-            },
-            {
-                'name': 'Samantha Zakow',
-                'email': 'htn.prevention@mountsinai.org',
-                'role': 'superadmin',
-                'password': 'Password123'
-            },
-            {
-                'name': 'Darline Saint-Victor',
-                'email': 'darline.saintvictor@mountsinai.org',
-                'role': 'clinical',
-                'password': 'password#1'
-            },
-            {
-                'name': 'Sukhjeet Dhaliwal',
-                'email': 'Sukhjeet.Dhaliwal@mountsinai.org',
-                'role': 'echo_supervisor',
-                'password': 'password#1'
-            },
-            {
-                'name': 'Stephen Handzel',
-                'email': 'Stephen.Handzel@mountsinai.org',
-                'role': 'clinical',
-                'password': 'password#1'
-            },
-            {
-                'name': 'Samantha Mason',
-                'email': 'samantha.mason@mountsinai.org',
-                'role': 'admin',
-                'password': 'password#1'
-            }
-        ]
-
-        for manager_data in managers_to_create:
-            # Check if manager already exists by email
-            existing_manager = Manager.query.filter_by(email=manager_data['email']).first()
-
-            if existing_manager:
-                # Update existing manager
-                existing_manager.name = manager_data['name']
-                existing_manager.password_hash = generate_password_hash(manager_data['password'])
-                existing_manager.role = manager_data['role']
-                print(f"Updated Manager {manager_data['name']}")
-            else:
-                # Check if email exists as any other user type
-                existing_user = User.query.filter_by(email=manager_data['email']).first()
-                if existing_user:
-                    print(f"Warning: Cannot create manager - email {manager_data['email']} already in use")
-                    continue
+    created = 0
+    for manager_data in managers_to_create:
+        # Check if manager already exists by email
+        existing_manager = Manager.query.filter_by(email=manager_data['email']).first()
 
-                # Create new manager
-                new_manager = Manager(
-                    name=manager_data['name'],
-                    email=manager_data['email'],
-                    role=manager_data['role'],
-                    password_hash=generate_password_hash(manager_data['password'])
-                )
-                db.session.add(new_manager)
-                print(f"Created Manager {manager_data['name']} as {manager_data['role']}")
+        if existing_manager:
+            # Keep the password the manager may have changed; hashing is only
+            # paid for accounts that are actually created
+            existing_manager.name = manager_data['name']
+            existing_manager.role = manager_data['role']
+            continue
 
-        db.session.commit()
+        # Check if email exists as any other user type
+        existing_user = User.query.filter_by(email=manager_data['email']).first()
+        if existing_user:
+            print(f"Warning: Cannot create manager - email {manager_data['email']} already in use")
+            continue
 
-        # Clean up any non-Mount Sinai test accounts on every deploy
-        non_ms_members = TeamMember.query.filter(~TeamMember.email.ilike('%@mountsinai.org')).all()
-        if non_ms_members:
-            for m in non_ms_members:
-                PTORequest.query.filter_by(member_id=m.id).delete()
-                db.session.delete(m)
-            print(f"Cleaned up {len(non_ms_members)} non-Mount Sinai test accounts")
+        # Create new manager
+        new_manager = Manager(
+            name=manager_data['name'],
+            email=manager_data['email'],
+            role=manager_data['role'],
+            password_hash=generate_password_hash(manager_data['password'])
+        )
+        db.session.add(new_manager)
+        created += 1
+        print(f"Created Manager {manager_data['name']} as {manager_data['role']}")
 
-        non_ms_managers = Manager.query.filter(~Manager.email.ilike('%@mountsinai.org')).all()
-        if non_ms_managers:
-            for m in non_ms_managers:
-                db.session.delete(m)
-            print(f"Cleaned up {len(non_ms_managers)} non-Mount Sinai manager accounts")
+    db.session.commit()
+    print(f"Default managers: {created} created")
+
+def cleanup_test_accounts():
+    """Remove non-Mount Sinai test accounts."""
+    non_ms_members = TeamMember.query.filter(~TeamMember.email.ilike('%@mountsinai.org')).all()
+    if non_ms_members:
+        for m in non_ms_members:
+            PTORequest.query.filter_by(member_id=m.id).delete()
+            usage_rollups.clear_member(m.id)
+            db.session.delete(m)
+        print(f"Cleaned up {len(non_ms_members)} non-Mount Sinai test accounts")
+        data_versions.bump(data_versions.MEMBERS)
+        data_versions.bump_requests()
+
+    non_ms_managers = Manager.query.filter(~Manager.email.ilike('%@mountsinai.org')).all()
+    if non_ms_managers:
+        for m in non_ms_managers:
+            db.session.delete(m)
+        print(f"Cleaned up {len(non_ms_managers)} non-Mount Sinai manager accounts")
 
-        db.session.commit()
+    db.session.commit()
 
-        # Classify any call-outs missing a classification (runs once on first deploy,
-        # then no-ops on subsequent restarts since rows already have a value).
-        backfill_callout_classifications()
+def init_employee_search():
+    """FTS5 / pg_trgm index for the employee typeahead."""
+    from employee_search import init_search_index
+    print(f'Employee search backend: {init_search_index()}')
+
+# Startup steps, each applied once and recorded in schema_version (see migrations.py).
+# Never renumber or edit a shipped step; append new ones (new columns, indexes,
+# tables via db.create_all, backfills) with the next version number.
+MIGRATIONS = [
+    (1, 'create_tables', db.create_all),
+    (2, 'add_columns_and_indexes', run_migrations),
+    (3, 'migrate_date_columns', migrate_date_columns),
+    (4, 'seed_positions', seed_positions),
+    (5, 'migrate_admin_positions', migrate_admin_positions),
+    (6, 'rename_positions', rename_positions),
+    (7, 'seed_managers', seed_managers),
+    (8, 'cleanup_test_accounts', cleanup_test_accounts),
+    (9, 'backfill_callout_classifications', backfill_callout_classifications),
+    # Store business days / hours on rows created before those columns existed
+    (10, 'backfill_request_durations', backfill_request_durations),
+    # Workqueue pages are keyed on updated_at, which must not be NULL
+    (11, 'backfill_request_updated_at', backfill_request_updated_at),
+    # Normalized phone numbers for indexed Twilio sender lookup
+    (12, 'backfill_phone_e164', backfill_phone_e164),
+    # Per-employee usage totals, built once from existing requests and tardiness
+    (13, 'backfill_usage_rollups', backfill_usage_rollups),
+    (14, 'init_employee_search', init_employee_search),
+    # Seed SMS recipients from env vars on first deploy of the new system.
+    # After this runs once, managing recipients is done entirely via the /sms-recipients UI.
+    (15, 'seed_sms_recipients_from_env', seed_sms_recipients_from_env),
+    # outbox table for queued email/SMS notifications
+    (16, 'create_outbox', db.create_all),
+    # sms_delivery_log table for per-recipient SMS fan-out results
+    (17, 'create_sms_delivery_log', db.create_all),
+]
 
-        # Seed SMS recipients from env vars on first deploy of the new system.
-        # After this runs once, managing recipients is done entirely via the /sms-recipients UI.
-        seed_sms_recipients_from_env()
+def initialize_database():
+    """Apply any startup migrations this database hasn't had yet; a single query when it is current."""
+    with app.app_context():
+        applied = migrations.run_pending(MIGRATIONS)
+        if applied:
+            print(f"Database initialization complete ({applied} migration(s) applied)")
 
-        print("Database initialization complete")
+startup_profiler.mark('imports and config')
 
 # Import and register routes
 from routes_simple import register_routes
 register_routes(app)
+startup_profiler.mark('routes')
 
 # Register Twilio routes for call-out feature
 from routes_twilio import register_twilio_routes
 register_twilio_routes(app)
+startup_profiler.mark('twilio routes')
 
 with app.app_context():
     initialize_database()
+startup_profiler.mark('database')
+
+# Sender for queued email/SMS notifications: a background thread, or on Vercel one
+# batch after each response that queued messages (see outbox.py)
+import outbox
+outbox.start_dispatcher(app)
+
+# Startup timing breakdown (set STARTUP_PROFILE=1 for per-module import times)
+startup_profiler.report()
 
 if __name__ == '__main__':
     app.run(host='127.0.0.1', port=5000, debug=True)
@@ -0,0 +1,113 @@
+"""
+Benchmark Payloads
+Measures response size and render time for the calendar endpoints and the
+superadmin dashboard with the standard JSON provider, with the orjson
+provider, and with the orjson provider plus gzip/brotli compression.
+
+Usage: python benchmark_payloads.py [runs]
+"""
+
+import sys
+import io
+import time
+
+# Fix Windows console encoding issues
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+from flask.json.provider import DefaultJSONProvider
+
+from app import app
+from models import Manager
+import compression
+from json_provider import OrjsonProvider, orjson
+
+URLS = [
+    '/calendar',
+    '/api/calendar-events',
+    '/api/team-calendar/clinical',
+    '/dashboard/superadmin',
+]
+
+
+def make_client():
+    """Test client logged in as a superadmin"""
+    client = app.test_client()
+    with app.app_context():
+        user = Manager.query.filter_by(role='superadmin').first()
+        if not user:
+            print("No superadmin account found; run the app once to seed managers.")
+            sys.exit(1)
+        user_id, user_name = user.id, user.name
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['user_name'] = user_name
+        session['user_role'] = 'superadmin'
+    return client
+
+
+def use_provider(provider):
+    """Switch jsonify and the |tojson filter to the given JSON provider"""
+    app.json = provider
+    app.jinja_env.policies['json.dumps_function'] = provider.dumps
+
+
+def measure(client, url, runs, headers):
+    """(body bytes, Content-Encoding, mean ms per request)"""
+    response = client.get(url, headers=headers)
+    start = time.perf_counter()
+    for _ in range(runs):
+        client.get(url, headers=headers)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / runs
+    return len(response.get_data()), response.headers.get('Content-Encoding', 'identity'), elapsed_ms
+
+
+def time_serialization(provider, payload, runs):
+    """Mean ms to serialize payload with the provider, outside of any request"""
+    start = time.perf_counter()
+    for _ in range(runs):
+        provider.dumps(payload)
+    return (time.perf_counter() - start) * 1000 / runs
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    client = make_client()
+    standard = DefaultJSONProvider(app)
+    fast = OrjsonProvider(app) if orjson is not None else standard
+    accept = 'br, gzip' if compression.brotli is not None else 'gzip'
+
+    print(f"Payload benchmark ({runs} runs per URL)")
+    print(f"  orjson: {'yes' if orjson is not None else 'not installed'}")
+    print(f"  brotli: {'yes' if compression.brotli is not None else 'not installed (gzip only)'}")
+    print("=" * 88)
+    print(f"{'URL':<30}{'stdlib json':>19}{'fast json':>19}{'fast json + compressed':>27}")
+
+    for url in URLS:
+        use_provider(standard)
+        before = measure(client, url, runs, {})
+
+        use_provider(fast)
+        plain = measure(client, url, runs, {})
+        compressed = measure(client, url, runs, {'Accept-Encoding': accept})
+
+        print(f"{url:<30}"
+              f"{before[0]:>9,} B {before[2]:>5.1f} ms"
+              f"{plain[0]:>9,} B {plain[2]:>5.1f} ms"
+              f"{compressed[0]:>9,} B {compressed[2]:>5.1f} ms ({compressed[1]})")
+
+    print("=" * 88)
+    print("Sizes are bytes on the wire; times are mean server render time per request.")
+
+    print("\nSerialization only (JSON endpoints):")
+    for url in URLS:
+        if not url.startswith('/api/'):
+            continue
+        payload = client.get(url).get_json()
+        print(f"  {url:<30}{len(payload):>6} events"
+              f"{time_serialization(standard, payload, runs):>8.2f} ms stdlib"
+              f"{time_serialization(fast, payload, runs):>8.2f} ms fast")
+
+
+if __name__ == '__main__':
+    main()
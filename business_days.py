@@ -3,8 +3,10 @@ Business Days Calculator for PTO System
 Excludes weekends and Mount Sinai official holidays from PTO calculations
 """
 
+import threading
+from bisect import bisect_left, bisect_right
 from datetime import datetime, date, timedelta
-from typing import List, Set, Dict
+from typing import List, Set, Dict, Tuple
 
 
 class BusinessDaysCalculator:
@@ -222,16 +224,7 @@ class BusinessDaysCalculator:
         Check if a given date is a business day
         Returns False for weekends and Mount Sinai holidays
         """
-        # Check if it's a weekend (Saturday=5, Sunday=6)
-        if check_date.weekday() >= 5:
-            return False
-
-        # Check if it's a Mount Sinai holiday
-        year_holidays = BusinessDaysCalculator.get_mount_sinai_holidays(check_date.year)
-        if check_date in year_holidays:
-            return False
-
-        return True
+        return business_day_index.is_business_day(check_date)
 
     @staticmethod
     def calculate_business_days(start_date: date, end_date: date) -> int:
@@ -242,15 +235,7 @@ class BusinessDaysCalculator:
         if start_date > end_date:
             return 0
 
-        business_days = 0
-        current_date = start_date
-
-        while current_date <= end_date:
-            if BusinessDaysCalculator.is_business_day(current_date):
-                business_days += 1
-            current_date += timedelta(days=1)
-
-        return business_days
+        return business_day_index.count(start_date, end_date)[0]
 
     @staticmethod
     def get_business_days_list(start_date: date, end_date: date) -> List[date]:
@@ -262,7 +247,7 @@ class BusinessDaysCalculator:
         current_date = start_date
 
         while current_date <= end_date:
-            if BusinessDaysCalculator.is_business_day(current_date):
+            if business_day_index.is_business_day(current_date):
                 business_days.append(current_date)
             current_date += timedelta(days=1)
 
@@ -285,36 +270,26 @@ class BusinessDaysCalculator:
             }
 
         total_days = (end_date - start_date).days + 1
-        business_days = 0
-        weekend_days = 0
-        holiday_days = 0
-        holidays_list = []
-        weekends_list = []
-
-        # Get all holidays for the years involved
-        years = set()
-        current_date = start_date
-        while current_date <= end_date:
-            years.add(current_date.year)
-            current_date += timedelta(days=1)
-
-        all_holidays = set()
-        for year in years:
-            all_holidays.update(BusinessDaysCalculator.get_mount_sinai_holidays(year))
+        business_days, weekend_days = business_day_index.count(start_date, end_date)
+        holiday_days = total_days - business_days - weekend_days
 
-        # Count each type of day
-        current_date = start_date
-        while current_date <= end_date:
-            if current_date.weekday() >= 5:  # Weekend
-                weekend_days += 1
+        # Weekends: step from the first Saturday/Sunday in range a week at a time
+        weekends_list = []
+        for weekday in (5, 6):
+            current_date = start_date + timedelta(days=(weekday - start_date.weekday()) % 7)
+            while current_date <= end_date:
                 weekends_list.append(current_date)
-            elif current_date in all_holidays:  # Holiday
-                holiday_days += 1
-                holidays_list.append(current_date)
-            else:  # Business day
-                business_days += 1
+                current_date += timedelta(days=7)
+        weekends_list.sort()
 
-            current_date += timedelta(days=1)
+        holidays_list = []
+        if holiday_days:
+            for year in range(start_date.year, end_date.year + 1):
+                holidays_list.extend(
+                    h for h in business_day_index.holidays_in_year(year)
+                    if start_date <= h <= end_date and h.weekday() < 5
+                )
+            holidays_list.sort()
 
         return {
             'total_days': total_days,
@@ -326,30 +301,223 @@ class BusinessDaysCalculator:
         }
 
 
+class BusinessDayIndex:
+    """
+    Precomputed business-day ordinal index.
+
+    Holds prefix sums of business days and weekend days keyed by date ordinal,
+    so counting any range is two lookups and a subtraction. The table covers a
+    contiguous span of years and is rebuilt over a wider span the first time a
+    date outside it is requested.
+
+    Also keeps, per year, the runs of consecutive business days (Mon-Fri
+    stretches split by holidays), so a date range can be cut into business-day
+    segments with a bisect instead of a walk over every date.
+    """
+
+    # Dates outside this span are counted day by day instead of being indexed,
+    # so a mistyped year can't grow the table without bound.
+    MIN_YEAR = 1900
+    MAX_YEAR = 2199
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._holidays = {}
+        # year -> (run_starts, run_ends) as date ordinals, ends exclusive
+        self._runs = {}
+        # (first_year, last_year, base_ordinal, business_prefix, weekend_prefix)
+        self._table = None
+
+    def holidays_in_year(self, year: int) -> frozenset:
+        """
+        Mount Sinai holidays that fall within the calendar year.
+        Includes New Year's Day observed on Dec 31 of the prior year.
+        """
+        cached = self._holidays.get(year)
+        if cached is None:
+            candidates = BusinessDaysCalculator.get_mount_sinai_holidays(year)
+            candidates |= BusinessDaysCalculator.get_mount_sinai_holidays(year + 1)
+            cached = frozenset(d for d in candidates if d.year == year)
+            self._holidays[year] = cached
+        return cached
+
+    def business_runs_in_year(self, year: int) -> tuple:
+        """
+        Runs of consecutive business days in the calendar year.
+        Returns (starts, ends) lists of date ordinals; each end is exclusive.
+        Runs never need to cross into the next year: any Mon-Fri week that
+        spans Jan 1 has New Year's Day (a holiday) as one of its weekdays.
+        """
+        cached = self._runs.get(year)
+        if cached is not None:
+            return cached
+
+        first = date(year, 1, 1).toordinal()
+        last = date(year, 12, 31).toordinal()
+        holidays = sorted(h.toordinal() for h in self.holidays_in_year(year))
+        starts = []
+        ends = []
+        # Ordinal 1 (0001-01-01) is a Monday, so (ordinal - 1) % 7 is the weekday
+        monday = first - (first - 1) % 7
+        while monday <= last:
+            run_start = max(monday, first)
+            week_end = min(monday + 5, last + 1)
+            for holiday in holidays[bisect_left(holidays, run_start):bisect_left(holidays, week_end)]:
+                if holiday > run_start:
+                    starts.append(run_start)
+                    ends.append(holiday)
+                run_start = holiday + 1
+            if run_start < week_end:
+                starts.append(run_start)
+                ends.append(week_end)
+            monday += 7
+
+        cached = (starts, ends)
+        self._runs[year] = cached
+        return cached
+
+    def segments(self, start_date: date, end_date: date) -> List[Tuple[date, date]]:
+        """
+        Split a date range (inclusive) into runs of consecutive business days
+        Returns (segment_start, segment_end_exclusive) date tuples
+        """
+        if start_date > end_date:
+            return []
+        lo = start_date.toordinal()
+        hi = end_date.toordinal() + 1
+        segments = []
+        for year in range(start_date.year, end_date.year + 1):
+            starts, ends = self.business_runs_in_year(year)
+            # First run ending after the range start through the last run starting before its end
+            first = bisect_right(ends, lo)
+            last = bisect_left(starts, hi)
+            for i in range(first, last):
+                segments.append((
+                    date.fromordinal(max(starts[i], lo)),
+                    date.fromordinal(min(ends[i], hi)),
+                ))
+        return segments
+
+    def _build(self, first_year: int, last_year: int) -> tuple:
+        base = date(first_year, 1, 1).toordinal()
+        business = [0]
+        weekend = [0]
+        b = w = 0
+        for year in range(first_year, last_year + 1):
+            holidays = self.holidays_in_year(year)
+            current = date(year, 1, 1)
+            while current.year == year:
+                if current.weekday() >= 5:
+                    w += 1
+                elif current not in holidays:
+                    b += 1
+                business.append(b)
+                weekend.append(w)
+                current += timedelta(days=1)
+        return (first_year, last_year, base, business, weekend)
+
+    def _table_for(self, first_year: int, last_year: int):
+        """Return a table covering the given years, extending it if needed."""
+        table = self._table
+        if table is not None and table[0] <= first_year and last_year <= table[1]:
+            return table
+        with self._lock:
+            table = self._table
+            if table is not None:
+                first_year = min(first_year, table[0])
+                last_year = max(last_year, table[1])
+                if table[0] == first_year and table[1] == last_year:
+                    return table
+            table = self._build(first_year, last_year)
+            self._table = table
+            return table
+
+    def _walk(self, start_date: date, end_date: date) -> Tuple[int, int]:
+        """Day-by-day fallback for dates outside the indexed span"""
+        business = weekend = 0
+        current = start_date
+        while current <= end_date:
+            if current.weekday() >= 5:
+                weekend += 1
+            elif current not in self.holidays_in_year(current.year):
+                business += 1
+            current += timedelta(days=1)
+        return business, weekend
+
+    def count(self, start_date: date, end_date: date) -> Tuple[int, int]:
+        """
+        Count (business_days, weekend_days) between two dates (inclusive)
+        Returns (0, 0) if start_date is after end_date
+        """
+        if start_date > end_date:
+            return 0, 0
+        if start_date.year < self.MIN_YEAR or end_date.year > self.MAX_YEAR:
+            return self._walk(start_date, end_date)
+
+        _, _, base, business, weekend = self._table_for(start_date.year, end_date.year)
+        lo = start_date.toordinal() - base
+        hi = end_date.toordinal() - base + 1
+        return business[hi] - business[lo], weekend[hi] - weekend[lo]
+
+    def is_business_day(self, check_date: date) -> bool:
+        """Check if a single date is a business day"""
+        return self.count(check_date, check_date)[0] == 1
+
+
+# Shared index used by all business-day calculations in this module
+business_day_index = BusinessDayIndex()
+
+
 # Convenience functions for easy import
-def calculate_pto_days(start_date_str: str, end_date_str: str) -> int:
+def parse_date(value):
+    """Coerce a date or 'YYYY-MM-DD' string to a date; None if it can't be parsed"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except (ValueError, TypeError):
+        return None
+
+
+def calculate_pto_days(start_date, end_date) -> int:
     """
-    Calculate PTO days (business days only) from date strings
+    Calculate PTO days (business days only) from dates or date strings
     Format: 'YYYY-MM-DD'
     """
-    try:
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-        return BusinessDaysCalculator.calculate_business_days(start_date, end_date)
-    except ValueError:
+    start = parse_date(start_date)
+    end = parse_date(end_date)
+    if start is None or end is None:
         return 0
+    return BusinessDaysCalculator.calculate_business_days(start, end)
+
+
+def get_business_day_segments(start_date, end_date) -> List[Tuple[str, str]]:
+    """
+    Split a date range into segments of consecutive business days, breaking on
+    weekends and Mount Sinai holidays. Accepts dates or 'YYYY-MM-DD' strings.
+    Returns (segment_start, segment_end_exclusive) 'YYYY-MM-DD' tuples, the
+    exclusive end being what FullCalendar expects.
+    """
+    start = parse_date(start_date)
+    end = parse_date(end_date)
+    if start is None or end is None:
+        return []
+    return [
+        (seg_start.isoformat(), seg_end.isoformat())
+        for seg_start, seg_end in business_day_index.segments(start, end)
+    ]
 
 
-def get_pto_breakdown(start_date_str: str, end_date_str: str) -> dict:
+def get_pto_breakdown(start_date, end_date) -> dict:
     """
     Get detailed breakdown of PTO request including holidays and weekends
-    Format: 'YYYY-MM-DD'
+    Accepts dates or date strings in 'YYYY-MM-DD' format
     """
-    try:
-        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
-        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
-        return BusinessDaysCalculator.get_holiday_info(start_date, end_date)
-    except ValueError:
+    start = parse_date(start_date)
+    end = parse_date(end_date)
+    if start is None or end is None:
         return {
             'total_days': 0,
             'business_days': 0,
@@ -358,6 +526,95 @@ def get_pto_breakdown(start_date_str: str, end_date_str: str) -> dict:
             'holidays_list': [],
             'weekends_list': []
         }
+    return BusinessDaysCalculator.get_holiday_info(start, end)
+
+
+_numpy_module = None
+_busday_calendars = {}
+
+
+def _numpy():
+    """Import NumPy on first use; returns None when it isn't installed"""
+    global _numpy_module
+    if _numpy_module is None:
+        try:
+            import numpy
+            _numpy_module = numpy
+        except ImportError:
+            _numpy_module = False
+    return _numpy_module or None
+
+
+def _busday_calendar(np, first_year: int, last_year: int):
+    """NumPy business-day calendar with Mount Sinai holidays for a span of years"""
+    key = (first_year, last_year)
+    calendar = _busday_calendars.get(key)
+    if calendar is None:
+        holidays = sorted(
+            h for year in range(first_year, last_year + 1)
+            for h in business_day_index.holidays_in_year(year)
+        )
+        calendar = np.busdaycalendar(weekmask='1111100', holidays=holidays)
+        _busday_calendars[key] = calendar
+    return calendar
+
+
+def get_pto_breakdown_batch(start_dates, end_dates) -> Dict[str, List[int]]:
+    """
+    Count total, business, weekend and holiday days for many date ranges at once
+    Takes parallel sequences of dates or 'YYYY-MM-DD' strings; unparseable or
+    reversed ranges count as zero. Uses numpy.busday_count when NumPy is
+    installed, otherwise the business-day index.
+    """
+    starts = [parse_date(s) for s in start_dates]
+    ends = [parse_date(e) for e in end_dates]
+    valid = [s is not None and e is not None and s <= e for s, e in zip(starts, ends)]
+
+    result = {'total_days': [], 'business_days': [], 'weekend_days': [], 'holiday_days': []}
+    if not any(valid):
+        for key in result:
+            result[key] = [0] * len(valid)
+        return result
+
+    np = _numpy()
+    if np is not None:
+        first_year = min(s.year for s, ok in zip(starts, valid) if ok)
+        last_year = max(e.year for e, ok in zip(ends, valid) if ok)
+        mask = np.array(valid)
+        placeholder = date(first_year, 1, 1)
+        begin = np.array([s if ok else placeholder for s, ok in zip(starts, valid)], dtype='datetime64[D]')
+        stop = np.array([e if ok else placeholder for e, ok in zip(ends, valid)], dtype='datetime64[D]') + 1
+
+        total = np.where(mask, (stop - begin).astype(int), 0)
+        business = np.where(mask, np.busday_count(begin, stop, busdaycal=_busday_calendar(np, first_year, last_year)), 0)
+        weekend = np.where(mask, np.busday_count(begin, stop, weekmask='0000011'), 0)
+
+        result['total_days'] = total.tolist()
+        result['business_days'] = business.tolist()
+        result['weekend_days'] = weekend.tolist()
+        result['holiday_days'] = (total - business - weekend).tolist()
+        return result
+
+    for s, e, ok in zip(starts, ends, valid):
+        if not ok:
+            for key in result:
+                result[key].append(0)
+            continue
+        total = (e - s).days + 1
+        business, weekend = business_day_index.count(s, e)
+        result['total_days'].append(total)
+        result['business_days'].append(business)
+        result['weekend_days'].append(weekend)
+        result['holiday_days'].append(total - business - weekend)
+    return result
+
+
+def calculate_pto_days_batch(start_dates, end_dates) -> List[int]:
+    """
+    Calculate PTO days (business days only) for many date ranges at once
+    Batch counterpart of calculate_pto_days
+    """
+    return get_pto_breakdown_batch(start_dates, end_dates)['business_days']
 
 
 def get_holidays_for_calendar(year: int = None) -> List[Dict]:
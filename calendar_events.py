@@ -0,0 +1,199 @@
+"""
+Calendar event builder
+One place that turns PTO requests into FullCalendar event dicts for every
+calendar in the app. Each request's events are memoized per view, keyed
+by the request's id and updated_at plus the member fields shown in the
+event, so repeat calendar loads mostly hit the cache.
+
+Returned event dicts are shared between callers and must be treated as
+read-only.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+
+from business_days import get_business_day_segments
+
+# Colors shared by every calendar view
+CALL_OUT_COLOR = ('#dc3545', '#fff')  # Red
+STATUS_COLORS = {
+    'approved': ('#28a745', '#fff'),  # Green
+    'pending': ('#ffc107', '#000'),   # Yellow
+    'denied': ('#6c757d', '#fff'),    # Gray
+}
+OTHER_STATUS_COLOR = ('#17a2b8', '#fff')  # Info blue for in_progress / completed
+
+# Views: 'calendar' (public /calendar page), 'superadmin' (dashboard),
+# 'team' (manager dashboards), 'employee' (employee detail page)
+VIEWS = ('calendar', 'superadmin', 'team', 'employee')
+
+MAX_CACHED_REQUESTS = 5000
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def event_colors(req):
+    """(background, text) colors for a request: call-outs first, then by status"""
+    if req.is_call_out:
+        return CALL_OUT_COLOR
+    return STATUS_COLORS.get(req.status, OTHER_STATUS_COLOR)
+
+
+def _member_fields(req):
+    """Member details that appear in events: (name, position name, position team)"""
+    member = req.member
+    if member is None:
+        return (None, None, None)
+    position = member.position
+    return (member.name, position.name if position else None, position.team if position else None)
+
+
+def _calendar_events(req, name, position_name, position_team):
+    color, text_color = event_colors(req)
+    title = f"Call Out - {name}" if req.is_call_out else f"{name} - {req.pto_type}"
+    duration = req.duration_days
+
+    return [{
+        'id': f'pto-{req.id}-{idx}',
+        'title': title,
+        'start': seg_start,
+        'end': seg_end,
+        'backgroundColor': color,
+        'borderColor': color,
+        'textColor': text_color,
+        'extendedProps': {
+            'employee': name,
+            'employee_position': position_name or 'Unknown',
+            'team': position_team or 'unknown',
+            'type': req.pto_type,
+            'status': req.status,
+            'reason': req.reason or '',
+            'duration': duration,
+            'is_partial_day': req.is_partial_day,
+            'is_call_out': req.is_call_out,
+            'request_id': req.id
+        }
+    } for idx, (seg_start, seg_end) in enumerate(get_business_day_segments(req.start_date, req.end_date))]
+
+
+def _superadmin_events(req, name, position_name, position_team):
+    color, text_color = event_colors(req)
+    title = f"Call Out - {name}" if req.is_call_out else f"{name} - {req.pto_type}"
+
+    return [{
+        'title': title,
+        'start': seg_start,
+        'end': seg_end,
+        'backgroundColor': color,
+        'borderColor': color,
+        'textColor': text_color,
+        'extendedProps': {
+            'status': req.status,
+            'is_call_out': req.is_call_out,
+            'type': req.pto_type,
+            'team': position_team or 'unknown',
+            'employee': name or 'Unknown',
+        }
+    } for seg_start, seg_end in get_business_day_segments(req.start_date, req.end_date)]
+
+
+def _team_events(req, name, position_name, position_team):
+    color, text_color = event_colors(req)
+    title = f"CALL OUT - {name}" if req.is_call_out else name
+    duration = req.duration_days
+
+    return [{
+        'id': f'{req.id}-{idx}',
+        'title': title,
+        'start': seg_start,
+        'end': seg_end,
+        'color': color,
+        'textColor': text_color,
+        'allDay': True,
+        'extendedProps': {
+            'employee': name,
+            'employee_position': position_name or '',
+            'type': req.pto_type,
+            'status': req.status,
+            'is_call_out': req.is_call_out,
+            'is_partial_day': req.is_partial_day,
+            'duration': f"{duration} day{'s' if duration != 1 else ''}",
+            'reason': req.reason or '',
+            'team': req.manager_team
+        }
+    } for idx, (seg_start, seg_end) in enumerate(get_business_day_segments(req.start_date, req.end_date))]
+
+
+def _employee_events(req, name, position_name, position_team):
+    color, text_color = event_colors(req)
+    title = f"Call Out - {req.pto_type}" if req.is_call_out else req.pto_type
+
+    event = {
+        'id': req.id,
+        'title': title,
+        'start': req.start_date.isoformat(),
+        # FullCalendar uses exclusive end dates, so add 1 day
+        'end': (req.end_date + timedelta(days=1)).isoformat(),
+        'color': color,
+        'allDay': not req.is_partial_day,
+        'extendedProps': {
+            'type': req.pto_type,
+            'status': req.status,
+            'duration': req.duration_days if not req.is_partial_day else f"{req.duration_hours} hours",
+            'is_partial_day': req.is_partial_day,
+            'is_call_out': req.is_call_out,
+            'reason': req.reason or 'Not specified',
+            'submitted': req.submitted_at.strftime('%m/%d/%Y') if req.submitted_at else 'N/A',
+            'start_date': req.start_date.isoformat(),
+            'end_date': req.end_date.isoformat()
+        }
+    }
+
+    # For partial day requests, add time information
+    if req.is_partial_day and req.start_time and req.end_time:
+        event['start'] = f"{req.start_date.isoformat()}T{req.start_time}"
+        event['end'] = f"{req.end_date.isoformat()}T{req.end_time}"
+        event['title'] = f"{title} (Partial)"
+        event['allDay'] = False
+
+    return [event]
+
+
+_BUILDERS = {
+    'calendar': _calendar_events,
+    'superadmin': _superadmin_events,
+    'team': _team_events,
+    'employee': _employee_events,
+}
+
+
+def get_request_events(req, view):
+    """Events for one request in the given view, from the cache when the request is unchanged"""
+    member_fields = _member_fields(req)
+    key = (req.id, req.updated_at, member_fields, view)
+
+    with _cache_lock:
+        events = _cache.get(key)
+        if events is not None:
+            _cache.move_to_end(key)
+            return events
+
+    events = _BUILDERS[view](req, *member_fields)
+
+    with _cache_lock:
+        _cache[key] = events
+        while len(_cache) > MAX_CACHED_REQUESTS:
+            _cache.popitem(last=False)
+    return events
+
+
+def build_events(requests, view):
+    """FullCalendar events for a list of requests, flattened in request order"""
+    if view not in _BUILDERS:
+        raise ValueError(f'Unknown calendar view: {view}')
+    events = []
+    for req in requests:
+        events.extend(get_request_events(req, view))
+    return events
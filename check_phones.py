@@ -11,7 +11,29 @@ if sys.platform == 'win32':
     sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 from app import app
-from models import TeamMember
+from models import TeamMember, User, phone_to_e164
+from database import db
+
+def sync_phone_e164(members):
+    """Bring users.phone_e164 in line with each member's phone; returns (updated, conflicts)"""
+    updated = 0
+    conflicts = []
+
+    for member in members:
+        expected = phone_to_e164(member.phone)
+        if member.phone_e164 == expected:
+            continue
+        if expected:
+            owner = User.query.filter(User.phone_e164 == expected, User.id != member.id).first()
+            if owner:
+                conflicts.append((member, owner))
+                continue
+        member.phone_e164 = expected
+        db.session.flush()
+        updated += 1
+
+    db.session.commit()
+    return updated, conflicts
 
 def check_phone_numbers():
     """Display all employees and their phone numbers"""
@@ -24,6 +46,8 @@ def check_phone_numbers():
             print("No employees found in database!")
             return
 
+        updated, conflicts = sync_phone_e164(members)
+
         print("\n" + "="*70)
         print("  EMPLOYEE PHONE NUMBER STATUS")
         print("="*70)
@@ -33,13 +57,18 @@ def check_phone_numbers():
         # Track statistics
         has_phone = 0
         no_phone = 0
+        unmatched = 0
 
         for member in members:
             # Get team from position
             team = member.team if member.team else "Unknown"
 
             # Check phone status
-            if member.phone:
+            if member.phone and not member.phone_e164:
+                phone_display = member.phone
+                status_symbol = "[!!]"
+                unmatched += 1
+            elif member.phone:
                 phone_display = member.phone
                 status_symbol = "[OK]"
                 has_phone += 1
@@ -57,6 +86,15 @@ def check_phone_numbers():
         print(f"  Total Employees:     {len(members)}")
         print(f"  [OK] With Phone:     {has_phone}")
         print(f"  [--] Missing Phone:  {no_phone}")
+        print(f"  [!!] Not Matchable:  {unmatched}")
+        if updated:
+            print(f"\n[OK] Synced normalized phone for {updated} employee(s)")
+
+        for member, owner in conflicts:
+            print(f"\n[!] {member.name} and {owner.name} share {member.phone} - SMS from that number matches {owner.name} only")
+
+        if unmatched > 0:
+            print(f"\n[!] {unmatched} phone number(s) are not valid 10-digit US numbers or are duplicates.")
 
         if no_phone > 0:
             print(f"\n[!] WARNING: {no_phone} employee(s) cannot use SMS call-out feature!")
@@ -0,0 +1,117 @@
+"""
+Check Query Plans
+Runs EXPLAIN on the dashboard and detail-page queries and shows whether
+each one is served by the index it was designed for
+"""
+
+import sys
+import io
+
+# Fix Windows console encoding issues
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+from sqlalchemy import text
+
+from app import app
+from models import db, PTORequest, CallOutRecord, TardinessRecord, get_eastern_time
+
+
+def build_queries():
+    """Return (description, query, acceptable index names) for each hot query"""
+    today = get_eastern_time().date()
+    member_ids = [1, 2, 3]
+
+    return [
+        ('Dashboard pending requests (team + status)',
+         PTORequest.query.filter_by(status='pending', manager_team='clinical'),
+         ['ix_pto_requests_team_status_dates']),
+        ('Currently on PTO (team + status + date range)',
+         PTORequest.query.filter_by(status='approved', manager_team='admin').filter(
+             PTORequest.start_date <= today,
+             PTORequest.end_date >= today
+         ),
+         ['ix_pto_requests_team_status_dates', 'ix_pto_requests_status_end']),
+        ('Supervisor dashboard (member ids + status)',
+         PTORequest.query.filter(
+             PTORequest.member_id.in_(member_ids),
+             PTORequest.status == 'pending'
+         ),
+         ['ix_pto_requests_member_created', 'ix_pto_requests_status_end']),
+        ('Employee detail requests (member, newest first)',
+         PTORequest.query.filter_by(member_id=1).order_by(PTORequest.created_at.desc()),
+         ['ix_pto_requests_member_created']),
+        ('Auto-complete ended requests (status + end date)',
+         PTORequest.query.filter(
+             PTORequest.status == 'approved',
+             PTORequest.end_date < today
+         ),
+         ['ix_pto_requests_status_end']),
+        ('Completed workqueue page (status, newest change first)',
+         PTORequest.query.filter_by(status='completed').order_by(
+             PTORequest.updated_at.desc(), PTORequest.id.desc()
+         ).limit(26),
+         ['ix_pto_requests_status_updated']),
+        ('Call-out record for a request',
+         CallOutRecord.query.filter_by(pto_request_id=1),
+         ['ix_call_out_records_pto_request']),
+        ('Call-out records for an employee',
+         CallOutRecord.query.filter_by(member_id=1),
+         ['ix_call_out_records_member']),
+        ('Employee tardiness (member, newest first)',
+         TardinessRecord.query.filter_by(member_id=1).order_by(TardinessRecord.date.desc()),
+         ['ix_tardiness_records_member_date']),
+    ]
+
+
+def explain(query):
+    """Return the database's plan for a query as a single string"""
+    dialect = db.engine.dialect
+    sql = str(query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+    if dialect.name == 'postgresql':
+        # Tiny tables make a sequential scan look cheapest; ask for the index plan
+        db.session.execute(text('SET LOCAL enable_seqscan = off'))
+        rows = db.session.execute(text('EXPLAIN ' + sql)).fetchall()
+        return '\n'.join(row[0] for row in rows)
+
+    rows = db.session.execute(text('EXPLAIN QUERY PLAN ' + sql)).fetchall()
+    return '\n'.join(str(row[-1]) for row in rows)
+
+
+def check_query_plans():
+    """Print the plan for each query and whether it uses an expected index"""
+
+    with app.app_context():
+        print("\n" + "="*70)
+        print(f"  QUERY PLAN CHECK ({db.engine.dialect.name})")
+        print("="*70)
+
+        failures = 0
+        for description, query, expected in build_queries():
+            plan = explain(query)
+            used = [name for name in expected if name in plan]
+            status = "[OK]" if used else "[--]"
+            if not used:
+                failures += 1
+
+            print(f"\n{status} {description}")
+            print(f"     Expected: {' or '.join(expected)}")
+            for line in plan.splitlines():
+                print(f"     | {line}")
+
+        db.session.rollback()
+
+        print("\n" + "="*70)
+        if failures:
+            print(f"  {failures} query(s) not using an expected index")
+            print("  (indexes are created by run_migrations() on app startup)")
+        else:
+            print("  All queries use their indexes")
+        print("="*70 + "\n")
+
+        return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if check_query_plans() else 0)
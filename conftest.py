@@ -0,0 +1,56 @@
+"""
+Shared pytest setup
+Every pytest module runs against one throwaway SQLite database with the
+outbox dispatcher off, so nothing is sent. The other test_*.py files in this
+directory are scripts that drive a running server over HTTP; pytest skips them.
+Run with: python -m pytest
+"""
+
+import os
+import tempfile
+
+import pytest
+
+os.environ.setdefault('DATABASE_URL', f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'test.db')}")
+os.environ.setdefault('OUTBOX_DISPATCHER', 'off')
+
+# Live-server scripts (python test_<name>.py against http://localhost:5000)
+collect_ignore = [
+    'test_admin_registration.py',
+    'test_approval.py',
+    'test_approval_workflow.py',
+    'test_complete_email_workflow.py',
+    'test_complete_workflow.py',
+    'test_direct_email.py',
+    'test_email_addresses.py',
+    'test_email_simple.py',
+    'test_employee_registration.py',
+    'test_manager_email.py',
+    'test_submission_emails.py',
+    'test_timestamp_display.py',
+    'test_updated_workflow.py',
+    'test_workflow.py',
+]
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app
+    return app
+
+
+@pytest.fixture
+def login(app):
+    """login(role) returns a test client signed in as that role's default manager"""
+    from models import Manager
+
+    def client_for(role='superadmin'):
+        client = app.test_client()
+        with app.app_context():
+            manager = Manager.query.filter_by(role=role).first()
+        with client.session_transaction() as session:
+            session['user_id'] = manager.id
+            session['user_role'] = role
+            session['user_name'] = manager.name
+        return client
+    return client_for
@@ -0,0 +1,349 @@
+"""
+Dashboard data service
+Loads everything a role dashboard needs in a handful of queries: positions,
+the team, request counts by status, who is out today, pending registrations
+and the first page of each status tab. The tabs are keyset-paged on
+(updated_at, id), newest first, like the workqueues (see pagination.py), so
+the dashboard costs the same however many open requests there are.
+
+The superadmin dashboard is a shell with headline counts and the pending
+queue; its request table is paged, filtered and sorted in SQL.
+
+The computed context is kept per role and reused until one of the data
+versions it was built from changes (see data_versions.py) or the date
+rolls over, so a repeat load costs a single version query. It holds plain
+dict snapshots of the rows rather than ORM instances, which belong to the
+session of the request that built them and must not be shared across
+requests and threads.
+"""
+
+import threading
+
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
+
+from database import db
+from models import PTORequest, TeamMember, Manager, Position, PendingEmployee, get_eastern_time
+from query_helpers import request_query
+from pagination import keyset_page, parse_page_size
+from business_days import get_pto_breakdown_batch
+from data_versions import MEMBERS, PENDING_EMPLOYEES, ALL_REQUESTS, requests_key, get_versions
+
+# Statuses shown on the role dashboards, and the context key of each one's tab
+OPEN_STATUSES = ('pending', 'in_progress', 'approved')
+STATUS_TABS = {'pending': 'requests', 'in_progress': 'in_progress_requests', 'approved': 'approved_requests'}
+
+# Superadmin request table: sortable columns and page sizes
+REQUEST_SORTS = {
+    'submitted': PTORequest.created_at,
+    'start_date': PTORequest.start_date,
+    'end_date': PTORequest.end_date,
+    'employee': TeamMember.name,
+    'type': PTORequest.pto_type,
+    'status': PTORequest.status,
+}
+DEFAULT_PAGE_SIZE = 25
+MAX_PAGE_SIZE = 100
+
+# Team members listed on a role dashboard; the rest are found with the team search
+TEAM_PREVIEW_SIZE = 25
+
+# cache key -> (version stamp, context); shared by all requests in this process
+_snapshots = {}
+_snapshots_lock = threading.Lock()
+
+
+def member_snapshot(member):
+    """Plain copy of a team member with the fields the dashboards show"""
+    if member is None:
+        return None
+    position = member.position
+    return {
+        'id': member.id,
+        'name': member.name,
+        'email': member.email,
+        'team': position.team if position else None,
+        'position': {'id': position.id, 'name': position.name, 'team': position.team} if position else None,
+    }
+
+
+def request_snapshots(requests):
+    """Plain copies of requests with the fields the dashboards show, including the
+    day breakdown (computed for all of them in one batch)"""
+    PTORequest.prime_durations(requests)
+    breakdown = get_pto_breakdown_batch([r.start_date for r in requests], [r.end_date for r in requests])
+    return [{
+        'id': req.id,
+        'status': req.status,
+        'pto_type': req.pto_type,
+        'start_date': req.start_date,
+        'end_date': req.end_date,
+        'start_time': req.start_time,
+        'end_time': req.end_time,
+        'is_partial_day': req.is_partial_day,
+        'is_call_out': req.is_call_out,
+        'reason': req.reason,
+        'coverage_arranged': req.coverage_arranged,
+        'timekeeping_entered': req.timekeeping_entered,
+        'submitted_at': req.submitted_at,
+        'duration_days': req.duration_days,
+        'duration_hours': req.duration_hours,
+        'pto_breakdown': {key: values[i] for key, values in breakdown.items()},
+        'member': member_snapshot(req.member),
+    } for i, req in enumerate(requests)]
+
+
+def pending_employee_snapshot(employee):
+    return {
+        'id': employee.id,
+        'name': employee.name,
+        'email': employee.email,
+        'team': employee.team,
+        'position': employee.position,
+        'submitted_at': employee.submitted_at,
+    }
+
+
+class DashboardService:
+    """Builds the template context for one role's dashboard"""
+
+    def __init__(self, role):
+        self.role = role
+        # Transient manager used only for its position-scoping rules; never added to the session
+        self.scope = Manager(role=role)
+
+    @property
+    def registration_team(self):
+        """Team whose pending registrations this dashboard shows"""
+        return 'admin' if self.role == 'admin' else 'clinical'
+
+    @property
+    def scopes_by_team(self):
+        """Admin/clinical managers own requests routed to their team; supervisors own their positions' members"""
+        return self.role in ('admin', 'clinical')
+
+    def get_positions(self):
+        """Positions this role can approve requests for"""
+        return [p for p in Position.query.all() if self.scope.can_approve_position(p)]
+
+    @staticmethod
+    def team_query(positions):
+        """Active team members in the given positions"""
+        return TeamMember.query.filter(
+            TeamMember.position_id.in_([p.id for p in positions]),
+            ~TeamMember.name.contains('[INACTIVE]')
+        )
+
+    def get_team_employees(self, positions, limit=TEAM_PREVIEW_SIZE):
+        """The first `limit` active team members by name, and how many there are in all"""
+        if not positions:
+            return [], 0
+        query = self.team_query(positions)
+        members = query.options(joinedload(TeamMember.position)).order_by(TeamMember.name).limit(limit).all()
+        total = len(members) if len(members) < limit else query.count()
+        return members, total
+
+    def scoped_requests(self, positions):
+        """Query for the requests in this role's scope"""
+        query = request_query()
+        if self.scopes_by_team:
+            return query.filter(PTORequest.manager_team == self.role)
+        members = self.team_query(positions).with_entities(TeamMember.id)
+        return query.filter(PTORequest.member_id.in_(members.scalar_subquery()))
+
+    @staticmethod
+    def get_status_counts(query):
+        """{status: count} for the open statuses in query"""
+        counts = dict(
+            query.filter(PTORequest.status.in_(OPEN_STATUSES))
+            .with_entities(PTORequest.status, func.count(PTORequest.id))
+            .group_by(PTORequest.status).all()
+        )
+        return {status: counts.get(status, 0) for status in OPEN_STATUSES}
+
+    @staticmethod
+    def get_status_page(query, status, cursor=None, per_page=None):
+        """One keyset page of a status tab, most recently changed first.
+        Raises ValueError for a malformed cursor."""
+        return keyset_page(query.filter(PTORequest.status == status), PTORequest.updated_at, PTORequest.id,
+                           cursor=cursor, per_page=parse_page_size(per_page))
+
+    @staticmethod
+    def get_currently_on_pto(query, today):
+        """Approved requests that cover today"""
+        return query.filter(
+            PTORequest.status == 'approved',
+            PTORequest.start_date <= today,
+            PTORequest.end_date >= today,
+        ).order_by(PTORequest.end_date, PTORequest.id).all()
+
+    @property
+    def version_keys(self):
+        """Data versions this role's dashboard is built from"""
+        keys = [MEMBERS, PENDING_EMPLOYEES]
+        if self.scopes_by_team:
+            keys.append(requests_key(self.role))
+        else:
+            keys.extend(ALL_REQUESTS)
+        return keys
+
+    def _cached(self, cache_key, builder):
+        """Return the cached context for cache_key, rebuilding it if its data versions moved"""
+        versions = get_versions(self.version_keys)
+        if versions is None:
+            return builder()
+
+        stamp = (tuple(sorted(versions.items())), get_eastern_time().date())
+        with _snapshots_lock:
+            cached = _snapshots.get(cache_key)
+        if cached and cached[0] == stamp:
+            return cached[1]
+
+        # Versions were read before building, so a write landing mid-build
+        # only makes the next load rebuild again
+        context = builder()
+        with _snapshots_lock:
+            _snapshots[cache_key] = (stamp, context)
+        return context
+
+    def get_context(self, args=None):
+        """Template context for dashboard_<role>.html. The first page of each status
+        tab comes from the cache; a <status>_cursor in args (with per_page) swaps in
+        a later page of that tab. Raises ValueError for a malformed cursor."""
+        context = self._cached(self.role, self.build_context)
+        args = args or {}
+        if not any(args.get(f'{status}_cursor') for status in OPEN_STATUSES):
+            return context
+
+        context = dict(context, pages=dict(context['pages']))
+        query = self.scoped_requests(self.get_positions())
+        for status, key in STATUS_TABS.items():
+            cursor = args.get(f'{status}_cursor')
+            if cursor:
+                page = self.get_status_page(query, status, cursor, args.get('per_page'))
+                context[key] = request_snapshots(page.items)
+                context['pages'][status] = {'next_cursor': page.next_cursor, 'per_page': page.per_page,
+                                            'cursor': cursor}
+        return context
+
+    def get_superadmin_context(self):
+        """Template context for the superadmin dashboard"""
+        return self._cached('superadmin', self.build_superadmin_context)
+
+    def build_context(self):
+        """Compute the role dashboard context from the database"""
+        positions = self.get_positions()
+        team_employees, team_size = self.get_team_employees(positions)
+        query = self.scoped_requests(positions)
+        pending_employees = [
+            pending_employee_snapshot(p)
+            for p in PendingEmployee.query.filter_by(status='pending', team=self.registration_team).all()
+        ]
+
+        counts = self.get_status_counts(query)
+        stats = {
+            'pending': counts['pending'],
+            'in_progress': counts['in_progress'],
+            'approved': counts['approved'],
+            'total': sum(counts.values()),
+            'team_members': team_size
+        }
+
+        context = {
+            'pending_employees': pending_employees,
+            'currently_on_pto': request_snapshots(self.get_currently_on_pto(query, get_eastern_time().date())),
+            'team_employees': [member_snapshot(m) for m in team_employees],
+            'stats': stats,
+            'pages': {},
+        }
+        for status, key in STATUS_TABS.items():
+            page = self.get_status_page(query, status)
+            context[key] = request_snapshots(page.items)
+            context['pages'][status] = {'next_cursor': page.next_cursor, 'per_page': page.per_page, 'cursor': None}
+        return context
+
+    def build_superadmin_context(self):
+        """Compute the superadmin page shell: headline counts and the pending queue.
+        The calendar and the full request table are fetched by the page from their APIs."""
+        counts = dict(
+            db.session.query(PTORequest.status, func.count(PTORequest.id))
+            .group_by(PTORequest.status).all()
+        )
+        pending_requests = request_snapshots(
+            request_query().filter(PTORequest.status == 'pending').order_by(PTORequest.id).all()
+        )
+
+        stats = {
+            'pending': counts.get('pending', 0),
+            'approved': counts.get('approved', 0),
+            'total': sum(counts.values()),
+            'team_members': TeamMember.query.count(),
+        }
+
+        return {
+            'pending_requests': pending_requests,
+            'stats': stats,
+        }
+
+    @staticmethod
+    def _request_table_query(status=None, kind=None, team=None, search=None):
+        """Superadmin request table query with filters applied.
+        kind is 'callout' or 'pto'; team is the employee's position team."""
+        query = request_query().join(PTORequest.member).outerjoin(TeamMember.position)
+        if status:
+            query = query.filter(PTORequest.status == status)
+        if kind == 'callout':
+            query = query.filter(PTORequest.is_call_out.is_(True))
+        elif kind == 'pto':
+            query = query.filter(PTORequest.is_call_out.isnot(True))
+        if team:
+            query = query.filter(Position.team == team)
+        if search:
+            query = query.filter(TeamMember.name.icontains(search, autoescape=True))
+        return query
+
+    @staticmethod
+    def _check_sort(sort, direction):
+        if sort not in REQUEST_SORTS:
+            raise ValueError(f'Unknown sort column: {sort}')
+        if direction not in ('asc', 'desc'):
+            raise ValueError(f'Unknown sort direction: {direction}')
+
+    @classmethod
+    def get_request_page(cls, status=None, kind=None, team=None, search=None,
+                         sort='submitted', direction='desc', page=1, per_page=DEFAULT_PAGE_SIZE):
+        """One numbered page of the superadmin request table, filtered and sorted in SQL.
+        Raises ValueError for an unknown sort column or direction."""
+        cls._check_sort(sort, direction)
+        query = cls._request_table_query(status, kind, team, search)
+
+        column = REQUEST_SORTS[sort]
+        if direction == 'desc':
+            query = query.order_by(column.desc(), PTORequest.id.desc())
+        else:
+            query = query.order_by(column.asc(), PTORequest.id.asc())
+
+        per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+        PTORequest.prime_durations(pagination.items)
+        return pagination
+
+    @classmethod
+    def get_request_feed(cls, status=None, kind=None, team=None, search=None,
+                         sort='submitted', direction='desc', cursor=None, per_page=DEFAULT_PAGE_SIZE):
+        """Cursor-paged superadmin request table for infinite scroll (see pagination.py).
+        Raises ValueError for an unknown sort column or direction, or a malformed cursor."""
+        cls._check_sort(sort, direction)
+        query = cls._request_table_query(status, kind, team, search)
+
+        column = REQUEST_SORTS[sort]
+        if sort == 'employee':
+            row_key = lambda req: (req.member.name, req.id)
+        else:
+            row_key = lambda req: (getattr(req, column.key), req.id)
+
+        per_page = max(1, min(per_page, MAX_PAGE_SIZE))
+        page = keyset_page(query, column, PTORequest.id, cursor=cursor, per_page=per_page,
+                           row_key=row_key, descending=direction == 'desc')
+        PTORequest.prime_durations(page.items)
+        return page
@@ -0,0 +1,89 @@
+"""
+Data version counters
+Each key names a data set that cached views are built from. Writers bump
+the key in the same transaction as their change; readers compare the
+stored versions with the ones their cache was built against. Because the
+counters live in the database, a bump on one worker invalidates caches on
+every worker.
+"""
+
+import logging
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models import DataVersion, get_eastern_time
+
+logger = logging.getLogger(__name__)
+
+# Team members and their positions (names, active status, balances)
+MEMBERS = 'members'
+# Employee registrations awaiting approval
+PENDING_EMPLOYEES = 'pending_employees'
+
+TEAMS = ('admin', 'clinical')
+
+
+def requests_key(team):
+    """Key for PTO requests routed to a manager team"""
+    return f'requests:{team}'
+
+
+ALL_REQUESTS = tuple(requests_key(team) for team in TEAMS)
+
+
+def bump(*keys):
+    """Increment the given counters in the current transaction; the caller commits"""
+    now = get_eastern_time()
+    for key in sorted(set(keys)):
+        result = db.session.execute(
+            update(DataVersion)
+            .where(DataVersion.key == key)
+            .values(version=DataVersion.version + 1, updated_at=now)
+        )
+        if result.rowcount:
+            continue
+        try:
+            with db.session.begin_nested():
+                db.session.add(DataVersion(key=key, version=1, updated_at=now))
+        except IntegrityError:
+            # Another worker created the row first; count this change on top of it
+            db.session.execute(
+                update(DataVersion)
+                .where(DataVersion.key == key)
+                .values(version=DataVersion.version + 1, updated_at=now)
+            )
+
+
+def bump_requests(*teams):
+    """Bump the request counters for the given manager teams (all teams if none given)"""
+    keys = [requests_key(team) for team in teams if team] or list(ALL_REQUESTS)
+    bump(*keys)
+
+
+def get_stamp(keys):
+    """Current counters for the keys plus the latest time any of them moved, in one query.
+    Returns (versions, last_modified); versions are 0 and last_modified None for keys
+    never bumped. Returns None if the counters can't be read."""
+    versions = dict.fromkeys(keys, 0)
+    try:
+        rows = db.session.query(DataVersion.key, DataVersion.version, DataVersion.updated_at).filter(
+            DataVersion.key.in_(list(keys))
+        ).all()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Could not read data versions: {e}")
+        return None
+    last_modified = None
+    for key, version, updated_at in rows:
+        versions[key] = version
+        if updated_at and (last_modified is None or updated_at > last_modified):
+            last_modified = updated_at
+    return versions, last_modified
+
+
+def get_versions(keys):
+    """Current counter for each key, in one query (0 for keys never bumped)"""
+    stamp = get_stamp(keys)
+    return stamp[0] if stamp else None
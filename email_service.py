@@ -5,8 +5,6 @@ Uses SendGrid API for reliable email delivery
 
 import os
 import logging
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, To, Content, HtmlContent
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -23,11 +21,17 @@ class EmailService:
         self.admin_email = os.getenv('ADMIN_EMAIL', 'admin@mswcvi.com')
         self.clinical_email = os.getenv('CLINICAL_EMAIL', 'clinical@mswcvi.com')
 
-        # Initialize SendGrid client
-        if self.sendgrid_api_key:
-            self.sg_client = SendGridAPIClient(self.sendgrid_api_key)
-        else:
-            self.sg_client = None
+        # SendGrid client, created on first send (see sg_client)
+        self._sg_client = None
+
+    @property
+    def sg_client(self):
+        """SendGrid client, or None without an API key. The sendgrid package is
+        imported on first use so app startup doesn't pay for it."""
+        if self._sg_client is None and self.sendgrid_api_key:
+            from sendgrid import SendGridAPIClient
+            self._sg_client = SendGridAPIClient(self.sendgrid_api_key)
+        return self._sg_client
 
     def send_email(self, to_email, subject, body_html=None, body_text=None):
         """Send email via SendGrid API"""
@@ -45,6 +49,8 @@ class EmailService:
             return False
 
         try:
+            from sendgrid.helpers.mail import Mail, Content
+
             # Create SendGrid message
             message = Mail(
                 from_email=self.from_email,
@@ -69,7 +75,8 @@ class EmailService:
             return False
 
     def send_submission_email(self, pto_request):
-        """Send email notifications when PTO request is submitted"""
+        """Send email notifications when PTO request is submitted.
+        Returns True only if every email was sent."""
 
         # Get employee and request details
         employee_name = pto_request.member.name
@@ -159,7 +166,7 @@ class EmailService:
         """
 
         # Send employee confirmation
-        self.send_email(employee_email, employee_subject, employee_body_html, employee_body_text)
+        sent = self.send_email(employee_email, employee_subject, employee_body_html, employee_body_text)
 
         # 2. Manager notification
         manager_email = self.admin_email if pto_request.manager_team == 'admin' else self.clinical_email
@@ -252,14 +259,15 @@ class EmailService:
         """
 
         # Send to manager
-        self.send_email(manager_email, manager_subject, manager_body_html, manager_body_text)
+        sent = self.send_email(manager_email, manager_subject, manager_body_html, manager_body_text) and sent
 
         # ALSO send notification to admin (ms15639@nyu.edu)
         admin_notification_email = "ms15639@nyu.edu"
         admin_subject = f"[PTO System] {'Call-Out Auto-Approved' if call_out_info else 'New PTO Request'} - {employee_name}"
-        self.send_email(admin_notification_email, admin_subject, manager_body_html, manager_body_text)
+        sent = self.send_email(admin_notification_email, admin_subject, manager_body_html, manager_body_text) and sent
 
-        return True
+        # False when any of the three failed, so the outbox retries the notification
+        return sent
 
     def send_approval_email(self, pto_request):
         """Send email notification when PTO request is approved"""
@@ -494,9 +502,8 @@ def send_submission_email(request_data, request_id):
         pto_request = PTORequest.query.get(request_id)
 
         if pto_request:
-            # Create EmailService instance and send
-            service = EmailService()
-            return service.send_submission_email(pto_request)
+            from services import get_email_service
+            return get_email_service().send_submission_email(pto_request)
         else:
             logger.error(f"PTO Request {request_id} not found for email notification")
             return False
@@ -0,0 +1,227 @@
+"""
+Employee search
+Typeahead search over active team members' names, emails and positions.
+Every word typed must match the name, email or position: as a word prefix
+with FTS5 and in memory, as a substring with pg_trgm.
+
+Backends, picked once per process by init_search_index():
+- sqlite: an FTS5 table (employee_search_fts) with prefix indexes, refilled
+  from users/positions whenever the members data version moves. The members
+  version it was filled from is stored in data_versions (INDEX_KEY), so one
+  process refills the shared table after a change rather than every worker
+- postgresql: pg_trgm GIN indexes on users.name and users.email, queried
+  with ILIKE and ranked by similarity
+- memory: a per-process list rebuilt per members version, used when the
+  database has neither extension
+"""
+
+import logging
+import re
+import threading
+
+from sqlalchemy import func, literal_column, or_, table, column, text, update
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models import DataVersion, TeamMember, Position, get_eastern_time
+import data_versions
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 200
+MAX_TOKENS = 5
+
+FTS_TABLE = 'employee_search_fts'
+_fts = table(FTS_TABLE, column('rowid'))
+_fts_column = literal_column(FTS_TABLE)
+# data_versions row holding the members version the FTS table was filled from
+INDEX_KEY = 'employee_search_fts'
+
+_backend = None
+# members version the memory index was built from (per process)
+_indexed_version = None
+_memory_entries = []
+_lock = threading.Lock()
+
+
+def _words(value):
+    """Lowercased words of a string; letters and digits only, so they are safe
+    inside FTS5 strings and LIKE patterns"""
+    return re.findall(r'[^\W_]+', (value or '').lower())
+
+
+def _tokens(query):
+    return _words(query)[:MAX_TOKENS]
+
+
+def init_search_index():
+    """Pick the search backend for this database and create its index. Safe to call on every startup."""
+    global _backend
+    dialect = db.engine.dialect.name
+
+    if dialect == 'sqlite':
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text(
+                    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+                    "USING fts5(name, email, position, prefix='2 3')"
+                ))
+            _ensure_index_marker()
+            _backend = 'sqlite'
+            return _backend
+        except Exception as e:
+            logger.warning(f"FTS5 unavailable, using in-memory employee search: {e}")
+
+    elif dialect == 'postgresql':
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+                conn.execute(text('CREATE INDEX IF NOT EXISTS ix_users_name_trgm ON users USING gin (name gin_trgm_ops)'))
+                conn.execute(text('CREATE INDEX IF NOT EXISTS ix_users_email_trgm ON users USING gin (email gin_trgm_ops)'))
+            _backend = 'postgresql'
+            return _backend
+        except Exception as e:
+            logger.warning(f"pg_trgm unavailable, using in-memory employee search: {e}")
+
+    _backend = 'memory'
+    return _backend
+
+
+def _member_query(position_ids):
+    """(id, name, email, position, team) of active team members, optionally limited to positions"""
+    query = db.session.query(
+        TeamMember.id, TeamMember.name, TeamMember.email, Position.name, Position.team
+    ).join(TeamMember.position).filter(~TeamMember.name.contains('[INACTIVE]'))
+    if position_ids is not None:
+        query = query.filter(TeamMember.position_id.in_(position_ids))
+    return query
+
+
+def _as_dicts(rows):
+    return [{
+        'id': member_id,
+        'name': name,
+        'email': email,
+        'position': position,
+        'team': team,
+    } for member_id, name, email, position, team in rows]
+
+
+def _ensure_index_marker():
+    """Create the FTS table's data_versions row, marked as never filled (-1)"""
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(DataVersion.__table__.insert().values(
+                key=INDEX_KEY, version=-1, updated_at=get_eastern_time()
+            ))
+    except IntegrityError:
+        pass
+
+
+def _refresh_fts():
+    """Refill the shared FTS table if the members version moved since it was filled"""
+    versions = data_versions.get_versions([data_versions.MEMBERS, INDEX_KEY])
+    if versions is None or versions[INDEX_KEY] == versions[data_versions.MEMBERS]:
+        return
+    members_version = versions[data_versions.MEMBERS]
+
+    # Own connection and transaction, so the caller's session is untouched. Moving the
+    # marker first takes SQLite's write lock, so a process that loses the race finds
+    # the marker already moved and leaves the table to the winner.
+    with db.engine.begin() as conn:
+        claimed = conn.execute(
+            update(DataVersion)
+            .where(DataVersion.key == INDEX_KEY, DataVersion.version != members_version)
+            .values(version=members_version, updated_at=get_eastern_time())
+        ).rowcount
+        if not claimed:
+            return
+        conn.execute(text(f'DELETE FROM {FTS_TABLE}'))
+        conn.execute(text(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, email, position) '
+            'SELECT u.id, u.name, u.email, p.name FROM users u '
+            'JOIN team_members tm ON tm.id = u.id '
+            'LEFT JOIN positions p ON p.id = tm.position_id'
+        ))
+
+
+def _refresh_memory():
+    """Rebuild this process's memory index if the members version moved since it was built"""
+    global _indexed_version, _memory_entries
+
+    versions = data_versions.get_versions([data_versions.MEMBERS])
+    version = versions[data_versions.MEMBERS] if versions else None
+    with _lock:
+        if version is not None and version == _indexed_version:
+            return
+        rows = _member_query(None).add_columns(TeamMember.position_id).all()
+        _memory_entries = [
+            (row[:5], row[5], set(_words(f'{row[1]} {row[2]} {row[3]}')))
+            for row in rows
+        ]
+        _indexed_version = version
+
+
+def _search_sqlite(tokens, position_ids, limit):
+    match = ' '.join(f'"{token}"*' for token in tokens)
+    rows = _member_query(position_ids).join(_fts, _fts.c.rowid == TeamMember.id).filter(
+        _fts_column.op('MATCH')(match)
+    ).order_by(
+        # Name matches outrank email and position matches
+        func.bm25(_fts_column, 10.0, 2.0, 1.0), TeamMember.name
+    ).limit(limit).all()
+    return _as_dicts(rows)
+
+
+def _search_postgresql(tokens, position_ids, limit):
+    query = _member_query(position_ids)
+    for token in tokens:
+        pattern = f'%{token}%'
+        query = query.filter(or_(
+            TeamMember.name.ilike(pattern),
+            TeamMember.email.ilike(pattern),
+            Position.name.ilike(pattern),
+        ))
+    rows = query.order_by(
+        func.similarity(TeamMember.name, ' '.join(tokens)).desc(), TeamMember.name
+    ).limit(limit).all()
+    return _as_dicts(rows)
+
+
+def _search_memory(tokens, position_ids, limit):
+    allowed = set(position_ids) if position_ids is not None else None
+    phrase = ' '.join(tokens)
+    scored = []
+    for row, position_id, words in _memory_entries:
+        if allowed is not None and position_id not in allowed:
+            continue
+        if all(any(word.startswith(token) for word in words) for token in tokens):
+            name = row[1].lower()
+            scored.append((not name.startswith(phrase), name, row))
+    scored.sort(key=lambda item: item[:2])
+    return _as_dicts(row for _, _, row in scored[:limit])
+
+
+def search_employees(query, position_ids=None, limit=DEFAULT_LIMIT):
+    """Top matches for query among active team members, best first.
+    position_ids limits the search to those positions (None for all).
+    An empty query lists members by name."""
+    limit = max(1, min(limit, MAX_LIMIT))
+    if position_ids is not None and not position_ids:
+        return []
+
+    tokens = _tokens(query)
+    if not tokens:
+        return _as_dicts(_member_query(position_ids).order_by(TeamMember.name).limit(limit).all())
+
+    if _backend is None:
+        init_search_index()
+
+    if _backend == 'sqlite':
+        _refresh_fts()
+        return _search_sqlite(tokens, position_ids, limit)
+    if _backend == 'postgresql':
+        return _search_postgresql(tokens, position_ids, limit)
+    _refresh_memory()
+    return _search_memory(tokens, position_ids, limit)
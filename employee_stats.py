@@ -0,0 +1,138 @@
+"""
+Employee statistics
+Computes the numbers on the employee detail page with one grouped aggregate
+over the employee's requests and tardiness totals from the usage rollups,
+instead of loading every row and filtering it in Python.
+
+Day totals sum the stored business_days column, which is filled on save and
+backfilled at startup (see backfill_request_durations in app.py).
+"""
+
+from sqlalchemy import case, func
+
+from database import db
+from models import PTORequest, UsageRollup
+from usage_rollups import TARDINESS
+
+HOURS_PER_DAY = 7.5
+
+
+def _bucket(groups):
+    """count/days/hours for a set of aggregate groups"""
+    count = sum(g['count'] for g in groups)
+    days = sum(g['days'] for g in groups)
+    return {
+        'count': count,
+        'days': round(days, 1),
+        'hours': round(days * HOURS_PER_DAY, 1),
+    }
+
+
+def _days(groups):
+    return sum(g['days'] for g in groups)
+
+
+def get_request_groups(member_id, today):
+    """One row per (status, type, call-out, classification, past) combination
+    with its request count and business-day total"""
+    is_past = case((PTORequest.end_date <= today, True), else_=False)
+    rows = db.session.query(
+        PTORequest.status,
+        PTORequest.pto_type,
+        PTORequest.is_call_out,
+        PTORequest.callout_classification,
+        is_past,
+        func.count(PTORequest.id),
+        func.coalesce(func.sum(PTORequest.business_days), 0),
+    ).filter(
+        PTORequest.member_id == member_id
+    ).group_by(
+        PTORequest.status,
+        PTORequest.pto_type,
+        PTORequest.is_call_out,
+        PTORequest.callout_classification,
+        is_past,
+    ).all()
+
+    return [{
+        'status': status,
+        'pto_type': pto_type,
+        'is_call_out': bool(is_call_out),
+        'classification': classification,
+        'past': bool(past),
+        'count': count,
+        'days': days or 0,
+    } for status, pto_type, is_call_out, classification, past, count, days in rows]
+
+
+def get_request_stats(member_id, today):
+    """Request counts and day/hour totals for the employee detail page"""
+    groups = get_request_groups(member_id, today)
+
+    def where(**conditions):
+        return [g for g in groups if all(g[k] == v for k, v in conditions.items())]
+
+    approved = where(status='approved')
+    approved_pto = [g for g in approved if not g['is_call_out'] and g['pto_type'] != 'Sick']
+    approved_sick = [g for g in approved if not g['is_call_out'] and g['pto_type'] == 'Sick']
+    approved_callouts = [g for g in approved if g['is_call_out']]
+
+    # COMPLETED: approved requests whose end date has passed
+    completed = [g for g in approved if g['past']]
+    completed_pto_days = _days([g for g in approved_pto if g['past']])
+    completed_sick_days = _days([g for g in approved_sick if g['past']])
+    completed_callout_days = _days([g for g in approved_callouts if g['past']])
+
+    type_breakdown = {
+        'vacation': _bucket([g for g in completed if not g['is_call_out'] and g['pto_type'] == 'Vacation']),
+        'personal': _bucket([g for g in completed if not g['is_call_out'] and g['pto_type'] == 'Personal']),
+        'sick_regular': _bucket([g for g in completed if not g['is_call_out'] and g['pto_type'] == 'Sick']),
+        'sick_callout': _bucket([g for g in completed if g['is_call_out'] and (g['classification'] or 'sick') == 'sick']),
+        'fmla_callout': _bucket([g for g in completed if g['is_call_out'] and g['classification'] == 'fmla']),
+        'union_business': _bucket([g for g in completed if not g['is_call_out'] and g['pto_type'] == 'Union Business']),
+    }
+
+    # ALL APPROVED: regardless of date
+    all_pto_days = _days(approved_pto)
+    all_sick_days = _days(approved_sick)
+    all_callout_days = _days(approved_callouts)
+
+    return {
+        'total_requests': sum(g['count'] for g in groups),
+        'approved_requests': sum(g['count'] for g in approved),
+        'pending_requests': sum(g['count'] for g in where(status='pending')),
+        'denied_requests': sum(g['count'] for g in where(status='denied')),
+        'total_callouts': sum(g['count'] for g in where(is_call_out=True)),
+        'approved_callouts': sum(g['count'] for g in approved_callouts),
+        'pending_callouts': sum(g['count'] for g in where(status='pending', is_call_out=True)),
+        # Completed (past dates only)
+        'completed_pto_days': round(completed_pto_days, 1),
+        'completed_pto_hours': round(completed_pto_days * HOURS_PER_DAY, 1),
+        'completed_sick_days': round(completed_sick_days, 1),
+        'completed_sick_hours': round(completed_sick_days * HOURS_PER_DAY, 1),
+        'completed_callout_days': round(completed_callout_days, 1),
+        'completed_callout_hours': round(completed_callout_days * HOURS_PER_DAY, 1),
+        # All approved (including future)
+        'all_pto_days': round(all_pto_days, 1),
+        'all_pto_hours': round(all_pto_days * HOURS_PER_DAY, 1),
+        'all_sick_days': round(all_sick_days, 1),
+        'all_sick_hours': round(all_sick_days * HOURS_PER_DAY, 1),
+        'all_callout_days': round(all_callout_days, 1),
+        'all_callout_hours': round(all_callout_days * HOURS_PER_DAY, 1),
+        'type_breakdown': type_breakdown,
+    }
+
+
+def get_tardiness_stats(member_id):
+    """Incident count and total minutes late, summed from the yearly usage rollups"""
+    count, minutes = db.session.query(
+        func.coalesce(func.sum(UsageRollup.count), 0),
+        func.coalesce(func.sum(UsageRollup.minutes), 0),
+    ).filter(
+        UsageRollup.member_id == member_id,
+        UsageRollup.category == TARDINESS,
+    ).one()
+    return {
+        'total_tardiness': count,
+        'total_tardiness_minutes': minutes,
+    }
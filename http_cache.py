@@ -0,0 +1,74 @@
+"""
+HTTP caching for JSON APIs
+Every open dashboard re-fetches the calendar and directory endpoints. Their
+ETag and Last-Modified validators come from the data version counters (see
+data_versions.py), so a client whose copy is current gets 304 Not Modified
+after one version query, without the endpoint's own queries or serialization.
+"""
+
+import hashlib
+from datetime import datetime
+
+import pytz
+from flask import request, make_response
+
+from data_versions import get_stamp
+from models import EASTERN
+
+
+def _not_modified(etag, last_modified):
+    """True if the request's validators match the current etag/last_modified"""
+    if request.if_none_match:
+        # If-None-Match takes precedence over If-Modified-Since. Weak comparison,
+        # since compressed responses carry the tag as weak (see compression.py)
+        return request.if_none_match.contains_weak(etag) or request.if_none_match.star_tag
+    if last_modified is not None and request.if_modified_since is not None:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since
+    return False
+
+
+def _respond(builder, etag, last_modified, cache_control):
+    """304 when the client is current, otherwise builder()'s response with validators set"""
+    if _not_modified(etag, last_modified):
+        response = make_response('', 304)
+    else:
+        response = make_response(builder())
+        if response.status_code != 200:
+            return response
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+
+def versioned_response(keys, builder):
+    """
+    Serve builder() with validators derived from the given data version keys.
+    builder is only called when the client's cached copy is stale. Clients must
+    revalidate on every use, so a write shows up on their next fetch.
+    """
+    stamp = get_stamp(keys)
+    if stamp is None:
+        return builder()
+    versions, last_modified = stamp
+
+    # The URL is part of the tag so a query-string change never matches another response
+    source = f"{request.full_path}|{sorted(versions.items())}"
+    etag = hashlib.sha1(source.encode()).hexdigest()
+    if last_modified is not None:
+        # Counters are stamped in naive Eastern time; HTTP dates are UTC
+        last_modified = EASTERN.localize(last_modified).astimezone(pytz.utc)
+    return _respond(builder, etag, last_modified, 'private, no-cache')
+
+
+def yearly_response(year, builder):
+    """
+    Serve builder() for data that depends only on the year: publicly cacheable
+    until the next New Year (Eastern), with an ETag for revalidation after that.
+    """
+    now = datetime.now(EASTERN)
+    next_year = EASTERN.localize(datetime(now.year + 1, 1, 1))
+    max_age = max(int((next_year - now).total_seconds()), 0)
+    etag = hashlib.sha1(f"{request.full_path}|{year}".encode()).hexdigest()
+    return _respond(builder, etag, None, f'public, max-age={max_age}')
@@ -0,0 +1,59 @@
+"""
+Fast JSON provider
+Serializes jsonify() responses and |tojson template data with orjson when it
+is installed, falling back to Flask's standard provider otherwise. Output
+matches the standard provider: keys sorted, dates in HTTP-date format,
+Decimals as strings.
+"""
+
+import logging
+
+from flask.json.provider import DefaultJSONProvider
+
+logger = logging.getLogger(__name__)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """DefaultJSONProvider with orjson doing the encoding and decoding"""
+
+    if orjson is not None:
+        # Dates and datetimes go through DefaultJSONProvider.default (HTTP dates),
+        # the same as the standard provider, instead of orjson's ISO format
+        OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+
+    def _dumps_bytes(self, obj):
+        return orjson.dumps(obj, default=self.default, option=self.OPTIONS)
+
+    def dumps(self, obj, **kwargs):
+        # |tojson passes sort_keys=True, which orjson already does. Other
+        # formatting options (indent, ensure_ascii, ...) get stdlib output.
+        if kwargs.get('sort_keys', True):
+            kwargs.pop('sort_keys', None)
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return self._dumps_bytes(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if self._app.debug and self.compact is None:
+            # Pretty-printed output in debug mode, as with the standard provider
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self._dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """Use orjson for app.json when available"""
+    if orjson is None:
+        logger.info("orjson not installed; using the standard JSON provider")
+        return
+    app.json = OrjsonProvider(app)
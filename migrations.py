@@ -0,0 +1,182 @@
+"""
+Startup migrations
+Applies the numbered startup steps (table creation, column and index
+migrations, seeding, backfills) once each, recording every applied step in
+the schema_version table.
+
+Once the database is current, startup costs a single
+SELECT max(version) FROM schema_version. When it is behind, one process at
+a time takes the lease in schema_lock, applies the missing steps in order
+and releases it; other processes wait for the lease holder to finish rather
+than running the steps alongside it. A lease left behind by a crashed
+process expires after LEASE_SECONDS; while a step runs, a heartbeat thread
+renews the lease every HEARTBEAT_SECONDS so a long step isn't mistaken for a
+crashed one. If the lease is lost anyway, the run stops with LeaseLost before
+the next step or version record, leaving the rest to the new owner.
+
+Steps are (version, name, function) tuples. Never renumber or edit a step
+that has shipped; append a new one with the next version instead. A step
+must raise when it can't finish: a step that returns is recorded as applied
+and never runs again, while one that raises stays pending (and stops startup)
+until it succeeds.
+"""
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import func, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models import SchemaVersion, SchemaLock, get_eastern_time
+
+logger = logging.getLogger(__name__)
+
+LOCK_ID = 1
+LEASE_SECONDS = 300
+HEARTBEAT_SECONDS = LEASE_SECONDS / 3
+WAIT_SECONDS = 600
+POLL_SECONDS = 0.5
+
+
+def current_version():
+    """Highest applied step, or 0 when nothing has been applied (or the table doesn't exist yet)"""
+    try:
+        return db.session.query(func.max(SchemaVersion.version)).scalar() or 0
+    except Exception:
+        db.session.rollback()
+        return 0
+
+
+def _ensure_tables():
+    for model in (SchemaVersion, SchemaLock):
+        model.__table__.create(db.engine, checkfirst=True)
+    try:
+        db.session.execute(insert(SchemaLock).values(id=LOCK_ID))
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+
+
+def _acquire(owner):
+    """Take the lease if it is free or expired; True when this process holds it"""
+    now = get_eastern_time()
+    taken = db.session.execute(
+        update(SchemaLock)
+        .where(SchemaLock.id == LOCK_ID)
+        .where(or_(SchemaLock.owner.is_(None), SchemaLock.owner == owner, SchemaLock.expires_at < now))
+        .values(owner=owner, expires_at=now + timedelta(seconds=LEASE_SECONDS))
+    ).rowcount
+    db.session.commit()
+    return taken == 1
+
+
+def _renew(engine, owner):
+    """Extend the lease on a connection of its own, outside the step's transaction"""
+    with engine.begin() as connection:
+        return connection.execute(
+            update(SchemaLock)
+            .where(SchemaLock.id == LOCK_ID, SchemaLock.owner == owner)
+            .values(expires_at=get_eastern_time() + timedelta(seconds=LEASE_SECONDS))
+        ).rowcount == 1
+
+
+class LeaseLost(RuntimeError):
+    """Raised when another process took over the migration lease mid-run"""
+
+
+def _heartbeat(engine, owner, stop, lost):
+    """Renew the lease until stop is set; set lost once it has been taken over or has expired"""
+    renewed = time.monotonic()
+    while not stop.wait(HEARTBEAT_SECONDS):
+        try:
+            if not _renew(engine, owner):
+                logger.error("Migration lease was taken over by another process while a step was running")
+                lost.set()
+                return
+            renewed = time.monotonic()
+        except Exception as e:
+            logger.warning(f"Could not renew the migration lease: {e}")
+            if time.monotonic() - renewed >= LEASE_SECONDS:
+                lost.set()
+                return
+
+
+def _check_lease(lost):
+    if lost.is_set():
+        raise LeaseLost('Lost the migration lease to another process; stopping so it can finish')
+
+
+def _release(owner):
+    try:
+        db.session.execute(
+            update(SchemaLock)
+            .where(SchemaLock.id == LOCK_ID, SchemaLock.owner == owner)
+            .values(owner=None, expires_at=None)
+        )
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.warning(f"Could not release the migration lock: {e}")
+
+
+def run_pending(steps):
+    """Apply every step newer than the recorded version, in order.
+    Returns the number of steps applied by this process."""
+    versions = [version for version, _, _ in steps]
+    if versions != sorted(set(versions)):
+        raise ValueError('Migration versions must be unique and increasing')
+    target = versions[-1] if versions else 0
+
+    if current_version() >= target:
+        return 0
+
+    _ensure_tables()
+    owner = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+    deadline = time.monotonic() + WAIT_SECONDS
+    while not _acquire(owner):
+        if current_version() >= target:
+            return 0
+        if time.monotonic() > deadline:
+            raise RuntimeError('Timed out waiting for another process to finish migrations')
+        time.sleep(POLL_SECONDS)
+
+    applied = 0
+    stop = threading.Event()
+    lost = threading.Event()
+    heartbeat = threading.Thread(
+        target=_heartbeat, args=(db.engine, owner, stop, lost), name='migration-lease', daemon=True
+    )
+    heartbeat.start()
+    try:
+        # Re-read under the lease: another process may have applied steps meanwhile
+        version = current_version()
+        for step_version, name, step in steps:
+            if step_version <= version:
+                continue
+            _check_lease(lost)
+            started = time.perf_counter()
+            step()
+            duration_ms = int((time.perf_counter() - started) * 1000)
+            db.session.add(SchemaVersion(
+                version=step_version, name=name,
+                applied_at=get_eastern_time(), duration_ms=duration_ms,
+            ))
+            # Without the lease the step stays pending for the new owner to run
+            _check_lease(lost)
+            db.session.commit()
+            applied += 1
+            logger.info(f"Applied migration {step_version} {name} ({duration_ms} ms)")
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        stop.set()
+        heartbeat.join()
+        _release(owner)
+    return applied
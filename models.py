@@ -1,8 +1,9 @@
 from database import db
 from datetime import datetime
 import pytz
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Numeric, Date
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Boolean, Numeric, Date, Index
+from sqlalchemy.orm import relationship, validates
+from business_days import parse_date
 
 # Define Eastern timezone
 EASTERN = pytz.timezone('US/Eastern')
@@ -13,14 +14,38 @@ def get_eastern_time():
     # Return naive datetime (no timezone info) but in Eastern time
     return eastern_now.replace(tzinfo=None)
 
+def normalize_phone(raw):
+    """Normalize a phone number to +1XXXXXXXXXX format"""
+    if not raw:
+        return ''
+    digits = ''.join(ch for ch in raw if ch.isdigit())
+    if len(digits) == 10:
+        return f'+1{digits}'
+    if len(digits) == 11 and digits.startswith('1'):
+        return f'+{digits}'
+    # Fall back to original if unexpected length
+    return raw.strip()
+
+def phone_to_e164(raw):
+    """Return the +1XXXXXXXXXX form of a phone number, or None if it isn't a valid US number"""
+    normalized = normalize_phone(raw)
+    if len(normalized) == 12 and normalized.startswith('+1') and normalized[2:].isdigit():
+        return normalized
+    return None
+
 class User(db.Model):
     """Base user class"""
     __tablename__ = 'users'
+    __table_args__ = (
+        # Twilio sender authentication looks callers up by normalized number
+        Index('ix_users_phone_e164', 'phone_e164', unique=True),
+    )
     
     id = Column(Integer, primary_key=True)
     name = Column(String(100), nullable=False)
     email = Column(String(120), unique=True, nullable=False)
     phone = Column(String(20), nullable=True)  # Phone number field
+    phone_e164 = Column(String(16), nullable=True)  # Normalized copy of phone, kept in sync by set_phone_e164
     pin = Column(String(4), nullable=True)  # 4-digit PIN for phone authentication via Twilio
     pto_balance_hours = Column(Numeric(5,2), default=60.0)  # Current remaining PTO balance in hours
     sick_balance_hours = Column(Numeric(5,2), default=60.0)  # Current remaining sick time balance in hours
@@ -36,6 +61,12 @@ class User(db.Model):
             self.name = name
         if email:
             self.email = email
+
+    @validates('phone')
+    def set_phone_e164(self, key, value):
+        """Keep phone_e164 in sync whenever phone is written"""
+        self.phone_e164 = phone_to_e164(value)
+        return value
     
     @property
     def pto_balance_days(self):
@@ -206,11 +237,21 @@ class Manager(User):
 class PTORequest(db.Model):
     """PTO Request model"""
     __tablename__ = 'pto_requests'
+    __table_args__ = (
+        # "Who is out" and calendar-window queries: team + status, then a date range
+        Index('ix_pto_requests_team_status_dates', 'manager_team', 'status', 'start_date', 'end_date'),
+        # Employee detail page: a member's requests, newest first
+        Index('ix_pto_requests_member_created', 'member_id', 'created_at'),
+        # Workqueues and auto-completion: status, then end date
+        Index('ix_pto_requests_status_end', 'status', 'end_date'),
+        # Workqueue keyset pagination: status, newest change first (see pagination.py)
+        Index('ix_pto_requests_status_updated', 'status', 'updated_at', 'id'),
+    )
     
     id = Column(Integer, primary_key=True)
     member_id = Column(Integer, ForeignKey('team_members.id'), nullable=False)
-    start_date = Column(String(10), nullable=False)  # YYYY-MM-DD format
-    end_date = Column(String(10), nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
     pto_type = Column(String(50), nullable=False)  # vacation, sick, etc.
     status = Column(String(20), default='pending')  # pending, in_progress, approved, denied, completed
     manager_team = Column(String(20), nullable=False)  # which manager should handle this
@@ -226,6 +267,10 @@ class PTORequest(db.Model):
     is_call_out = Column(Boolean, default=False)  # True for call-out (today only) requests
     callout_classification = Column(String(10))  # 'sick' or 'fmla' (only meaningful when is_call_out=True)
 
+    # Stored duration, kept in sync by refresh_duration() so listings and SUMs don't recompute it
+    business_days = Column(Integer)  # Business days in the date range
+    total_hours = Column(Numeric(6, 2))  # Hours charged (partial-day hours or 7.5 per business day)
+
     # Workflow tracking
     timekeeping_entered = Column(Boolean, default=False)  # Checkbox for timekeeping
     coverage_arranged = Column(Boolean, default=False)  # Checkbox for coverage
@@ -244,9 +289,9 @@ class PTORequest(db.Model):
         if member:
             self.member = member
         if start_date:
-            self.start_date = start_date
+            self.start_date = parse_date(start_date)
         if end_date:
-            self.end_date = end_date
+            self.end_date = parse_date(end_date)
         if pto_type:
             self.pto_type = pto_type
         if manager_team:
@@ -259,27 +304,53 @@ class PTORequest(db.Model):
         self.end_time = end_time
         self.reason = reason
         self.is_call_out = is_call_out
+        if self.start_date and self.end_date:
+            self.refresh_duration()
     
     # Relationships
     member = relationship("TeamMember", back_populates="pto_requests")
     
+    @staticmethod
+    def prime_durations(requests):
+        """Compute duration_days for a whole result set with one batch call.
+        Only rows without a stored business_days value need it."""
+        from business_days import calculate_pto_days_batch
+        requests = [r for r in requests if r.business_days is None and r.start_date and r.end_date]
+        days = calculate_pto_days_batch([r.start_date for r in requests], [r.end_date for r in requests])
+        for r, d in zip(requests, days):
+            r._duration_cache = (r.start_date, r.end_date, d)
+
     @property
     def duration_days(self):
-        """Calculate duration in business days (excludes weekends and holidays)"""
-        try:
-            from business_days import calculate_pto_days
-            return calculate_pto_days(self.start_date, self.end_date)
-        except (ValueError, TypeError, ImportError):
-            # Fallback to calendar days if business_days module fails
-            try:
-                start = datetime.strptime(self.start_date, '%Y-%m-%d')
-                end = datetime.strptime(self.end_date, '%Y-%m-%d')
-                return (end - start).days + 1
-            except (ValueError, TypeError):
-                return 1
-    
+        """Duration in business days (excludes weekends and holidays)"""
+        if self.business_days is not None:
+            return self.business_days
+        return self._compute_duration_days()
+
     @property
     def duration_hours(self):
+        """Duration in hours (7.5 hours = 1 business day)"""
+        if self.total_hours is not None:
+            return float(self.total_hours)
+        return self._compute_duration_hours(self.duration_days)
+
+    def refresh_duration(self):
+        """Recompute and store business_days/total_hours from the dates and times.
+        Call after changing start_date, end_date or the partial-day times."""
+        self.business_days = self._compute_duration_days()
+        self.total_hours = self._compute_duration_hours(self.business_days)
+
+    def _compute_duration_days(self):
+        """Calculate duration in business days (excludes weekends and holidays)"""
+        cached = getattr(self, '_duration_cache', None)
+        if cached and cached[0] == self.start_date and cached[1] == self.end_date:
+            return cached[2]
+        if not self.start_date or not self.end_date:
+            return 1
+        from business_days import calculate_pto_days
+        return calculate_pto_days(self.start_date, self.end_date)
+
+    def _compute_duration_hours(self, days):
         """Calculate duration in hours (7.5 hours = 1 business day)"""
         try:
             if self.is_partial_day and self.start_time and self.end_time:
@@ -294,38 +365,14 @@ class PTORequest(db.Model):
                 return round(total_minutes / 60, 2)
             else:
                 # Full day calculation: 7.5 hours per business day
-                return self.duration_days * 7.5
+                return days * 7.5
         except:
             return 7.5
 
     def get_pto_breakdown(self):
         """Get detailed breakdown of PTO request including holidays and weekends"""
-        try:
-            from business_days import get_pto_breakdown
-            return get_pto_breakdown(self.start_date, self.end_date)
-        except (ImportError, ValueError, TypeError):
-            # Fallback breakdown
-            try:
-                start = datetime.strptime(self.start_date, '%Y-%m-%d')
-                end = datetime.strptime(self.end_date, '%Y-%m-%d')
-                total_days = (end - start).days + 1
-                return {
-                    'total_days': total_days,
-                    'business_days': total_days,  # Fallback assumes all are business days
-                    'weekend_days': 0,
-                    'holiday_days': 0,
-                    'holidays_list': [],
-                    'weekends_list': []
-                }
-            except (ValueError, TypeError):
-                return {
-                    'total_days': 1,
-                    'business_days': 1,
-                    'weekend_days': 0,
-                    'holiday_days': 0,
-                    'holidays_list': [],
-                    'weekends_list': []
-                }
+        from business_days import get_pto_breakdown
+        return get_pto_breakdown(self.start_date, self.end_date)
 
     def __repr__(self):
         return f'<PTORequest {self.id} - {self.member.name if self.member else "Unknown"} - {self.status}>'
@@ -368,6 +415,10 @@ class PendingEmployee(db.Model):
 class CallOutRecord(db.Model):
     """Model for tracking SMS call-out submissions via Twilio"""
     __tablename__ = 'call_out_records'
+    __table_args__ = (
+        Index('ix_call_out_records_pto_request', 'pto_request_id'),
+        Index('ix_call_out_records_member', 'member_id'),
+    )
 
     id = Column(Integer, primary_key=True)
     member_id = Column(Integer, ForeignKey('team_members.id'), nullable=False)
@@ -408,12 +459,15 @@ class CallOutRecord(db.Model):
 class TardinessRecord(db.Model):
     """Model for tracking employee tardiness"""
     __tablename__ = 'tardiness_records'
+    __table_args__ = (
+        Index('ix_tardiness_records_member_date', 'member_id', 'date'),
+    )
 
     id = Column(Integer, primary_key=True)
     member_id = Column(Integer, ForeignKey('team_members.id'), nullable=False)
 
     # Tardiness details
-    date = Column(String(10), nullable=False)  # YYYY-MM-DD format
+    date = Column(Date, nullable=False)
     minutes_late = Column(Integer, nullable=False)  # How many minutes late
     reason = Column(Text, nullable=True)  # Optional reason/notes
 
@@ -428,7 +482,7 @@ class TardinessRecord(db.Model):
         if member_id:
             self.member_id = member_id
         if date:
-            self.date = date
+            self.date = parse_date(date)
         if minutes_late:
             self.minutes_late = minutes_late
         if reason:
@@ -460,12 +514,101 @@ class SMSRecipient(db.Model):
     @staticmethod
     def normalize_phone(raw):
         """Normalize a phone number to +1XXXXXXXXXX format"""
-        if not raw:
-            return ''
-        digits = ''.join(ch for ch in raw if ch.isdigit())
-        if len(digits) == 10:
-            return f'+1{digits}'
-        if len(digits) == 11 and digits.startswith('1'):
-            return f'+{digits}'
-        # Fall back to original if unexpected length
-        return raw.strip()
\ No newline at end of file
+        return normalize_phone(raw)
+
+class DataVersion(db.Model):
+    """Change counter per data set, shared by all workers for cache invalidation"""
+    __tablename__ = 'data_versions'
+
+    key = Column(String(64), primary_key=True)  # e.g. 'requests:admin', 'members'
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=get_eastern_time)
+
+    def __repr__(self):
+        return f'<DataVersion {self.key}={self.version}>'
+
+class UsageRollup(db.Model):
+    """Per-employee usage totals by year and category, kept in step with
+    requests and tardiness records (see usage_rollups.py)"""
+    __tablename__ = 'usage_rollups'
+
+    member_id = Column(Integer, ForeignKey('team_members.id'), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    category = Column(String(32), primary_key=True)  # e.g. 'vacation', 'callout_fmla', 'tardiness'
+    count = Column(Integer, nullable=False, default=0)  # Requests or tardiness incidents
+    days = Column(Integer, nullable=False, default=0)  # Business days (requests only)
+    hours = Column(Numeric(8, 2), nullable=False, default=0)  # Hours charged (requests only)
+    minutes = Column(Integer, nullable=False, default=0)  # Minutes late (tardiness only)
+    updated_at = Column(DateTime, default=get_eastern_time)
+
+    def __repr__(self):
+        return f'<UsageRollup {self.member_id} {self.year} {self.category}: {self.count}>'
+
+class SchemaVersion(db.Model):
+    """One row per startup migration step applied (see migrations.py)"""
+    __tablename__ = 'schema_version'
+
+    version = Column(Integer, primary_key=True, autoincrement=False)
+    name = Column(String(100), nullable=False)
+    applied_at = Column(DateTime, default=get_eastern_time)
+    duration_ms = Column(Integer)
+
+    def __repr__(self):
+        return f'<SchemaVersion {self.version} {self.name}>'
+
+class SchemaLock(db.Model):
+    """Single-row lease that lets one process at a time apply migrations"""
+    __tablename__ = 'schema_lock'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    owner = Column(String(100))  # host:pid:token of the process holding the lease
+    expires_at = Column(DateTime)
+
+    def __repr__(self):
+        return f'<SchemaLock {self.owner} until {self.expires_at}>'
+
+class OutboxMessage(db.Model):
+    """Email/SMS notification queued in the same transaction as the change that
+    triggered it and sent in the background (see outbox.py)"""
+    __tablename__ = 'outbox'
+    __table_args__ = (
+        # Dispatcher claims: due pending messages, oldest first
+        Index('ix_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(32), nullable=False)  # e.g. 'submission_email', 'manager_sms'
+    payload = Column(Text, nullable=False)  # JSON arguments for the kind's handler
+    status = Column(String(20), nullable=False, default='pending')  # pending, sending, sent, skipped, dead
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime, default=get_eastern_time)
+    locked_until = Column(DateTime)  # Claim lease while status is 'sending'
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=get_eastern_time)
+    sent_at = Column(DateTime)
+
+    def __repr__(self):
+        return f'<OutboxMessage {self.id} {self.kind} {self.status}>'
+
+class SMSDeliveryLog(db.Model):
+    """Outcome of each SMS sent by a fan-out, one row per recipient and attempt"""
+    __tablename__ = 'sms_delivery_log'
+    __table_args__ = (
+        # Retries look up which recipients of a request were already reached
+        Index('ix_sms_delivery_log_request_purpose', 'pto_request_id', 'purpose'),
+    )
+
+    MANAGER_CALLOUT = 'manager_callout'
+
+    id = Column(Integer, primary_key=True)
+    pto_request_id = Column(Integer)  # No FK: the log outlives deleted requests
+    purpose = Column(String(32), nullable=False)  # e.g. 'manager_callout'
+    to_number = Column(String(20), nullable=False)
+    status = Column(String(20), nullable=False)  # sent, failed
+    message_sid = Column(String(64))
+    error = Column(Text)
+    duration_ms = Column(Integer)
+    created_at = Column(DateTime, default=get_eastern_time)
+
+    def __repr__(self):
+        return f'<SMSDeliveryLog {self.pto_request_id} {self.to_number} {self.status}>'
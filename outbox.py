@@ -0,0 +1,311 @@
+"""
+Notification outbox
+Email and SMS notifications are written to the outbox table in the same
+transaction as the change that triggers them, so a route returns as soon as
+its commit succeeds and a notification is never lost (or sent for a change
+that rolled back).
+
+A dispatcher claims due messages and sends them through the shared email and
+SMS services. Each claim counts as an attempt, so a message whose send kills
+the process still moves towards MAX_ATTEMPTS when its claim expires. A failed
+send is retried with exponential backoff; after MAX_ATTEMPTS the message is
+dead-lettered (status 'dead') and left for outbox_worker.py --retry-dead. Messages that can't be sent at all (Twilio not
+configured, request deleted) are marked 'skipped'.
+
+How messages get sent depends on OUTBOX_DISPATCHER:
+- thread (default): a daemon thread in each app process, woken by every commit
+  that queued a message
+- request (default when VERCEL is set): each request that queued messages
+  sends one batch after its response has been written, inside the same
+  invocation. Serverless hosts freeze background threads once the response
+  returns, so the thread mode would leave messages pending. Any backlog, and
+  retries that come due later, are sent by the /cron/outbox route (see
+  vercel.json crons; set CRON_SECRET so only the scheduler can call it)
+- off: leave sending to a separate `python outbox_worker.py` process
+Claims are leased rows, so any number of dispatchers can run side by side.
+"""
+
+import json
+import logging
+import os
+import random
+import threading
+from datetime import timedelta
+
+from flask import g, has_request_context
+from sqlalchemy import event, or_, update
+from sqlalchemy.orm import Session
+
+from database import db
+from models import OutboxMessage, PTORequest, get_eastern_time
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 8
+BASE_DELAY_SECONDS = 30
+MAX_DELAY_SECONDS = 3600
+CLAIM_SECONDS = 300  # A claim older than this is assumed to belong to a crashed dispatcher
+BATCH_SIZE = 20
+POLL_SECONDS = 15
+
+_wake = threading.Event()
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+
+class SkipMessage(Exception):
+    """Raised by a handler when its message can never be sent"""
+
+
+# ========================================
+# QUEUEING
+# ========================================
+
+def enqueue(kind, **payload):
+    """Queue a notification in the current transaction; it is sent once the caller commits"""
+    if kind not in HANDLERS:
+        raise ValueError(f'Unknown outbox message kind: {kind}')
+    message = OutboxMessage(
+        kind=kind,
+        payload=json.dumps(payload),
+        status='pending',
+        attempts=0,
+        next_attempt_at=get_eastern_time(),
+        created_at=get_eastern_time(),
+    )
+    db.session.add(message)
+    db.session.info['outbox_queued'] = True
+    return message
+
+
+@event.listens_for(Session, 'after_commit')
+def _wake_after_commit(session):
+    if session.info.pop('outbox_queued', False):
+        _wake.set()
+        if has_request_context():
+            g.outbox_queued = True
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop('outbox_queued', None)
+
+
+# ========================================
+# HANDLERS
+# ========================================
+
+def _load_request(request_id):
+    pto_request = db.session.get(PTORequest, request_id)
+    if pto_request is None:
+        raise SkipMessage(f'PTO request {request_id} no longer exists')
+    return pto_request
+
+
+def _send_submission_email(request_id):
+    from services import get_email_service
+    return get_email_service().send_submission_email(_load_request(request_id))
+
+
+def _send_approval_email(request_id):
+    from services import get_email_service
+    return get_email_service().send_approval_email(_load_request(request_id))
+
+
+def _send_denial_email(request_id, reason=None):
+    from services import get_email_service
+    return get_email_service().send_denial_email(_load_request(request_id), reason)
+
+
+def _sms_service():
+    from services import get_sms_service
+    sms_service = get_sms_service()
+    if not sms_service.configured:
+        raise SkipMessage('Twilio is not configured')
+    return sms_service
+
+
+def _send_employee_sms(to, employee_name, request_id):
+    return _sms_service().send_employee_confirmation_sms(to, employee_name, request_id)
+
+
+def _send_manager_sms(to, employee_name, request_id):
+    return _sms_service().send_manager_notification_sms(to, employee_name, request_id)
+
+
+def _send_manager_sms_fanout(recipients, employee_name, request_id):
+    # Delivery log rows are committed with the outcome, so a retry skips reached recipients
+    return _sms_service().send_manager_notifications(recipients, employee_name, request_id)
+
+
+# kind -> handler(**payload); returns True when sent, False (or raises) to retry
+HANDLERS = {
+    'submission_email': _send_submission_email,
+    'approval_email': _send_approval_email,
+    'denial_email': _send_denial_email,
+    'employee_sms': _send_employee_sms,
+    'manager_sms': _send_manager_sms,
+    'manager_sms_fanout': _send_manager_sms_fanout,
+}
+
+
+# ========================================
+# DISPATCH
+# ========================================
+
+def backoff_seconds(attempts):
+    """Delay before the next try after `attempts` failures: doubling, capped, with jitter"""
+    delay = min(BASE_DELAY_SECONDS * 2 ** (attempts - 1), MAX_DELAY_SECONDS)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def _claim(limit):
+    """Lease up to `limit` due messages to this dispatcher, counting the attempt; returns their ids"""
+    now = get_eastern_time()
+    abandoned = (OutboxMessage.status == 'sending') & (OutboxMessage.locked_until < now)
+    # A claim that expired on its last attempt means the send keeps killing its dispatcher
+    db.session.execute(
+        update(OutboxMessage)
+        .where(abandoned, OutboxMessage.attempts >= MAX_ATTEMPTS)
+        .values(status='dead', locked_until=None,
+                last_error='Dispatcher stopped during the send on every attempt')
+    )
+    due = or_(
+        (OutboxMessage.status == 'pending') & (OutboxMessage.next_attempt_at <= now),
+        abandoned & (OutboxMessage.attempts < MAX_ATTEMPTS),
+    )
+    candidates = [row.id for row in db.session.query(OutboxMessage.id).filter(due)
+                  .order_by(OutboxMessage.next_attempt_at, OutboxMessage.id).limit(limit)]
+    claimed = []
+    for message_id in candidates:
+        # Conditional update, so a message another dispatcher claimed first is skipped
+        if db.session.execute(
+            update(OutboxMessage)
+            .where(OutboxMessage.id == message_id, due)
+            .values(status='sending', attempts=OutboxMessage.attempts + 1,
+                    locked_until=now + timedelta(seconds=CLAIM_SECONDS))
+        ).rowcount:
+            claimed.append(message_id)
+    db.session.commit()
+    return claimed
+
+
+def _deliver(message_id):
+    message = db.session.get(OutboxMessage, message_id)
+    try:
+        sent = HANDLERS[message.kind](**json.loads(message.payload))
+        error = None if sent else 'Send reported failure'
+    except SkipMessage as e:
+        db.session.rollback()
+        message.status = 'skipped'
+        message.last_error = str(e)
+        message.locked_until = None
+        db.session.commit()
+        logger.info(f"Outbox message {message_id} ({message.kind}) skipped: {e}")
+        return 'skipped'
+    except Exception as e:
+        db.session.rollback()
+        error = f'{type(e).__name__}: {e}'
+
+    message.locked_until = None
+    if error is None:
+        message.status = 'sent'
+        message.sent_at = get_eastern_time()
+        message.last_error = None
+    elif message.attempts >= MAX_ATTEMPTS:
+        message.status = 'dead'
+        message.last_error = error
+        logger.error(f"Outbox message {message_id} ({message.kind}) dead after {message.attempts} attempts: {error}")
+    else:
+        message.status = 'pending'
+        message.last_error = error
+        message.next_attempt_at = get_eastern_time() + timedelta(seconds=backoff_seconds(message.attempts))
+        logger.warning(f"Outbox message {message_id} ({message.kind}) failed, retry {message.attempts}: {error}")
+    db.session.commit()
+    return message.status
+
+
+def dispatch_pending(limit=BATCH_SIZE):
+    """Send one batch of due messages. Returns {status: count} for the batch."""
+    results = {}
+    for message_id in _claim(limit):
+        status = _deliver(message_id)
+        results[status] = results.get(status, 0) + 1
+    return results
+
+
+def drain(app):
+    """Dispatch batches until nothing is due. Returns the number of messages handled."""
+    handled = 0
+    while True:
+        with app.app_context():
+            batch = sum(dispatch_pending().values())
+        if not batch:
+            return handled
+        handled += batch
+
+
+def run_dispatcher(app, stop=None):
+    """Dispatch until `stop` is set, waking on queued commits or every POLL_SECONDS"""
+    while stop is None or not stop.is_set():
+        # Cleared before draining, so a commit that lands mid-drain wakes the next pass
+        _wake.clear()
+        try:
+            drain(app)
+        except Exception as e:
+            logger.error(f"Outbox dispatcher error: {e}")
+        _wake.wait(POLL_SECONDS)
+
+
+def dispatcher_mode():
+    """'thread', 'request' or 'off', from OUTBOX_DISPATCHER ('request' by default on Vercel)"""
+    mode = (os.environ.get('OUTBOX_DISPATCHER') or ('request' if os.environ.get('VERCEL') else 'thread')).lower()
+    return 'off' if mode in ('off', '0', 'false', 'no') else mode
+
+
+def _dispatch_batch_quietly(app):
+    try:
+        with app.app_context():
+            dispatch_pending()
+    except Exception as e:
+        logger.error(f"Outbox dispatch error: {e}")
+
+
+def start_dispatcher(app):
+    """Set up this process's dispatcher for dispatcher_mode(): start the background
+    thread, or register the after-response batch. Returns the mode."""
+    global _dispatcher
+    mode = dispatcher_mode()
+    if mode == 'request':
+        @app.after_request
+        def _drain_outbox_after_response(response):
+            # Runs once the response body has been sent, before the invocation ends.
+            # One batch only, so the invocation stays short; /cron/outbox sends the rest
+            if g.pop('outbox_queued', False):
+                response.call_on_close(lambda: _dispatch_batch_quietly(app))
+            return response
+    elif mode == 'thread':
+        with _dispatcher_lock:
+            if _dispatcher is None or not _dispatcher.is_alive():
+                _dispatcher = threading.Thread(
+                    target=run_dispatcher, args=(app,), name='outbox-dispatcher', daemon=True
+                )
+                _dispatcher.start()
+    return mode
+
+
+def retry_dead():
+    """Give every dead-lettered message a fresh set of attempts; the caller commits"""
+    return db.session.execute(
+        update(OutboxMessage)
+        .where(OutboxMessage.status == 'dead')
+        .values(status='pending', attempts=0, next_attempt_at=get_eastern_time())
+    ).rowcount
+
+
+def status_counts():
+    """{status: count} over the whole outbox"""
+    return dict(
+        db.session.query(OutboxMessage.status, db.func.count(OutboxMessage.id))
+        .group_by(OutboxMessage.status).all()
+    )
@@ -0,0 +1,55 @@
+"""
+Outbox Worker
+Sends queued email/SMS notifications from the outbox table in a separate
+process, for deployments that run the app with OUTBOX_DISPATCHER=off.
+Run with: python outbox_worker.py
+Send what is due and exit (e.g. from cron): python outbox_worker.py --once
+Requeue dead-lettered messages: python outbox_worker.py --retry-dead
+Show message counts by status: python outbox_worker.py --status
+"""
+
+import os
+import sys
+import io
+
+# Fix Windows console encoding issues
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+# This process is the dispatcher; don't also start the in-app thread
+os.environ['OUTBOX_DISPATCHER'] = 'off'
+
+from app import app
+from database import db
+import outbox
+
+
+def print_status():
+    with app.app_context():
+        counts = outbox.status_counts()
+    for status in ('pending', 'sending', 'sent', 'skipped', 'dead'):
+        print(f"  {status:8} {counts.get(status, 0)}")
+    return counts.get('dead', 0)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    if '--status' in args:
+        sys.exit(1 if print_status() else 0)
+
+    if '--retry-dead' in args:
+        with app.app_context():
+            requeued = outbox.retry_dead()
+            db.session.commit()
+        print(f"Requeued {requeued} dead-lettered message(s)")
+
+    if '--once' in args or '--retry-dead' in args:
+        print(f"Handled {outbox.drain(app)} message(s)")
+        sys.exit(0)
+
+    print("Outbox worker running (Ctrl+C to stop)")
+    try:
+        outbox.run_dispatcher(app)
+    except KeyboardInterrupt:
+        pass
+    sys.exit(0)
@@ -1,39 +1,61 @@
 from models import PTORequest, TeamMember, Manager, Position
+from query_helpers import request_query
+import data_versions
+import usage_rollups
 from database import db
-from email_service import EmailService
+from services import get_email_service
 from datetime import datetime
+import threading
+
+# (members version, staff directory); shared by all requests in this process
+_staff_directory_cache = None
+_staff_directory_lock = threading.Lock()
 
 class PTOTrackerSystem:
     """Main system class for managing PTO requests"""
     
     def __init__(self):
-        self.email_service = EmailService()
+        self.email_service = get_email_service()
 
     def get_staff_directory(self):
+        """Staff directory by team and position, with every position present even if empty.
+        Built once per members version and shared by all requests in this process,
+        so callers must not modify it."""
+        global _staff_directory_cache
+
+        versions = data_versions.get_versions([data_versions.MEMBERS])
+        if versions is None:
+            return self.build_staff_directory()
+
+        version = versions[data_versions.MEMBERS]
+        with _staff_directory_lock:
+            cached = _staff_directory_cache
+        if cached and cached[0] == version:
+            return cached[1]
+
+        # Version read before building, so a write landing mid-build
+        # only makes the next hit rebuild again
+        staff_directory = self.build_staff_directory()
+        with _staff_directory_lock:
+            _staff_directory_cache = (version, staff_directory)
+        return staff_directory
+
+    def build_staff_directory(self):
         """Dynamic staff directory from database"""
         staff_directory = {'clinical': {}, 'admin': {}}
-        
-        # Get all team members from database
-        team_members = TeamMember.query.join(Position).all()
-        
-        for member in team_members:
-            team = member.team
-            position = member.position.name
-            
-            # Initialize team if not exists
-            if team not in staff_directory:
-                staff_directory[team] = {}
-                
-            # Initialize position if not exists
-            if position not in staff_directory[team]:
-                staff_directory[team][position] = []
-                
-            # Add member to directory
-            staff_directory[team][position].append({
-                'name': member.name,
-                'email': member.email
+
+        for team, position in db.session.query(Position.team, Position.name).order_by(Position.id):
+            staff_directory.setdefault(team, {}).setdefault(position, [])
+
+        members = db.session.query(Position.team, Position.name, TeamMember.name, TeamMember.email).join(
+            TeamMember.position
+        ).order_by(TeamMember.id)
+        for team, position, name, email in members:
+            staff_directory.setdefault(team, {}).setdefault(position, []).append({
+                'name': name,
+                'email': email
             })
-        
+
         return staff_directory
 
     def add_employee(self, employee_data):
@@ -57,6 +79,7 @@ class PTOTrackerSystem:
             new_employee.pto_refresh_date = datetime.strptime(employee_data['pto_refresh_date'], '%Y-%m-%d').date()
 
         db.session.add(new_employee)
+        data_versions.bump(data_versions.MEMBERS)
         db.session.commit()
         return new_employee
 
@@ -81,6 +104,7 @@ class PTOTrackerSystem:
         else:
             employee.pto_refresh_date = None
 
+        data_versions.bump(data_versions.MEMBERS)
         db.session.commit()
         return employee
 
@@ -93,11 +117,14 @@ class PTOTrackerSystem:
             # Soft delete
             employee.name = f"[INACTIVE] {employee.name}"
             employee.email = f"inactive_{employee.id}@{employee.email}"
+            data_versions.bump(data_versions.MEMBERS)
             db.session.commit()
             return f'Employee marked as inactive (has historical PTO records).'
         else:
             # Hard delete
+            usage_rollups.clear_member(employee.id)
             db.session.delete(employee)
+            data_versions.bump(data_versions.MEMBERS)
             db.session.commit()
             return 'Employee deleted successfully!'
     
@@ -135,6 +162,7 @@ class PTOTrackerSystem:
 
         db.session.add(request)
         db.session.flush()  # Get the ID before deducting balance
+        usage_rollups.apply_request(request)
 
         # If call-out, automatically deduct from sick balance
         if is_call_out and member:
@@ -143,23 +171,25 @@ class PTOTrackerSystem:
             new_sick_balance = max(0, current_sick_balance - hours_to_deduct)
             member.sick_balance_hours = new_sick_balance
 
+        data_versions.bump_requests(request.manager_team)
         db.session.commit()
 
         return request
     
     def get_requests_by_team(self, team):
         """Get all requests for a specific manager team"""
-        return PTORequest.query.filter_by(manager_team=team).all()
+        return request_query().filter_by(manager_team=team).all()
     
     def get_all_requests(self):
         """Get all requests (for superadmin)"""
-        return PTORequest.query.all()
+        return request_query().all()
     
     def approve_request(self, request_id, manager):
         """Approve a PTO request"""
         request = PTORequest.query.get(request_id)
         if request and request.status == 'pending':
             request.status = 'approved'
+            usage_rollups.apply_request(request)
 
             # Deduct from appropriate balance based on request type
             if request.member:
@@ -176,6 +206,7 @@ class PTOTrackerSystem:
                     new_pto_balance = max(0, current_pto_balance - hours_to_deduct)
                     request.member.pto_balance_hours = new_pto_balance
 
+            data_versions.bump_requests(request.manager_team)
             db.session.commit()
             return True
         return False
@@ -186,6 +217,7 @@ class PTOTrackerSystem:
         if request and request.status == 'pending':
             request.status = 'denied'
             request.denial_reason = denial_reason
+            data_versions.bump_requests(request.manager_team)
             db.session.commit()
             return True
         return False
\ No newline at end of file
@@ -0,0 +1,45 @@
+"""
+Shared queries for PTO request lists.
+
+Dashboards, workqueues and calendars render request.member.name and
+request.member.position.name for every row. TeamMember is joined-table
+inheritance over User, so loading those lazily costs extra round-trips
+per request. request_query() preloads them up front.
+
+Set STRICT_LOADING=1 (or run the app with TESTING) to make any other
+relationship access on these results raise instead of lazy loading, so
+a new N+1 shows up as an error rather than a slow page.
+"""
+
+from flask import current_app, has_app_context
+from sqlalchemy.orm import joinedload, selectinload, raiseload, defaultload
+
+from models import PTORequest, TeamMember
+
+
+def strict_loading_enabled():
+    """True when lazy loads on request lists should raise"""
+    if not has_app_context():
+        return False
+    return bool(current_app.config.get('STRICT_LOADING') or current_app.config.get('TESTING'))
+
+
+def request_load_options():
+    """Loader options for PTORequest rows shown in lists"""
+    options = [
+        # member + users row + position in the same SELECT
+        joinedload(PTORequest.member).joinedload(TeamMember.position),
+        # One extra IN query for all call-out records
+        selectinload(PTORequest.call_out_record),
+    ]
+    if strict_loading_enabled():
+        options += [
+            raiseload('*'),
+            defaultload(PTORequest.member).raiseload('*'),
+        ]
+    return options
+
+
+def request_query():
+    """PTORequest query with member, position and call-out record preloaded"""
+    return PTORequest.query.options(*request_load_options())
@@ -0,0 +1,49 @@
+"""
+Rebuild Usage Rollups
+Regenerates the usage_rollups table from the raw PTO requests and tardiness
+records, then checks the result against them.
+Run with: python rebuild_usage_rollups.py
+Check only (no writes): python rebuild_usage_rollups.py --verify
+"""
+
+import sys
+import io
+
+# Fix Windows console encoding issues
+if sys.platform == 'win32':
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+from app import app
+from database import db
+import usage_rollups
+
+
+def print_mismatches(mismatches):
+    print("  (count, days, hours, minutes)")
+    for (member_id, year, category), stored, expected in mismatches:
+        print(f"  member {member_id} {year} {category}: stored {stored}, expected {expected}")
+
+
+def verify():
+    """Print any rows that differ from the raw data; returns the number of differences"""
+    mismatches = usage_rollups.verify()
+    if mismatches:
+        print(f"[--] {len(mismatches)} usage rollup row(s) differ from the raw data:")
+        print_mismatches(mismatches)
+    else:
+        print("[OK] Usage rollups match the raw data")
+    return len(mismatches)
+
+
+def rebuild():
+    """Rebuild the table in one transaction and verify it"""
+    count = usage_rollups.rebuild()
+    db.session.commit()
+    print(f"Rebuilt {count} usage rollup row(s)")
+    return verify()
+
+
+if __name__ == '__main__':
+    with app.app_context():
+        failures = verify() if '--verify' in sys.argv[1:] else rebuild()
+    sys.exit(1 if failures else 0)
@@ -1,11 +1,21 @@
 from flask import render_template, request, redirect, url_for, flash, jsonify, session
 from database import db
-from models import PTORequest, TeamMember, Manager, User, PendingEmployee, Position, TardinessRecord, SMSRecipient
+from models import PTORequest, TeamMember, Manager, User, PendingEmployee, Position, TardinessRecord, SMSRecipient, phone_to_e164
 from pto_system import PTOTrackerSystem
 from auth import roles_required, authenticate_user, login_user, logout_user, get_current_user
 from datetime import datetime, timedelta
 import pytz
-from email_service import EmailService
+from business_days import parse_date, business_day_index
+from query_helpers import request_query, request_load_options
+from calendar_events import build_events
+from dashboard_service import DashboardService
+from employee_stats import get_request_stats, get_tardiness_stats
+from employee_search import search_employees, DEFAULT_LIMIT as DEFAULT_SEARCH_LIMIT
+import data_versions
+import usage_rollups
+import outbox
+from http_cache import versioned_response, yearly_response
+from pagination import keyset_page, parse_page_size
 
 # Define Eastern timezone
 EASTERN = pytz.timezone('US/Eastern')
@@ -16,41 +26,114 @@ def get_eastern_time():
     # Return naive datetime (no timezone info) but in Eastern time
     return eastern_now.replace(tzinfo=None)
 
-def _get_business_day_segments(start_str, end_str):
-    """Split a date range into segments of consecutive business days (no weekends).
-    Returns list of (segment_start, segment_end_exclusive) string tuples."""
-    start = datetime.strptime(start_str, '%Y-%m-%d').date()
-    end = datetime.strptime(end_str, '%Y-%m-%d').date()
-    segments = []
-    current_start = None
-    d = start
-    while d <= end:
-        if d.weekday() < 5:  # Monday-Friday
-            if current_start is None:
-                current_start = d
-        else:
-            if current_start is not None:
-                # End exclusive for FullCalendar
-                segments.append((current_start.strftime('%Y-%m-%d'), (d).strftime('%Y-%m-%d')))
-                current_start = None
-        d += timedelta(days=1)
-    # Close final segment
-    if current_start is not None:
-        segments.append((current_start.strftime('%Y-%m-%d'), (end + timedelta(days=1)).strftime('%Y-%m-%d')))
-    return segments
+def _phone_owner(phone, user_id):
+    """Return the other user already holding this phone number, if any."""
+    e164 = phone_to_e164(phone)
+    if not e164:
+        return None
+    return User.query.filter(User.phone_e164 == e164, User.id != user_id).first()
+
+
+def _get_calendar_window(args):
+    """Parse FullCalendar's start/end query parameters into (start, end_exclusive) dates.
+    Returns (None, None) when no window was sent; raises ValueError if it is malformed."""
+    raw_start = args.get('start')
+    raw_end = args.get('end')
+    if not raw_start and not raw_end:
+        return None, None
+    # FullCalendar sends ISO timestamps (2025-09-28T00:00:00-04:00); only the date matters
+    start = parse_date((raw_start or '')[:10])
+    end = parse_date((raw_end or '')[:10])
+    if start is None or end is None or end <= start:
+        raise ValueError('start and end must be YYYY-MM-DD dates with start before end')
+    return start, end
+
+
+def _filter_to_window(query, start, end):
+    """Limit a PTORequest query to requests overlapping [start, end)"""
+    if start is None:
+        return query
+    return query.filter(PTORequest.start_date < end, PTORequest.end_date >= start)
+
+
+def _request_row(req):
+    """Table row for a request in the superadmin request table"""
+    member = req.member
+    position = member.position if member else None
+    if req.is_partial_day:
+        duration = f"{req.duration_hours:.1f} hrs"
+    else:
+        duration = f"{req.duration_days} day{'s' if req.duration_days != 1 else ''}"
+    return {
+        'id': req.id,
+        'employee': member.name if member else 'Unknown',
+        'position': position.name if position else 'N/A',
+        'team': position.team if position else None,
+        'start_date': req.start_date.isoformat(),
+        'end_date': req.end_date.isoformat(),
+        'pto_type': req.pto_type,
+        'is_call_out': req.is_call_out,
+        'is_partial_day': req.is_partial_day,
+        'duration': duration,
+        'status': req.status,
+        'approve_url': url_for('approve_request', request_id=req.id),
+        'deny_url': url_for('deny_request', request_id=req.id),
+    }
+
+
+def _workqueue_query(status):
+    """Requests in a workqueue status, limited to the current manager's team; None for other roles"""
+    user_role = session.get('user_role', '')
+    if user_role == 'superadmin':
+        return PTORequest.query.filter_by(status=status)
+    if user_role in ('admin', 'clinical'):
+        return PTORequest.query.filter_by(status=status, manager_team=user_role)
+    return None
+
+
+def _workqueue_page(query, args):
+    """Keyset page of a workqueue from the cursor/per_page args, most recently changed first.
+    Raises ValueError for a malformed cursor."""
+    page = keyset_page(query.options(*request_load_options()), PTORequest.updated_at, PTORequest.id,
+                       cursor=args.get('cursor'), per_page=parse_page_size(args.get('per_page')))
+    PTORequest.prime_durations(page.items)
+    return page
+
+
+def _get_daily_counts(requests, start, end):
+    """Compact calendar mode: one summary event per business day in [start, end) that has anyone out"""
+    counts = {}
+    for req in requests:
+        first = max(req.start_date, start)
+        last = min(req.end_date, end - timedelta(days=1))
+        for seg_start, seg_end in business_day_index.segments(first, last):
+            for offset in range((seg_end - seg_start).days):
+                d = seg_start + timedelta(days=offset)
+                day = counts.setdefault(d, {'count': 0, 'approved': 0, 'pending': 0, 'call_outs': 0})
+                day['count'] += 1
+                if req.is_call_out:
+                    day['call_outs'] += 1
+                elif req.status in ('approved', 'pending'):
+                    day[req.status] += 1
+
+    return [{
+        'id': f'count-{d.isoformat()}',
+        'title': f"{day['count']} out",
+        'start': d.isoformat(),
+        'allDay': True,
+        'extendedProps': dict(day, is_summary=True)
+    } for d, day in sorted(counts.items())]
 
 
 def register_routes(app):
     # Initialize the PTO system
     pto_system = PTOTrackerSystem()
-    # Initialize the email service
-    email_service = EmailService()
 
     @app.route('/')
     def index():
-        """Main page for submitting PTO requests"""
-        staff_directory = pto_system.get_staff_directory()
-        return render_template('index.html', staff_directory=staff_directory)
+        """Main page for submitting PTO requests; the form loads positions and
+        employees from /api/positions and /api/employees/search"""
+        return render_template('index.html')
 
     @app.route('/user-manual')
     def user_manual():
@@ -114,184 +197,152 @@ def register_routes(app):
     @roles_required('admin', 'superadmin')
     def admin_dashboard():
         """Admin dashboard"""
-        from datetime import datetime, timedelta
-
-        # Get pending requests for admin team (using manager_team field)
-        pending_requests = PTORequest.query.filter_by(status='pending', manager_team='admin').all()
-
-        # Get approved requests for admin team
-        approved_requests = PTORequest.query.filter_by(status='approved', manager_team='admin').all()
-
-        # Get in_progress requests for admin team
-        in_progress_requests = PTORequest.query.filter_by(status='in_progress', manager_team='admin').all()
-
-        # Get pending employee registrations for admin team
-        pending_employees = PendingEmployee.query.filter_by(status='pending', team='admin').all()
-
-        # Get employees currently on PTO (approved requests where today is within the date range)
-        today_str = get_eastern_time().strftime('%Y-%m-%d')
-        currently_on_pto = PTORequest.query.filter_by(status='approved', manager_team='admin').filter(
-            PTORequest.start_date <= today_str,
-            PTORequest.end_date >= today_str
-        ).all()
-
-        # Get team employees (admin team only, excluding inactive)
-        admin_positions = Position.query.filter_by(team='admin').all()
-        admin_pos_ids = [p.id for p in admin_positions]
-        team_employees = TeamMember.query.filter(
-            TeamMember.position_id.in_(admin_pos_ids),
-            ~TeamMember.name.contains('[INACTIVE]')
-        ).order_by(TeamMember.name).all()
-
-        # Build stats dictionary for dashboard
-        stats = {
-            'pending': len(pending_requests),
-            'in_progress': len(in_progress_requests),
-            'approved': len(approved_requests),
-            'total': len(pending_requests) + len(in_progress_requests) + len(approved_requests),
-            'team_members': len(team_employees)
-        }
-
-        return render_template('dashboard_admin.html',
-                               requests=pending_requests,
-                               approved_requests=approved_requests,
-                               in_progress_requests=in_progress_requests,
-                               pending_employees=pending_employees,
-                               currently_on_pto=currently_on_pto,
-                               team_employees=team_employees,
-                               stats=stats,
-                               now=get_eastern_time)
+        try:
+            context = DashboardService('admin').get_context(request.args)
+        except ValueError:
+            return redirect(url_for('admin_dashboard'))
+        return render_template('dashboard_admin.html', now=get_eastern_time, **context)
 
     @app.route('/dashboard/clinical')
     @roles_required('clinical', 'superadmin')
     def clinical_dashboard():
         """Clinical dashboard"""
-        from datetime import datetime, timedelta
-
-        # Get pending requests for clinical team (using manager_team field)
-        pending_requests = PTORequest.query.filter_by(status='pending', manager_team='clinical').all()
-
-        # Get approved requests for clinical team
-        approved_requests = PTORequest.query.filter_by(status='approved', manager_team='clinical').all()
+        try:
+            context = DashboardService('clinical').get_context(request.args)
+        except ValueError:
+            return redirect(url_for('clinical_dashboard'))
+        return render_template('dashboard_clinical.html', now=get_eastern_time, **context)
 
-        # Get in_progress requests for clinical team
-        in_progress_requests = PTORequest.query.filter_by(status='in_progress', manager_team='clinical').all()
+    @app.route('/dashboard/superadmin')
+    @roles_required('superadmin')
+    def superadmin_dashboard():
+        """Super admin dashboard shell; the calendar and request table load from the APIs below"""
+        context = DashboardService('superadmin').get_superadmin_context()
+        return render_template('dashboard_superadmin.html', **context)
 
-        # Get pending employee registrations for clinical team
-        pending_employees = PendingEmployee.query.filter_by(status='pending', team='clinical').all()
+    @app.route('/api/superadmin/calendar-events')
+    @roles_required('superadmin')
+    def superadmin_calendar_events():
+        """Calendar events for every request overlapping the visible start/end window"""
+        try:
+            window_start, window_end = _get_calendar_window(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
 
-        # Get employees currently on PTO (approved requests where today is within the date range)
-        today_str = get_eastern_time().strftime('%Y-%m-%d')
-        currently_on_pto = PTORequest.query.filter_by(status='approved', manager_team='clinical').filter(
-            PTORequest.start_date <= today_str,
-            PTORequest.end_date >= today_str
-        ).all()
+        def build():
+            requests = _filter_to_window(request_query(), window_start, window_end).order_by(PTORequest.id).all()
+            PTORequest.prime_durations(requests)
+            return jsonify(build_events(requests, 'superadmin'))
 
-        # Get team employees (clinical team only, excluding inactive)
-        clinical_positions = Position.query.filter_by(team='clinical').all()
-        clinical_pos_ids = [p.id for p in clinical_positions]
-        team_employees = TeamMember.query.filter(
-            TeamMember.position_id.in_(clinical_pos_ids),
-            ~TeamMember.name.contains('[INACTIVE]')
-        ).order_by(TeamMember.name).all()
+        return versioned_response([data_versions.MEMBERS, *data_versions.ALL_REQUESTS], build)
 
-        # Build stats dictionary for dashboard
-        stats = {
-            'pending': len(pending_requests),
-            'in_progress': len(in_progress_requests),
-            'approved': len(approved_requests),
-            'total': len(pending_requests) + len(in_progress_requests) + len(approved_requests),
-            'team_members': len(team_employees)
+    @app.route('/api/superadmin/requests')
+    @roles_required('superadmin')
+    def superadmin_requests():
+        """One page of the superadmin request table.
+        Query params: status, kind (callout/pto), team, q, sort, dir, page, per_page.
+        Pass cursor (empty for the first page) instead of page for infinite scroll;
+        the response then carries next_cursor instead of page counts."""
+        args = request.args
+        params = {
+            'status': args.get('status') or None,
+            'kind': args.get('kind') or None,
+            'team': args.get('team') or None,
+            'search': (args.get('q') or '').strip() or None,
+            'sort': args.get('sort', 'submitted'),
+            'direction': args.get('dir', 'desc'),
+            'per_page': args.get('per_page', 25, type=int),
         }
 
-        return render_template('dashboard_clinical.html',
-                               requests=pending_requests,
-                               approved_requests=approved_requests,
-                               in_progress_requests=in_progress_requests,
-                               pending_employees=pending_employees,
-                               currently_on_pto=currently_on_pto,
-                               team_employees=team_employees,
-                               stats=stats,
-                               now=get_eastern_time)
-
-    @app.route('/dashboard/superadmin')
-    @roles_required('superadmin')
-    def superadmin_dashboard():
-        """Super admin dashboard"""
-        requests = pto_system.get_all_requests()
-        team_members = TeamMember.query.all()
-
-        # Build calendar events with weekend splitting
-        calendar_events = []
-        for req in requests:
-            if req.is_call_out:
-                color = '#dc3545'
-                text_color = '#fff'
-            elif req.status == 'approved':
-                color = '#28a745'
-                text_color = '#fff'
-            elif req.status == 'pending':
-                color = '#ffc107'
-                text_color = '#000'
-            else:
-                color = '#6c757d'
-                text_color = '#fff'
-
-            title = f"Call Out - {req.member.name}" if req.is_call_out else f"{req.member.name} - {req.pto_type}"
-            segments = _get_business_day_segments(req.start_date, req.end_date)
-            for idx, (seg_start, seg_end) in enumerate(segments):
-                calendar_events.append({
-                    'title': title,
-                    'start': seg_start,
-                    'end': seg_end,
-                    'backgroundColor': color,
-                    'borderColor': color,
-                    'textColor': text_color,
-                    'extendedProps': {
-                        'status': req.status,
-                        'is_call_out': req.is_call_out,
-                        'type': req.pto_type,
-                        'team': req.member.team if req.member else 'unknown',
-                        'employee': req.member.name if req.member else 'Unknown',
-                    }
+        def build():
+            if 'cursor' in args:
+                try:
+                    feed = DashboardService.get_request_feed(cursor=args.get('cursor'), **params)
+                except ValueError as e:
+                    return jsonify({'error': str(e)}), 400
+                return jsonify({
+                    'requests': [_request_row(req) for req in feed.items],
+                    'next_cursor': feed.next_cursor,
+                    'per_page': feed.per_page,
                 })
 
-        return render_template('dashboard_superadmin.html',
-                               requests=requests,
-                               team_members=team_members,
-                               calendar_events=calendar_events)
+            try:
+                pagination = DashboardService.get_request_page(page=args.get('page', 1, type=int), **params)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify({
+                'requests': [_request_row(req) for req in pagination.items],
+                'page': pagination.page,
+                'pages': pagination.pages,
+                'per_page': pagination.per_page,
+                'total': pagination.total,
+            })
+
+        return versioned_response([data_versions.MEMBERS, *data_versions.ALL_REQUESTS], build)
 
     @app.route('/api/staff-directory')
     def api_staff_directory():
         """API endpoint to get current staff directory"""
-        staff_directory = pto_system.get_staff_directory()
+        def build():
+            # Cached per members version; includes empty positions
+            return jsonify(pto_system.get_staff_directory())
 
-        # Ensure all team/position combinations exist even if empty
-        positions_by_team = {}
-        for p in Position.query.all():
-            if p.team not in positions_by_team:
-                positions_by_team[p.team] = []
-            positions_by_team[p.team].append(p.name)
+        return versioned_response([data_versions.MEMBERS], build)
 
-        # Add empty position structures if they don't exist in staff directory
-        for team, positions in positions_by_team.items():
-            if team not in staff_directory:
-                staff_directory[team] = {}
-            for position in positions:
-                if position not in staff_directory[team]:
-                    staff_directory[team][position] = []
+    @app.route('/api/employees/search')
+    def api_employee_search():
+        """Typeahead search over active employees' names, emails and positions.
+        Managers only see their own team; team and position narrow the search further."""
+        user_role = session.get('user_role')
+        positions = Position.query.all()
+        scoped = user_role not in (None, 'superadmin')
+        if scoped:
+            scope = Manager(role=user_role)
+            positions = [p for p in positions if scope.can_approve_position(p)]
+
+        team = request.args.get('team')
+        position = request.args.get('position')
+        if team:
+            positions = [p for p in positions if p.team == team]
+        if position:
+            positions = [p for p in positions if p.name == position]
+        position_ids = [p.id for p in positions] if scoped or team or position else None
 
-        return jsonify(staff_directory)
+        try:
+            limit = int(request.args.get('limit', DEFAULT_SEARCH_LIMIT))
+        except ValueError:
+            limit = DEFAULT_SEARCH_LIMIT
+
+        results = search_employees(request.args.get('q', ''), position_ids, limit)
+        return jsonify({'results': results})
+
+    @app.route('/cron/outbox')
+    def cron_outbox():
+        """Send due outbox notifications, including retries. Called by the Vercel cron
+        (vercel.json) with 'Authorization: Bearer <CRON_SECRET>'; refused when
+        CRON_SECRET isn't set."""
+        import hmac
+        import os
+        secret = os.environ.get('CRON_SECRET', '')
+        supplied = request.headers.get('Authorization', '')
+        if not secret or not hmac.compare_digest(supplied, f'Bearer {secret}'):
+            return jsonify({'error': 'Unauthorized'}), 401
+
+        handled = outbox.drain(app)
+        return jsonify({'handled': handled, 'status': outbox.status_counts()})
 
     @app.route('/api/positions')
     def api_positions():
         """API endpoint to get all available positions"""
-        positions = {}
-        for p in Position.query.all():
-            if p.team not in positions:
-                positions[p.team] = []
-            positions[p.team].append(p.name)
-        return jsonify(positions)
+        def build():
+            positions = {}
+            for p in Position.query.all():
+                if p.team not in positions:
+                    positions[p.team] = []
+                positions[p.team].append(p.name)
+            return jsonify(positions)
+
+        return versioned_response([data_versions.MEMBERS], build)
 
     @app.route('/api/callout-details/<int:request_id>')
     def api_callout_details(request_id):
@@ -369,6 +420,7 @@ def register_routes(app):
                     pending_employee.denial_reason = f"Registration Notes: {employee_notes}"  # Using this field for notes
 
                 db.session.add(pending_employee)
+                data_versions.bump(data_versions.PENDING_EMPLOYEES)
                 db.session.commit()
 
                 flash(f'Employee registration for {new_employee_name} has been submitted and will be reviewed by the {new_employee_team} team manager.', 'success')
@@ -397,6 +449,10 @@ def register_routes(app):
                 flash(f'Employee {name} not found in {team} team', 'error')
                 return redirect(url_for('index'))
 
+            if parse_date(start_date) is None or parse_date(end_date) is None:
+                flash('Please enter valid start and end dates.', 'error')
+                return redirect(url_for('index'))
+
             # Block RNs from submitting PTO (call-outs still allowed)
             if position == 'RNs' and not call_out_flag:
                 flash('Cannot submit PTO request. Please use paper form and submit manually to your nurse manager.', 'error')
@@ -433,6 +489,11 @@ def register_routes(app):
             )
 
             db.session.add(pto_request)
+            usage_rollups.apply_request(pto_request)
+            data_versions.bump_requests(team)
+            db.session.flush()  # Assign the request id for the notification
+            # Submission emails go out from the outbox once this commits
+            outbox.enqueue('submission_email', request_id=pto_request.id)
             db.session.commit()
 
             # If call-out, automatically deduct from sick balance
@@ -443,13 +504,6 @@ def register_routes(app):
                 member.sick_balance_hours = new_sick_balance
                 db.session.commit()
 
-            # Send email notification for PTO submission
-            try:
-                email_service.send_submission_email(pto_request)
-            except Exception as e:
-                # Log error but don't fail the request
-                print(f"Failed to send submission email: {str(e)}")
-
             # Different success message for call-out vs regular PTO
             if call_out_flag:
                 flash(f'Call-out submitted successfully for {name}! Request ID: #{pto_request.id}', 'success')
@@ -466,70 +520,36 @@ def register_routes(app):
         """Calendar view of PTO requests - viewable by anyone; detail modal requires login"""
         is_logged_in = 'user_id' in session
 
-        # Get all PTO requests (approved and pending) for calendar display
-        all_requests = PTORequest.query.filter(
-            PTORequest.status.in_(['approved', 'pending'])
-        ).all()
+        # Events are loaded per visible window from /api/calendar-events
+        return render_template('calendar.html', is_logged_in=is_logged_in)
 
-        # Convert PTO requests to FullCalendar events format
-        calendar_events = []
-        for request in all_requests:
-            # Determine colors based on call-out status first, then regular status
-            if request.is_call_out:
-                color = '#dc3545'  # Red for call-outs
-                text_color = '#fff'
-            elif request.status == 'approved':
-                color = '#28a745'  # Green for approved PTO
-                text_color = '#fff'
-            elif request.status == 'pending':
-                color = '#ffc107'  # Yellow for pending PTO
-                text_color = '#000'
-            else:
-                color = '#6c757d'  # Gray for other statuses
-                text_color = '#fff'
+    @app.route('/api/calendar-events')
+    def get_calendar_events():
+        """API endpoint for the /calendar page: approved and pending requests overlapping start/end"""
+        try:
+            window_start, window_end = _get_calendar_window(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        compact = request.args.get('compact') == '1'
+        if compact and window_start is None:
+            return jsonify({'error': 'compact mode requires start and end'}), 400
+
+        def build():
+            all_requests = _filter_to_window(request_query().filter(
+                PTORequest.status.in_(['approved', 'pending'])
+            ), window_start, window_end).all()
 
-            # Calculate duration in business days
-            try:
-                duration = request.duration_days  # This now uses business days calculation
-            except:
-                duration = 1
+            if compact:
+                return jsonify(_get_daily_counts(all_requests, window_start, window_end))
 
-            # Determine title based on call-out status
-            if request.is_call_out:
-                title = f"Call Out - {request.member.name}"
-            else:
-                title = f'{request.member.name} - {request.pto_type}'
-
-            # Split into business-day segments (skip weekends)
-            segments = _get_business_day_segments(request.start_date, request.end_date)
-            for idx, (seg_start, seg_end) in enumerate(segments):
-                event = {
-                    'id': f'pto-{request.id}-{idx}',
-                    'title': title,
-                    'start': seg_start,
-                    'end': seg_end,
-                    'backgroundColor': color,
-                    'borderColor': color,
-                    'textColor': text_color,
-                    'extendedProps': {
-                        'employee': request.member.name,
-                        'employee_position': request.member.position.name if request.member.position else 'Unknown',
-                        'team': request.member.position.team if request.member.position else 'unknown',
-                        'type': request.pto_type,
-                        'status': request.status,
-                        'reason': request.reason or '',
-                        'duration': duration,
-                        'is_partial_day': request.is_partial_day,
-                        'is_call_out': request.is_call_out,
-                        'request_id': request.id
-                    }
-                }
-                calendar_events.append(event)
+            PTORequest.prime_durations(all_requests)
 
-        return render_template('calendar.html',
-                               requests=all_requests,
-                               calendar_events=calendar_events,
-                               is_logged_in=is_logged_in)
+            # Convert PTO requests to FullCalendar events format
+            calendar_events = build_events(all_requests, 'calendar')
+
+            return jsonify(calendar_events)
+
+        return versioned_response([data_versions.MEMBERS, *data_versions.ALL_REQUESTS], build)
 
     @app.route('/api/test-business-days')
     def test_business_days():
@@ -595,264 +615,113 @@ def register_routes(app):
     @app.route('/api/holidays')
     def get_holidays():
         """API endpoint to get Mount Sinai official holidays for calendar display"""
-        try:
-            from business_days import get_holidays_for_calendar
-            holidays = get_holidays_for_calendar()
-            return jsonify(holidays)
-        except Exception as e:
-            return jsonify({'error': str(e)}), 500
+        from business_days import get_holidays_for_calendar
+        year = get_eastern_time().year
+
+        def build():
+            try:
+                holidays = get_holidays_for_calendar(year)
+                return jsonify(holidays)
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+
+        # Holidays depend only on the year, so browsers can keep them until New Year
+        return yearly_response(year, build)
 
     @app.route('/api/team-calendar/<team>')
     def get_team_calendar(team):
         """API endpoint to get team-specific calendar events"""
         try:
-            # Get PTO requests for the specified team
-            requests = PTORequest.query.filter(
-                PTORequest.manager_team == team,
-                PTORequest.status.in_(['approved', 'pending'])
-            ).all()
-
-            calendar_events = []
-            for request in requests:
-                # Determine colors based on call-out status first, then regular status
-                if request.is_call_out:
-                    color = '#dc3545'  # Red for call-outs
-                    text_color = '#fff'
-                elif request.status == 'approved':
-                    color = '#28a745'  # Green for approved PTO
-                    text_color = '#fff'
-                elif request.status == 'pending':
-                    color = '#ffc107'  # Yellow for pending PTO
-                    text_color = '#000'
-                else:
-                    color = '#6c757d'  # Gray for other statuses
-                    text_color = '#fff'
+            window_start, window_end = _get_calendar_window(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        compact = request.args.get('compact') == '1'
+        if compact and window_start is None:
+            return jsonify({'error': 'compact mode requires start and end'}), 400
+
+        def build():
+            try:
+                # Get PTO requests for the specified team that overlap the visible window
+                requests = _filter_to_window(request_query().filter(
+                    PTORequest.manager_team == team,
+                    PTORequest.status.in_(['approved', 'pending'])
+                ), window_start, window_end).all()
 
-                # Calculate duration
-                try:
-                    duration = request.duration_days
-                except:
-                    duration = 1
+                if compact:
+                    return jsonify(_get_daily_counts(requests, window_start, window_end))
 
-                # Build event title
-                if request.is_call_out:
-                    title = f"CALL OUT - {request.member.name}"
-                else:
-                    title = request.member.name
-
-                # Split into business-day segments (skip weekends)
-                segments = _get_business_day_segments(request.start_date, request.end_date)
-                for idx, (seg_start, seg_end) in enumerate(segments):
-                    event = {
-                        'id': f'{request.id}-{idx}',
-                        'title': title,
-                        'start': seg_start,
-                        'end': seg_end,
-                        'color': color,
-                        'textColor': text_color,
-                        'allDay': True,
-                        'extendedProps': {
-                            'employee': request.member.name,
-                            'employee_position': request.member.position.name if request.member.position else '',
-                            'type': request.pto_type,
-                            'status': request.status,
-                            'is_call_out': request.is_call_out,
-                            'is_partial_day': request.is_partial_day,
-                            'duration': f"{duration} day{'s' if duration != 1 else ''}",
-                            'reason': request.reason or '',
-                            'team': request.manager_team
-                        }
-                    }
-                    calendar_events.append(event)
+                PTORequest.prime_durations(requests)
 
-            return jsonify(calendar_events)
-        except Exception as e:
-            return jsonify({'error': str(e)}), 500
+                calendar_events = build_events(requests, 'team')
+                return jsonify(calendar_events)
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+
+        return versioned_response([data_versions.MEMBERS, data_versions.requests_key(team)], build)
 
     @app.route('/api/team-calendar/position/<filter_type>')
     def get_position_team_calendar(filter_type):
         """API endpoint to get calendar events filtered by position group (echo/moa)"""
         try:
-            if filter_type == 'echo':
-                positions = Position.query.filter(
-                    db.or_(Position.name.contains('Echo'), Position.name.contains('Vascular'))
-                ).all()
-            elif filter_type == 'moa':
-                positions = Position.query.filter(Position.name.contains('MOA')).all()
-            else:
-                return jsonify([])
+            window_start, window_end = _get_calendar_window(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        compact = request.args.get('compact') == '1'
+        if compact and window_start is None:
+            return jsonify({'error': 'compact mode requires start and end'}), 400
+
+        def build():
+            try:
+                if filter_type == 'echo':
+                    positions = Position.query.filter(
+                        db.or_(Position.name.contains('Echo'), Position.name.contains('Vascular'))
+                    ).all()
+                elif filter_type == 'moa':
+                    positions = Position.query.filter(Position.name.contains('MOA')).all()
+                else:
+                    return jsonify([])
 
-            pos_ids = [p.id for p in positions]
-            members = TeamMember.query.filter(TeamMember.position_id.in_(pos_ids)).all()
-            member_ids = [m.id for m in members]
+                pos_ids = [p.id for p in positions]
+                members = TeamMember.query.filter(TeamMember.position_id.in_(pos_ids)).all()
+                member_ids = [m.id for m in members]
 
-            requests = PTORequest.query.filter(
-                PTORequest.member_id.in_(member_ids),
-                PTORequest.status.in_(['approved', 'pending'])
-            ).all()
-
-            calendar_events = []
-            for request in requests:
-                if request.is_call_out:
-                    color = '#dc3545'
-                    text_color = '#fff'
-                elif request.status == 'approved':
-                    color = '#28a745'
-                    text_color = '#fff'
-                elif request.status == 'pending':
-                    color = '#ffc107'
-                    text_color = '#000'
-                else:
-                    color = '#6c757d'
-                    text_color = '#fff'
+                requests = _filter_to_window(request_query().filter(
+                    PTORequest.member_id.in_(member_ids),
+                    PTORequest.status.in_(['approved', 'pending'])
+                ), window_start, window_end).all()
 
-                try:
-                    duration = request.duration_days
-                except:
-                    duration = 1
-
-                title = f"CALL OUT - {request.member.name}" if request.is_call_out else request.member.name
-
-                segments = _get_business_day_segments(request.start_date, request.end_date)
-                for idx, (seg_start, seg_end) in enumerate(segments):
-                    event = {
-                        'id': f'{request.id}-{idx}',
-                        'title': title,
-                        'start': seg_start,
-                        'end': seg_end,
-                        'color': color,
-                        'textColor': text_color,
-                        'allDay': True,
-                        'extendedProps': {
-                            'employee': request.member.name,
-                            'employee_position': request.member.position.name if request.member.position else '',
-                            'type': request.pto_type,
-                            'status': request.status,
-                            'is_call_out': request.is_call_out,
-                            'is_partial_day': request.is_partial_day,
-                            'duration': f"{duration} day{'s' if duration != 1 else ''}",
-                            'reason': request.reason or ''
-                        }
-                    }
-                    calendar_events.append(event)
+                if compact:
+                    return jsonify(_get_daily_counts(requests, window_start, window_end))
 
-            return jsonify(calendar_events)
-        except Exception as e:
-            return jsonify({'error': str(e)}), 500
+                PTORequest.prime_durations(requests)
+
+                calendar_events = build_events(requests, 'team')
+                return jsonify(calendar_events)
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+
+        # Position groups can hold members routed to either manager team
+        return versioned_response([data_versions.MEMBERS, *data_versions.ALL_REQUESTS], build)
 
     @app.route('/dashboard/moa_supervisor')
     @roles_required('moa_supervisor', 'superadmin')
     def moa_supervisor_dashboard():
         """MOA Supervisor dashboard"""
-        from datetime import datetime, timedelta
-
-        # Get MOA positions (positions with 'MOA' in the name)
-        moa_positions = Position.query.filter(Position.name.contains('MOA')).all()
-        moa_pos_ids = [p.id for p in moa_positions]
-
-        # Get MOA team members (excluding inactive)
-        team_employees = TeamMember.query.filter(
-            TeamMember.position_id.in_(moa_pos_ids),
-            ~TeamMember.name.contains('[INACTIVE]')
-        ).order_by(TeamMember.name).all()
-        moa_member_ids = [m.id for m in team_employees]
-
-        # Get pending requests
-        pending_requests = PTORequest.query.filter(
-            PTORequest.member_id.in_(moa_member_ids),
-            PTORequest.status == 'pending'
-        ).all()
-
-        # Get approved requests
-        approved_requests = PTORequest.query.filter(
-            PTORequest.member_id.in_(moa_member_ids),
-            PTORequest.status == 'approved'
-        ).all()
-
-        # Get in_progress requests
-        in_progress_requests = PTORequest.query.filter(
-            PTORequest.member_id.in_(moa_member_ids),
-            PTORequest.status == 'in_progress'
-        ).all()
-
-        # Get currently on PTO
-        today_str = get_eastern_time().strftime('%Y-%m-%d')
-        currently_on_pto = PTORequest.query.filter(
-            PTORequest.member_id.in_(moa_member_ids),
-            PTORequest.status == 'approved',
-            PTORequest.start_date <= today_str,
-            PTORequest.end_date >= today_str
-        ).all()
-
-        # Get pending employee registrations for clinical team (MOAs are clinical)
-        pending_employees = PendingEmployee.query.filter_by(status='pending', team='clinical').all()
-
-        return render_template('dashboard_moa_supervisor.html',
-                               requests=pending_requests,
-                               approved_requests=approved_requests,
-                               in_progress_requests=in_progress_requests,
-                               pending_employees=pending_employees,
-                               currently_on_pto=currently_on_pto,
-                               team_employees=team_employees,
-                               now=get_eastern_time)
+        try:
+            context = DashboardService('moa_supervisor').get_context(request.args)
+        except ValueError:
+            return redirect(url_for('moa_supervisor_dashboard'))
+        return render_template('dashboard_moa_supervisor.html', now=get_eastern_time, **context)
 
     @app.route('/dashboard/echo_supervisor')
     @roles_required('echo_supervisor', 'superadmin')
     def echo_supervisor_dashboard():
         """Echo Supervisor dashboard"""
-        from datetime import datetime, timedelta
-
-        # Get Echo Tech and Vascular Tech positions
-        echo_positions = Position.query.filter(
-            db.or_(Position.name.contains('Echo'), Position.name.contains('Vascular'))
-        ).all()
-        echo_pos_ids = [p.id for p in echo_positions]
-
-        # Get Echo Tech and Vascular Tech team members (excluding inactive)
-        team_employees = TeamMember.query.filter(
-            TeamMember.position_id.in_(echo_pos_ids),
-            ~TeamMember.name.contains('[INACTIVE]')
-        ).order_by(TeamMember.name).all()
-        echo_member_ids = [m.id for m in team_employees]
-
-        # Get pending requests
-        pending_requests = PTORequest.query.filter(
-            PTORequest.member_id.in_(echo_member_ids),
-            PTORequest.status == 'pending'
-        ).all()
-
-        # Get approved requests
-        approved_requests = PTORequest.query.filter(
-            PTORequest.member_id.in_(echo_member_ids),
-            PTORequest.status == 'approved'
-        ).all()
-
-        # Get in_progress requests
-        in_progress_requests = PTORequest.query.filter(
-            PTORequest.member_id.in_(echo_member_ids),
-            PTORequest.status == 'in_progress'
-        ).all()
-
-        # Get currently on PTO
-        today_str = get_eastern_time().strftime('%Y-%m-%d')
-        currently_on_pto = PTORequest.query.filter(
-            PTORequest.member_id.in_(echo_member_ids),
-            PTORequest.status == 'approved',
-            PTORequest.start_date <= today_str,
-            PTORequest.end_date >= today_str
-        ).all()
-
-        # Get pending employee registrations for clinical team (Echo techs are clinical)
-        pending_employees = PendingEmployee.query.filter_by(status='pending', team='clinical').all()
-
-        return render_template('dashboard_echo_supervisor.html',
-                               requests=pending_requests,
-                               approved_requests=approved_requests,
-                               in_progress_requests=in_progress_requests,
-                               pending_employees=pending_employees,
-                               currently_on_pto=currently_on_pto,
-                               team_employees=team_employees,
-                               now=get_eastern_time)
+        try:
+            context = DashboardService('echo_supervisor').get_context(request.args)
+        except ValueError:
+            return redirect(url_for('echo_supervisor_dashboard'))
+        return render_template('dashboard_echo_supervisor.html', now=get_eastern_time, **context)
 
     @app.route('/employees')
     @roles_required('admin', 'clinical', 'superadmin', 'moa_supervisor', 'echo_supervisor')
@@ -964,67 +833,20 @@ def register_routes(app):
         try:
             employee = TeamMember.query.get_or_404(employee_id)
 
-            # Get all PTO requests for this employee
-            pto_requests = PTORequest.query.filter_by(member_id=employee_id).order_by(PTORequest.created_at.desc()).all()
-
-            # Calculate statistics
-            total_requests = len(pto_requests)
-            approved_requests = len([r for r in pto_requests if r.status == 'approved'])
-            pending_requests = len([r for r in pto_requests if r.status == 'pending'])
-            denied_requests = len([r for r in pto_requests if r.status == 'denied'])
-
-            # Calculate call-out statistics
-            total_callouts = len([r for r in pto_requests if r.is_call_out])
-            approved_callouts = len([r for r in pto_requests if r.is_call_out and r.status == 'approved'])
-            pending_callouts = len([r for r in pto_requests if r.is_call_out and r.status == 'pending'])
-
-            # Split approved requests into completed (past) and all approved
-            today_str = get_eastern_time().strftime('%Y-%m-%d')
-
-            # COMPLETED: approved requests where end_date is in the past
-            completed_pto = [r for r in pto_requests if r.status == 'approved' and not r.is_call_out and r.pto_type != 'Sick' and r.end_date <= today_str]
-            completed_sick = [r for r in pto_requests if r.status == 'approved' and r.pto_type == 'Sick' and not r.is_call_out and r.end_date <= today_str]
-            completed_callouts = [r for r in pto_requests if r.status == 'approved' and r.is_call_out and r.end_date <= today_str]
-
-            completed_pto_days = sum(r.duration_days for r in completed_pto)
-            completed_pto_hours = completed_pto_days * 7.5
-            completed_sick_days = sum(r.duration_days for r in completed_sick)
-            completed_sick_hours = completed_sick_days * 7.5
-            completed_callout_days = sum(r.duration_days for r in completed_callouts)
-            completed_callout_hours = completed_callout_days * 7.5
-
-            # Per-type breakdown for Completed (past) section
-            completed_approved = [r for r in pto_requests if r.status == 'approved' and r.end_date <= today_str]
-
-            def _bucket(requests_list):
-                count = len(requests_list)
-                days = sum(r.duration_days for r in requests_list)
-                return {
-                    'count': count,
-                    'days': round(days, 1),
-                    'hours': round(days * 7.5, 1),
-                }
-
-            type_breakdown = {
-                'vacation': _bucket([r for r in completed_approved if not r.is_call_out and r.pto_type == 'Vacation']),
-                'personal': _bucket([r for r in completed_approved if not r.is_call_out and r.pto_type == 'Personal']),
-                'sick_regular': _bucket([r for r in completed_approved if not r.is_call_out and r.pto_type == 'Sick']),
-                'sick_callout': _bucket([r for r in completed_approved if r.is_call_out and (r.callout_classification or 'sick') == 'sick']),
-                'fmla_callout': _bucket([r for r in completed_approved if r.is_call_out and r.callout_classification == 'fmla']),
-                'union_business': _bucket([r for r in completed_approved if not r.is_call_out and r.pto_type == 'Union Business']),
-            }
-
-            # ALL APPROVED: all approved requests regardless of date
-            all_pto = [r for r in pto_requests if r.status == 'approved' and not r.is_call_out and r.pto_type != 'Sick']
-            all_sick = [r for r in pto_requests if r.status == 'approved' and r.pto_type == 'Sick' and not r.is_call_out]
-            all_callouts = [r for r in pto_requests if r.status == 'approved' and r.is_call_out]
-
-            all_pto_days = sum(r.duration_days for r in all_pto)
-            all_pto_hours = all_pto_days * 7.5
-            all_sick_days = sum(r.duration_days for r in all_sick)
-            all_sick_hours = all_sick_days * 7.5
-            all_callout_days = sum(r.duration_days for r in all_callouts)
-            all_callout_hours = all_callout_days * 7.5
+            # One page of the request list, newest first
+            try:
+                page = keyset_page(request_query().filter(PTORequest.member_id == employee_id),
+                                   PTORequest.created_at, PTORequest.id,
+                                   cursor=request.args.get('cursor'),
+                                   per_page=parse_page_size(request.args.get('per_page')))
+            except ValueError:
+                return redirect(url_for('employee_detail', employee_id=employee_id))
+            PTORequest.prime_durations(page.items)
+
+            # Counts and day totals from grouped aggregates instead of the full history
+            today = get_eastern_time().date()
+            stats = get_request_stats(employee_id, today)
+            stats.update(get_tardiness_stats(employee_id))
 
             # Calculate days until PTO refresh
             if employee.pto_refresh_date:
@@ -1036,41 +858,15 @@ def register_routes(app):
                 days_until_refresh = (refresh_date - today).days
             else:
                 days_until_refresh = None
+            stats['days_until_refresh'] = days_until_refresh
 
-            # Get tardiness records for this employee
-            tardiness_records = TardinessRecord.query.filter_by(member_id=employee_id).order_by(TardinessRecord.date.desc()).all()
-            total_tardiness = len(tardiness_records)
-            total_tardiness_minutes = sum(r.minutes_late for r in tardiness_records)
-
-            stats = {
-                'total_requests': total_requests,
-                'approved_requests': approved_requests,
-                'pending_requests': pending_requests,
-                'denied_requests': denied_requests,
-                'total_callouts': total_callouts,
-                'approved_callouts': approved_callouts,
-                'pending_callouts': pending_callouts,
-                # Completed (past dates only)
-                'completed_pto_days': round(completed_pto_days, 1),
-                'completed_pto_hours': round(completed_pto_hours, 1),
-                'completed_sick_days': round(completed_sick_days, 1),
-                'completed_sick_hours': round(completed_sick_hours, 1),
-                'completed_callout_days': round(completed_callout_days, 1),
-                'completed_callout_hours': round(completed_callout_hours, 1),
-                # All approved (including future)
-                'all_pto_days': round(all_pto_days, 1),
-                'all_pto_hours': round(all_pto_hours, 1),
-                'all_sick_days': round(all_sick_days, 1),
-                'all_sick_hours': round(all_sick_hours, 1),
-                'all_callout_days': round(all_callout_days, 1),
-                'all_callout_hours': round(all_callout_hours, 1),
-                'days_until_refresh': days_until_refresh,
-                'total_tardiness': total_tardiness,
-                'total_tardiness_minutes': total_tardiness_minutes,
-                'type_breakdown': type_breakdown,
-            }
+            # Most recent tardiness records for the sidebar
+            tardiness_records = TardinessRecord.query.filter_by(member_id=employee_id).order_by(
+                TardinessRecord.date.desc()).limit(3).all()
 
-            return render_template('employee_detail.html', employee=employee, pto_requests=pto_requests, stats=stats, tardiness_records=tardiness_records)
+            return render_template('employee_detail.html', employee=employee, pto_requests=page.items, page=page,
+                                   stats=stats, tardiness_records=tardiness_records,
+                                   usage_by_year=usage_rollups.get_usage_by_year(employee_id))
         except Exception as e:
             print(f"ERROR in employee_detail for ID {employee_id}: {str(e)}")
             traceback.print_exc()
@@ -1083,69 +879,16 @@ def register_routes(app):
         from datetime import timedelta
 
         employee = TeamMember.query.get_or_404(employee_id)
-        requests = PTORequest.query.filter_by(member_id=employee_id).all()
-
-        events = []
-        for req in requests:
-            # Determine event color based on status
-            if req.is_call_out:
-                color = '#dc3545'  # Red for call-outs
-            elif req.status == 'approved':
-                color = '#28a745'  # Green
-            elif req.status == 'pending':
-                color = '#ffc107'  # Yellow
-            elif req.status == 'denied':
-                color = '#6c757d'  # Gray
-            else:
-                color = '#17a2b8'  # Info blue for other statuses
+        requests = request_query().filter_by(member_id=employee_id).all()
+        PTORequest.prime_durations(requests)
 
-            # Determine title
-            if req.is_call_out:
-                title = f"Call Out - {req.pto_type}"
-            else:
-                title = req.pto_type
-
-            # Calculate end date (FullCalendar uses exclusive end dates, so add 1 day)
-            try:
-                end_date = datetime.strptime(str(req.end_date), '%Y-%m-%d')
-                end_date_exclusive = (end_date + timedelta(days=1)).strftime('%Y-%m-%d')
-            except:
-                end_date_exclusive = str(req.end_date)
-
-            event = {
-                'id': req.id,
-                'title': title,
-                'start': str(req.start_date),
-                'end': end_date_exclusive,
-                'color': color,
-                'allDay': not req.is_partial_day,
-                'extendedProps': {
-                    'type': req.pto_type,
-                    'status': req.status,
-                    'duration': req.duration_days if not req.is_partial_day else f"{req.duration_hours} hours",
-                    'is_partial_day': req.is_partial_day,
-                    'is_call_out': req.is_call_out,
-                    'reason': req.reason or 'Not specified',
-                    'submitted': req.submitted_at.strftime('%m/%d/%Y') if req.submitted_at else 'N/A',
-                    'start_date': str(req.start_date),
-                    'end_date': str(req.end_date)
-                }
-            }
-
-            # For partial day requests, add time information
-            if req.is_partial_day and req.start_time and req.end_time:
-                event['start'] = f"{req.start_date}T{req.start_time}"
-                event['end'] = f"{req.end_date}T{req.end_time}"
-                event['title'] = f"{title} (Partial)"
-                event['allDay'] = False
-
-            events.append(event)
+        events = build_events(requests, 'employee')
 
         # Add tardiness events to the calendar
         tardiness_records = TardinessRecord.query.filter_by(member_id=employee_id).all()
         for record in tardiness_records:
             # Convert date to string for JSON serialization
-            record_date_str = str(record.date) if record.date else None
+            record_date_str = record.date.isoformat() if record.date else None
             event = {
                 'id': f'tardiness_{record.id}',
                 'title': f'Late ({record.minutes_late} min)',
@@ -1190,6 +933,9 @@ def register_routes(app):
         except ValueError:
             return jsonify({'error': 'Minutes late must be a number'}), 400
 
+        if parse_date(date) is None:
+            return jsonify({'error': 'Date must be in YYYY-MM-DD format'}), 400
+
         # Get current manager ID if logged in
         manager_id = session.get('user_id')
 
@@ -1202,6 +948,7 @@ def register_routes(app):
         )
 
         db.session.add(tardiness)
+        usage_rollups.apply_tardiness(tardiness)
         db.session.commit()
 
         return jsonify({
@@ -1216,6 +963,7 @@ def register_routes(app):
         """API endpoint to delete a tardiness record"""
         tardiness = TardinessRecord.query.filter_by(id=tardiness_id, member_id=employee_id).first_or_404()
 
+        usage_rollups.retract_tardiness(tardiness)
         db.session.delete(tardiness)
         db.session.commit()
 
@@ -1238,8 +986,11 @@ def register_routes(app):
         if not pto_request.is_call_out:
             return jsonify({'success': False, 'message': 'Not a call-out request'}), 400
 
+        usage_rollups.retract_request(pto_request)
         pto_request.callout_classification = classification
         pto_request.updated_at = get_eastern_time()
+        usage_rollups.apply_request(pto_request)
+        data_versions.bump_requests(pto_request.manager_team)
         db.session.commit()
 
         return jsonify({'success': True, 'classification': classification})
@@ -1252,9 +1003,15 @@ def register_routes(app):
 
         if request.method == 'POST':
             try:
+                phone = request.form.get('phone')
+                owner = _phone_owner(phone, employee.id)
+                if owner:
+                    flash(f'Phone number {phone} is already assigned to {owner.name}.', 'error')
+                    return render_template('edit_employee.html', employee=employee)
+
                 employee.name = request.form.get('name')
                 employee.email = request.form.get('email')
-                employee.phone = request.form.get('phone')
+                employee.phone = phone
 
                 # Update PTO balance
                 pto_balance = float(request.form.get('pto_balance', employee.pto_balance_hours))
@@ -1264,6 +1021,7 @@ def register_routes(app):
                 sick_balance = float(request.form.get('sick_balance', employee.sick_balance_hours))
                 employee.sick_balance_hours = sick_balance
 
+                data_versions.bump(data_versions.MEMBERS)
                 db.session.commit()
                 flash(f'Employee {employee.name} updated successfully!', 'success')
                 return redirect(url_for('employees'))
@@ -1305,6 +1063,9 @@ def register_routes(app):
                 employee.email = value
                 display_value = value
             elif field == 'phone':
+                owner = _phone_owner(value, employee.id)
+                if owner:
+                    return jsonify({'success': False, 'error': f'Phone number is already assigned to {owner.name}'}), 400
                 employee.phone = value if value else None
                 display_value = value if value else 'Not provided'
             elif field == 'pin':
@@ -1338,6 +1099,7 @@ def register_routes(app):
             else:
                 return jsonify({'success': False, 'error': f'Unknown field: {field}'}), 400
 
+            data_versions.bump(data_versions.MEMBERS)
             db.session.commit()
 
             response = {'success': True, 'display_value': display_value}
@@ -1368,6 +1130,9 @@ def register_routes(app):
         if not start_date or not end_date or not pto_type:
             return jsonify({'success': False, 'error': 'Start date, end date, and PTO type are required'}), 400
 
+        if parse_date(start_date) is None or parse_date(end_date) is None:
+            return jsonify({'success': False, 'error': 'Dates must be in YYYY-MM-DD format'}), 400
+
         # Call-out validation
         if is_call_out and pto_type != 'Sick':
             return jsonify({'success': False, 'error': 'Call-out requests must use Sick type'}), 400
@@ -1400,6 +1165,10 @@ def register_routes(app):
             )
 
             db.session.add(pto_request)
+            usage_rollups.apply_request(pto_request)
+            data_versions.bump_requests(manager_team)
+            db.session.flush()  # Assign the request id for the notification
+            outbox.enqueue('submission_email', request_id=pto_request.id)
             db.session.commit()
 
             # If call-out, automatically deduct from sick balance
@@ -1410,12 +1179,6 @@ def register_routes(app):
                 employee.sick_balance_hours = new_sick_balance
                 db.session.commit()
 
-            # Send email notification
-            try:
-                email_service.send_submission_email(pto_request)
-            except Exception as e:
-                print(f"Failed to send submission email: {str(e)}")
-
             # Different success message for call-out vs regular PTO
             if is_call_out:
                 message = f'Call-out submitted and auto-approved for {employee.name}. Sick time deducted: {pto_request.duration_hours} hrs'
@@ -1444,8 +1207,11 @@ def register_routes(app):
             if '[INACTIVE]' in employee.name:
                 # Delete all PTO requests for this employee
                 PTORequest.query.filter_by(member_id=employee.id).delete()
+                usage_rollups.clear_member(employee.id)
                 # Delete the employee
                 db.session.delete(employee)
+                data_versions.bump(data_versions.MEMBERS)
+                data_versions.bump_requests()
                 db.session.commit()
                 flash(f'Inactive employee {employee_name} and all PTO history deleted permanently.', 'success')
             else:
@@ -1455,11 +1221,14 @@ def register_routes(app):
                 if has_pto_history:
                     # Mark as inactive instead of deleting
                     employee.name = f'[INACTIVE] {employee.name}'
+                    data_versions.bump(data_versions.MEMBERS)
                     db.session.commit()
                     flash(f'Employee {employee_name} marked as inactive due to PTO history.', 'info')
                 else:
                     # Safe to delete (no PTO history)
+                    usage_rollups.clear_member(employee.id)
                     db.session.delete(employee)
+                    data_versions.bump(data_versions.MEMBERS)
                     db.session.commit()
                     flash(f'Employee {employee_name} deleted successfully.', 'success')
 
@@ -1479,9 +1248,11 @@ def register_routes(app):
                 flash('This request has already been processed.', 'warning')
                 return redirect(url_for('dashboard'))
 
+            usage_rollups.retract_request(pto_request)
             pto_request.status = 'approved'
             pto_request.approved_date = get_eastern_time()
             pto_request.updated_at = get_eastern_time()
+            usage_rollups.apply_request(pto_request)
 
             # Deduct hours from employee balance
             member = pto_request.member
@@ -1496,14 +1267,10 @@ def register_routes(app):
                 member.pto_balance_hours = max(0, current_balance - hours_to_deduct)
                 print(f"Deducted {hours_to_deduct} PTO hrs from {member.name}. Balance: {member.pto_balance_hours}")
 
+            data_versions.bump_requests(pto_request.manager_team)
+            outbox.enqueue('approval_email', request_id=pto_request.id)
             db.session.commit()
 
-            # Send email notification for approval
-            try:
-                email_service.send_approval_email(pto_request)
-            except Exception as e:
-                print(f"Failed to send approval email: {str(e)}")
-
             flash(f'PTO request for {member.name} approved! {hours_to_deduct} hours deducted.', 'success')
 
         except Exception as e:
@@ -1519,19 +1286,15 @@ def register_routes(app):
             pto_request = PTORequest.query.get_or_404(request_id)
             denial_reason = request.form.get('denial_reason', 'No reason provided')
 
+            usage_rollups.retract_request(pto_request)
             pto_request.status = 'denied'
             pto_request.updated_at = get_eastern_time()
             pto_request.denial_reason = denial_reason
 
+            data_versions.bump_requests(pto_request.manager_team)
+            outbox.enqueue('denial_email', request_id=pto_request.id, reason=denial_reason)
             db.session.commit()
 
-            # Send email notification for denial
-            try:
-                email_service.send_denial_email(pto_request, denial_reason)
-            except Exception as e:
-                # Log error but don't fail the request
-                print(f"Failed to send denial email: {str(e)}")
-
             flash(f'PTO request for {pto_request.member.name} has been denied.', 'warning')
 
         except Exception as e:
@@ -1581,6 +1344,7 @@ def register_routes(app):
         pending_employee.approved_by_id = user_id
 
         db.session.add(new_member)
+        data_versions.bump(data_versions.MEMBERS, data_versions.PENDING_EMPLOYEES)
         db.session.commit()
 
         flash(f'Employee {pending_employee.name} has been approved and added to the {pending_employee.team} team.', 'success')
@@ -1617,6 +1381,7 @@ def register_routes(app):
         if denial_reason:
             pending_employee.denial_reason = denial_reason
 
+        data_versions.bump(data_versions.PENDING_EMPLOYEES)
         db.session.commit()
 
         flash(f'Employee registration for {pending_employee.name} has been denied.', 'info')
@@ -1625,57 +1390,91 @@ def register_routes(app):
     @app.route('/workqueue/in_progress')
     @roles_required('admin', 'clinical', 'superadmin')
     def workqueue_in_progress():
-        """View in-progress PTO requests with checklist"""
-        user_role = session.get('user_role', '')
-
-        # Get in-progress requests based on role
-        if user_role == 'superadmin':
-            in_progress_requests = PTORequest.query.filter_by(status='in_progress').all()
-        elif user_role == 'admin':
-            in_progress_requests = PTORequest.query.filter_by(status='in_progress', manager_team='admin').all()
-        elif user_role == 'clinical':
-            in_progress_requests = PTORequest.query.filter_by(status='in_progress', manager_team='clinical').all()
-        else:
-            in_progress_requests = []
+        """View in-progress PTO requests with checklist, one page at a time"""
+        query = _workqueue_query('in_progress')
+        if query is None:
+            return render_template('workqueue_in_progress.html', requests=[], page=None, total=0, now=get_eastern_time)
+        try:
+            page = _workqueue_page(query, request.args)
+        except ValueError:
+            return redirect(url_for('workqueue_in_progress'))
 
-        return render_template('workqueue_in_progress.html', requests=in_progress_requests, now=get_eastern_time)
+        return render_template('workqueue_in_progress.html', requests=page.items, page=page,
+                               total=query.count(), now=get_eastern_time)
 
     @app.route('/workqueue/approved')
     @roles_required('admin', 'clinical', 'superadmin')
     def workqueue_approved():
-        """View approved PTO requests"""
-        user_role = session.get('user_role', '')
+        """View approved PTO requests, one page at a time"""
+        from datetime import datetime
 
-        # Get approved requests based on role
-        if user_role == 'superadmin':
-            approved_requests = PTORequest.query.filter_by(status='approved').all()
-        elif user_role == 'admin':
-            approved_requests = PTORequest.query.filter_by(status='approved', manager_team='admin').all()
-        elif user_role == 'clinical':
-            approved_requests = PTORequest.query.filter_by(status='approved', manager_team='clinical').all()
-        else:
-            approved_requests = []
+        query = _workqueue_query('approved')
+        if query is None:
+            return render_template('workqueue_approved.html', requests=[], page=None, total=0,
+                                   now=get_eastern_time, datetime=datetime)
+        try:
+            page = _workqueue_page(query, request.args)
+        except ValueError:
+            return redirect(url_for('workqueue_approved'))
 
-        from datetime import datetime
-        return render_template('workqueue_approved.html', requests=approved_requests, now=get_eastern_time, datetime=datetime)
+        return render_template('workqueue_approved.html', requests=page.items, page=page,
+                               total=query.count(), now=get_eastern_time, datetime=datetime)
 
     @app.route('/workqueue/completed')
     @roles_required('admin', 'clinical', 'superadmin')
     def workqueue_completed():
-        """View completed PTO requests"""
+        """View completed PTO requests, one page at a time, with summary stats over the whole queue"""
+        query = _workqueue_query('completed')
+        if query is None:
+            return render_template('workqueue_completed.html', requests=[], page=None, total=0,
+                                   total_days_used=0, most_common_type=None, first_end=None, last_end=None,
+                                   now=get_eastern_time)
+        try:
+            page = _workqueue_page(query, request.args)
+        except ValueError:
+            return redirect(url_for('workqueue_completed'))
+
+        # Summary stats in SQL so they cover every completed request, not just this page
+        total, total_days_used, first_end, last_end = query.with_entities(
+            db.func.count(PTORequest.id),
+            db.func.coalesce(db.func.sum(PTORequest.business_days), 0),
+            db.func.min(PTORequest.end_date),
+            db.func.max(PTORequest.end_date)
+        ).one()
+        most_common_type = query.with_entities(PTORequest.pto_type).group_by(PTORequest.pto_type).order_by(
+            db.func.count(PTORequest.id).desc()
+        ).limit(1).scalar()
+
+        return render_template('workqueue_completed.html', requests=page.items, page=page, total=total,
+                               total_days_used=total_days_used, most_common_type=most_common_type,
+                               first_end=first_end, last_end=last_end, now=get_eastern_time)
+
+    @app.route('/api/workqueue/<status>')
+    @roles_required('admin', 'clinical', 'superadmin')
+    def api_workqueue(status):
+        """Infinite-scroll form of the workqueues: one page of rows plus the cursor for the next.
+        Query params: cursor (from the previous response), per_page (25, 50 or 100)"""
+        if status not in ('in_progress', 'approved', 'completed'):
+            return jsonify({'error': f'Unknown workqueue: {status}'}), 404
         user_role = session.get('user_role', '')
+        query = _workqueue_query(status)
 
-        # Get completed requests based on role
-        if user_role == 'superadmin':
-            completed_requests = PTORequest.query.filter_by(status='completed').all()
-        elif user_role == 'admin':
-            completed_requests = PTORequest.query.filter_by(status='completed', manager_team='admin').all()
-        elif user_role == 'clinical':
-            completed_requests = PTORequest.query.filter_by(status='completed', manager_team='clinical').all()
-        else:
-            completed_requests = []
+        def build():
+            try:
+                page = _workqueue_page(query, request.args)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify({
+                'requests': [_request_row(req) for req in page.items],
+                'next_cursor': page.next_cursor,
+                'per_page': page.per_page,
+            })
 
-        return render_template('workqueue_completed.html', requests=completed_requests, now=get_eastern_time)
+        if user_role in data_versions.TEAMS:
+            keys = [data_versions.MEMBERS, data_versions.requests_key(user_role)]
+        else:
+            keys = [data_versions.MEMBERS, *data_versions.ALL_REQUESTS]
+        return versioned_response(keys, build)
 
     @app.route('/update_checklist/<int:request_id>', methods=['POST'])
     @roles_required('admin', 'clinical', 'superadmin')
@@ -1688,6 +1487,7 @@ def register_routes(app):
         pto_request.coverage_arranged = request.form.get('coverage_arranged') == 'on'
 
         # If both are complete, move to approved status
+        # (in_progress and approved both count as used, so usage rollups don't change)
         if pto_request.timekeeping_entered and pto_request.coverage_arranged:
             pto_request.status = 'approved'
             flash(f'PTO request for {pto_request.member.name} is now fully approved!', 'success')
@@ -1695,6 +1495,7 @@ def register_routes(app):
             # No email sent when checklist is completed (per updated requirements)
 
         pto_request.updated_at = get_eastern_time()
+        data_versions.bump_requests(pto_request.manager_team)
         db.session.commit()
 
         return redirect(url_for('workqueue_in_progress'))
@@ -1722,7 +1523,9 @@ def register_routes(app):
             CallOutRecord.query.filter_by(pto_request_id=request_id).delete()
 
             # Delete the PTO request
+            usage_rollups.retract_request(pto_request)
             db.session.delete(pto_request)
+            data_versions.bump_requests(pto_request.manager_team)
             db.session.commit()
 
             flash(f'PTO request for {employee_name} has been deleted. Balance restored if applicable.', 'success')
@@ -1748,11 +1551,15 @@ def register_routes(app):
                 was_approved = pto_request.status in ['approved', 'in_progress', 'completed']
 
                 # Get new values from form
-                new_start_date = request.form.get('start_date')
-                new_end_date = request.form.get('end_date')
+                new_start_date = parse_date(request.form.get('start_date'))
+                new_end_date = parse_date(request.form.get('end_date'))
                 new_pto_type = request.form.get('pto_type')
                 new_reason = request.form.get('reason', '')
 
+                if new_start_date is None or new_end_date is None:
+                    flash('Please enter valid start and end dates.', 'error')
+                    return render_template('edit_request.html', request=pto_request, member=member)
+
                 # If request was approved, we need to adjust balance
                 if was_approved:
                     # Restore old balance first
@@ -1762,11 +1569,14 @@ def register_routes(app):
                         member.pto_balance_hours = float(member.pto_balance_hours or 0) + old_hours
 
                 # Update request fields
+                usage_rollups.retract_request(pto_request)
                 pto_request.start_date = new_start_date
                 pto_request.end_date = new_end_date
                 pto_request.pto_type = new_pto_type
                 pto_request.reason = new_reason
+                pto_request.refresh_duration()
                 pto_request.updated_at = get_eastern_time()
+                usage_rollups.apply_request(pto_request)
 
                 # If request was approved, deduct new balance
                 if was_approved:
@@ -1776,6 +1586,7 @@ def register_routes(app):
                     else:
                         member.pto_balance_hours = float(member.pto_balance_hours or 0) - new_hours
 
+                data_versions.bump_requests(pto_request.manager_team)
                 db.session.commit()
 
                 flash(f'PTO request for {member.name} has been updated successfully.', 'success')
@@ -1796,20 +1607,20 @@ def register_routes(app):
         today = date.today()
 
         # Find approved requests where end date has passed
-        approved_requests = PTORequest.query.filter_by(status='approved').all()
+        ended_requests = PTORequest.query.filter(
+            PTORequest.status == 'approved',
+            PTORequest.end_date < today
+        ).all()
 
+        # approved and completed both count as used, so usage rollups don't change
         completed_count = 0
-        for request in approved_requests:
-            try:
-                end_date = datetime.strptime(request.end_date, '%Y-%m-%d').date()
-                if end_date < today:
-                    request.status = 'completed'
-                    request.completed_date = get_eastern_time()
-                    completed_count += 1
-            except:
-                pass
+        for request in ended_requests:
+            request.status = 'completed'
+            request.completed_date = get_eastern_time()
+            completed_count += 1
 
         if completed_count > 0:
+            data_versions.bump_requests(*{r.manager_team for r in ended_requests})
             db.session.commit()
             flash(f'{completed_count} PTO requests marked as completed.', 'info')
 
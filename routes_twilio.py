@@ -4,8 +4,7 @@ Handles incoming SMS messages from Twilio
 """
 
 from flask import request
-from twilio_service import TwilioSMSService
-from email_service import EmailService
+from services import get_sms_service
 import logging
 
 # Configure logging
@@ -16,9 +15,8 @@ logger = logging.getLogger(__name__)
 def register_twilio_routes(app):
     """Register Twilio SMS webhook routes with the Flask app"""
 
-    # Initialize services
-    sms_service = TwilioSMSService()
-    email_service = EmailService()
+    # Shared service; the Twilio client loads on first use
+    sms_service = get_sms_service()
 
     # ========================================
     # SMS ROUTES
@@ -52,7 +50,7 @@ def register_twilio_routes(app):
                 )
                 return twiml_response, 200, {'Content-Type': 'text/xml'}
 
-            # Create PTO request and CallOutRecord
+            # Create PTO request and CallOutRecord, and queue the notifications
             pto_request = sms_service.create_call_out_request(
                 member=member,
                 message_sid=message_sid,
@@ -60,42 +58,7 @@ def register_twilio_routes(app):
                 from_number=from_number
             )
 
-            # Send email notification to manager
-            try:
-                email_service.send_submission_email(pto_request)
-            except Exception as e:
-                logger.error(f"Failed to send email notification: {str(e)}")
-
-            # Send SMS confirmation to employee using Twilio API
-            sms_service.send_employee_confirmation_sms(
-                to_number=from_number,
-                employee_name=member.name,
-                request_id=pto_request.id
-            )
-
-            # Look up active SMS recipients for this employee's team from the DB
-            from models import SMSRecipient
-            manager_team = member.position.team if member.position else None
-            recipients = []
-            if manager_team in ('admin', 'clinical'):
-                recipients = SMSRecipient.query.filter(
-                    SMSRecipient.active == True,
-                    SMSRecipient.team.in_([manager_team, 'both'])
-                ).all()
-
-            logger.info(
-                f"Manager team: {manager_team}, "
-                f"recipients: {[r.phone for r in recipients]}"
-            )
-
-            for recipient in recipients:
-                sms_service.send_manager_notification_sms(
-                    recipient.phone,
-                    member.name,
-                    pto_request.id
-                )
-
-            # Generate empty TwiML response (SMS already sent via API)
+            # Generate empty TwiML response (SMS are sent via the API from the outbox)
             twiml_response = '<?xml version="1.0" encoding="UTF-8"?><Response></Response>'
 
             return twiml_response, 200, {'Content-Type': 'text/xml'}
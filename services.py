@@ -0,0 +1,33 @@
+"""
+Shared services
+One EmailService and one TwilioSMSService per process, created on first use
+and shared by the routes, PTOTrackerSystem and the Twilio webhooks. Both keep
+their API clients (and the sendgrid / twilio packages) unloaded until they
+actually send something.
+"""
+
+import threading
+
+_lock = threading.Lock()
+_email_service = None
+_sms_service = None
+
+
+def get_email_service():
+    global _email_service
+    if _email_service is None:
+        with _lock:
+            if _email_service is None:
+                from email_service import EmailService
+                _email_service = EmailService()
+    return _email_service
+
+
+def get_sms_service():
+    global _sms_service
+    if _sms_service is None:
+        with _lock:
+            if _sms_service is None:
+                from twilio_service import TwilioSMSService
+                _sms_service = TwilioSMSService()
+    return _sms_service
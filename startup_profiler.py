@@ -0,0 +1,86 @@
+"""
+Startup profiler
+Times the phases of app startup (imports and config, route registration,
+database initialization) and prints a one-line breakdown once the app is
+ready. With STARTUP_PROFILE=1 it also times every module imported during
+startup and lists the slowest ones.
+
+Run with: STARTUP_PROFILE=1 python app.py   (or any entry point that imports app)
+STARTUP_PROFILE_TOP sets how many modules are listed (default 25).
+
+app.py imports this module first, so the clock starts before anything else loads.
+"""
+
+import builtins
+import os
+import sys
+import threading
+import time
+
+ENABLED = os.environ.get('STARTUP_PROFILE', '').lower() in ('1', 'true', 'yes')
+
+_started = time.perf_counter()
+_last_mark = _started
+# (phase, seconds) in the order they finished
+_phases = []
+# module name -> (inclusive seconds, self seconds) for modules first imported during startup
+_imports = {}
+# time spent in nested imports of each import currently in progress
+_stack = []
+_original_import = None
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules or threading.current_thread() is not threading.main_thread():
+        return _original_import(name, globals, locals, fromlist, level)
+
+    started = time.perf_counter()
+    _stack.append(0.0)
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - started
+        nested = _stack.pop()
+        if _stack:
+            _stack[-1] += elapsed
+        _imports.setdefault(name, (elapsed, elapsed - nested))
+
+
+def install():
+    """Start timing imports when STARTUP_PROFILE is set"""
+    global _original_import
+    if ENABLED and _original_import is None:
+        _original_import = builtins.__import__
+        builtins.__import__ = _timed_import
+
+
+def _uninstall():
+    global _original_import
+    if _original_import is not None:
+        builtins.__import__ = _original_import
+        _original_import = None
+
+
+def mark(phase):
+    """Record the time since the previous mark (or since startup) as phase"""
+    global _last_mark
+    now = time.perf_counter()
+    _phases.append((phase, now - _last_mark))
+    _last_mark = now
+
+
+def report():
+    """Print the phase breakdown and, when profiling, the slowest imports"""
+    _uninstall()
+    total = time.perf_counter() - _started
+    print('Startup: ' + ', '.join(f'{phase} {seconds * 1000:.0f} ms' for phase, seconds in _phases)
+          + f', total {total * 1000:.0f} ms')
+
+    if not ENABLED or not _imports:
+        return
+    top = int(os.environ.get('STARTUP_PROFILE_TOP', '25'))
+    slowest = sorted(_imports.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    print(f'Slowest imports ({len(_imports)} modules loaded during startup):')
+    print(f'  {"total ms":>9} {"self ms":>8}  module')
+    for name, (inclusive, own) in slowest:
+        print(f'  {inclusive * 1000:9.1f} {own * 1000:8.1f}  {name}')
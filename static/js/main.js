@@ -32,28 +32,40 @@ document.addEventListener('DOMContentLoaded', function() {
     const emailInput = document.getElementById('email');
 
     if (teamSelect && positionSelect && nameSelect) {
-        let staffDirectory = {};
+        let positionsByTeam = null;
+        const notListedOptions = '<option value="">Select Team Member</option><option value="NOT_LISTED" data-custom="true">🔍 I\'m not listed - Register as new employee</option>';
 
-        // Load staff directory from API
-        async function loadStaffDirectory() {
+        // Positions are small and cached; names are fetched per position from the search API
+        async function loadPositions() {
             try {
-                const response = await fetch('/api/staff-directory');
+                const response = await fetch('/api/positions');
                 if (response.ok) {
-                    staffDirectory = await response.json();
+                    positionsByTeam = await response.json();
                 } else {
-                    console.error('Failed to load staff directory');
+                    console.error('Failed to load positions');
                 }
             } catch (error) {
-                console.error('Error loading staff directory:', error);
+                console.error('Error loading positions:', error);
             }
         }
 
-        // Initial load of staff directory
-        loadStaffDirectory();
+        async function loadPositionMembers(team, position) {
+            const params = new URLSearchParams({ team: team, position: position, limit: 200 });
+            try {
+                const response = await fetch(`/api/employees/search?${params}`);
+                if (response.ok) {
+                    return (await response.json()).results;
+                }
+                console.error('Failed to load team members');
+            } catch (error) {
+                console.error('Error loading team members:', error);
+            }
+            return [];
+        }
 
         // Make refresh function available globally
         window.refreshStaffDirectory = async function() {
-            await loadStaffDirectory();
+            positionsByTeam = null;
             // Also refresh the currently selected team/position dropdowns
             if (teamSelect.value) {
                 teamSelect.dispatchEvent(new Event('change'));
@@ -62,19 +74,18 @@ document.addEventListener('DOMContentLoaded', function() {
 
         teamSelect.addEventListener('change', async function() {
             const selectedTeam = this.value;
-            
+
             // Clear position dropdown
             positionSelect.innerHTML = '<option value="">Select Position</option>';
-            nameSelect.innerHTML = '<option value="">Select Team Member</option><option value="NOT_LISTED" data-custom="true">🔍 I\'m not listed - Register as new employee</option>';
+            nameSelect.innerHTML = notListedOptions;
             emailInput.value = '';
-            
-            // Make sure staff directory is loaded
-            if (Object.keys(staffDirectory).length === 0) {
-                await loadStaffDirectory();
-            }
-            
-            if (selectedTeam && staffDirectory[selectedTeam]) {
-                Object.keys(staffDirectory[selectedTeam]).forEach(position => {
+
+            if (!positionsByTeam) {
+                await loadPositions();
+            }
+
+            if (selectedTeam && positionsByTeam && positionsByTeam[selectedTeam]) {
+                [...positionsByTeam[selectedTeam]].sort().forEach(position => {
                     const option = document.createElement('option');
                     option.value = position;
                     option.textContent = position;
@@ -86,18 +97,18 @@ document.addEventListener('DOMContentLoaded', function() {
         positionSelect.addEventListener('change', async function() {
             const selectedTeam = teamSelect.value;
             const selectedPosition = this.value;
-            
+
             // Clear name dropdown
-            nameSelect.innerHTML = '<option value="">Select Team Member</option><option value="NOT_LISTED" data-custom="true">🔍 I\'m not listed - Register as new employee</option>';
+            nameSelect.innerHTML = notListedOptions;
             emailInput.value = '';
-            
-            // Make sure staff directory is loaded
-            if (Object.keys(staffDirectory).length === 0) {
-                await loadStaffDirectory();
-            }
-            
-            if (selectedTeam && selectedPosition && staffDirectory[selectedTeam] && staffDirectory[selectedTeam][selectedPosition]) {
-                staffDirectory[selectedTeam][selectedPosition].forEach(member => {
+
+            if (selectedTeam && selectedPosition) {
+                const members = await loadPositionMembers(selectedTeam, selectedPosition);
+                // Ignore a response for a position that is no longer selected
+                if (teamSelect.value !== selectedTeam || positionSelect.value !== selectedPosition) {
+                    return;
+                }
+                members.forEach(member => {
                     const option = document.createElement('option');
                     option.value = member.name;
                     option.textContent = member.name;
@@ -117,6 +128,77 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
+    // Dashboard "My Team" search: the page renders the first few members and
+    // the search box queries /api/employees/search for the rest
+    const teamSearch = document.getElementById('teamSearch');
+    const teamList = document.getElementById('teamList');
+    const teamCount = document.getElementById('teamCount');
+
+    if (teamSearch && teamList) {
+        const initialList = teamList.innerHTML;
+        const initialCount = teamCount ? teamCount.textContent : '';
+        const detailUrl = teamSearch.dataset.detailUrl;  // employee detail URL ending in /0
+        let searchTimer = null;
+        let latestTerm = '';
+
+        function renderTeamMembers(members) {
+            teamList.innerHTML = '';
+            members.forEach(member => {
+                const link = document.createElement('a');
+                link.href = detailUrl.replace(/0$/, member.id);
+                link.className = 'list-group-item list-group-item-action d-flex justify-content-between align-items-center py-2 team-member-item';
+
+                const text = document.createElement('div');
+                const name = document.createElement('strong');
+                name.textContent = member.name;
+                const position = document.createElement('small');
+                position.className = 'text-muted';
+                position.textContent = member.position || 'No position';
+                text.append(name, document.createElement('br'), position);
+
+                const chevron = document.createElement('i');
+                chevron.className = 'fas fa-chevron-right text-muted';
+
+                link.append(text, chevron);
+                teamList.appendChild(link);
+            });
+            if (teamCount) {
+                teamCount.textContent = members.length;
+            }
+        }
+
+        async function searchTeam(term) {
+            const params = new URLSearchParams({ q: term, limit: 25 });
+            try {
+                const response = await fetch(`${teamSearch.dataset.searchUrl}?${params}`);
+                if (!response.ok) {
+                    console.error('Team search failed');
+                    return;
+                }
+                const data = await response.json();
+                // Ignore responses for a term that has since changed
+                if (term === latestTerm) {
+                    renderTeamMembers(data.results);
+                }
+            } catch (error) {
+                console.error('Error searching team:', error);
+            }
+        }
+
+        teamSearch.addEventListener('input', function() {
+            latestTerm = this.value.trim();
+            clearTimeout(searchTimer);
+            if (!latestTerm) {
+                teamList.innerHTML = initialList;
+                if (teamCount) {
+                    teamCount.textContent = initialCount;
+                }
+                return;
+            }
+            searchTimer = setTimeout(() => searchTeam(latestTerm), 200);
+        });
+    }
+
     // Auto-dismiss alerts after 5 seconds
     const alerts = document.querySelectorAll('.alert');
     alerts.forEach(alert => {
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Test that every business-day count agrees with a plain day-by-day walk.
+
+Checks calculate_pto_days, get_pto_breakdown and both paths of
+get_pto_breakdown_batch (NumPy and the business-day index) against a walk
+over every date that uses get_mount_sinai_holidays directly, for random
+ranges across year ends plus reversed and unparseable ones.
+
+Run with: python -m pytest test_business_days.py   (or python test_business_days.py)
+"""
+
+import random
+import sys
+from datetime import date, timedelta
+
+import pytest
+
+import business_days
+from business_days import (
+    BusinessDaysCalculator, calculate_pto_days, calculate_pto_days_batch,
+    get_pto_breakdown, get_pto_breakdown_batch,
+)
+
+KEYS = ('total_days', 'business_days', 'weekend_days', 'holiday_days')
+
+
+def walked_breakdown(start, end):
+    """Reference counts: look at every date in [start, end]"""
+    counts = dict.fromkeys(KEYS, 0)
+    day = start
+    while day <= end:
+        # Next year's holidays too: New Year's Day on a Saturday is observed on Dec 31
+        holidays = (BusinessDaysCalculator.get_mount_sinai_holidays(day.year)
+                    | BusinessDaysCalculator.get_mount_sinai_holidays(day.year + 1))
+        counts['total_days'] += 1
+        if day.weekday() >= 5:
+            counts['weekend_days'] += 1
+        elif day in holidays:
+            counts['holiday_days'] += 1
+        else:
+            counts['business_days'] += 1
+        day += timedelta(days=1)
+    return counts
+
+
+def random_ranges(count=400, seed=20261018):
+    rng = random.Random(seed)
+    ranges = []
+    for _ in range(count):
+        start = date(2022, 1, 1) + timedelta(days=rng.randrange(365 * 10))
+        ranges.append((start, start + timedelta(days=rng.choice([0, 1, 4, 13, 40, 200, 800]))))
+    # Ranges that start or end on a holiday, and ones that span New Year
+    ranges += [(date(2025, 12, 25), date(2025, 12, 25)), (date(2025, 12, 24), date(2026, 1, 2)),
+               (date(2026, 7, 3), date(2026, 7, 6)), (date(2032, 12, 30), date(2033, 1, 4))]
+    return ranges
+
+
+@pytest.fixture(params=['numpy', 'index'])
+def batch_path(request, monkeypatch):
+    """Run the batch functions on NumPy and on the business-day index fallback"""
+    if request.param == 'numpy':
+        pytest.importorskip('numpy')
+    else:
+        monkeypatch.setattr(business_days, '_numpy', lambda: None)
+    return request.param
+
+
+def test_single_range_counts_match_walk():
+    for start, end in random_ranges():
+        expected = walked_breakdown(start, end)
+        breakdown = get_pto_breakdown(start, end)
+        assert {key: breakdown[key] for key in KEYS} == expected, (start, end)
+        assert calculate_pto_days(start, end) == expected['business_days'], (start, end)
+        assert calculate_pto_days(start.isoformat(), end.isoformat()) == expected['business_days']
+
+
+def test_batch_matches_single_range(batch_path):
+    ranges = random_ranges()
+    starts = [s for s, _ in ranges]
+    ends = [e for _, e in ranges]
+
+    batch = get_pto_breakdown_batch(starts, ends)
+    for i, (start, end) in enumerate(ranges):
+        single = get_pto_breakdown(start, end)
+        assert {key: batch[key][i] for key in KEYS} == {key: single[key] for key in KEYS}, (start, end)
+    assert calculate_pto_days_batch(starts, ends) == [calculate_pto_days(s, e) for s, e in ranges]
+
+
+def test_batch_counts_bad_ranges_as_zero(batch_path):
+    starts = ['2026-03-10', 'not a date', None, date(2026, 3, 2)]
+    ends = ['2026-03-02', '2026-03-05', '2026-03-05', '2026-03-06']
+    batch = get_pto_breakdown_batch(starts, ends)
+    for i in range(3):
+        assert {key: batch[key][i] for key in KEYS} == dict.fromkeys(KEYS, 0)
+    assert batch['business_days'][3] == calculate_pto_days(date(2026, 3, 2), date(2026, 3, 6)) == 5
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Test that the employee search index follows member changes.
+
+The SQLite FTS table is refilled once per members version, with the version
+it was filled from kept in data_versions, and the startup steps that move or
+remove members bump that version.
+
+Run with: python -m pytest test_employee_search.py   (or python test_employee_search.py)
+"""
+
+import sys
+
+import pytest
+
+import data_versions
+import employee_search
+
+
+@pytest.fixture
+def sqlite_search(app):
+    with app.app_context():
+        if employee_search.init_search_index() != 'sqlite':
+            pytest.skip('FTS5 is not available')
+
+
+def members_version():
+    return data_versions.get_versions([data_versions.MEMBERS])[data_versions.MEMBERS]
+
+
+def add_member(name, email, position_name='RNs'):
+    from database import db
+    from models import Position, TeamMember
+
+    position = Position.query.filter_by(name=position_name).first()
+    member = TeamMember(name=name, email=email, position_id=position.id)
+    db.session.add(member)
+    data_versions.bump(data_versions.MEMBERS)
+    db.session.commit()
+    return member
+
+
+def test_index_is_refilled_once_per_members_version(app, sqlite_search):
+    with app.app_context():
+        add_member('Quillon Searchtest', 'quillon.searchtest@mountsinai.org')
+        assert [r['name'] for r in employee_search.search_employees('quillon')] == ['Quillon Searchtest']
+        marker = data_versions.get_versions([employee_search.INDEX_KEY])[employee_search.INDEX_KEY]
+        assert marker == members_version()
+
+        # Another process already refilled for this version: the table is left alone
+        add_member('Quillon Second', 'quillon.second@mountsinai.org')
+        from database import db
+        from models import DataVersion
+        db.session.get(DataVersion, employee_search.INDEX_KEY).version = members_version()
+        db.session.commit()
+        assert [r['name'] for r in employee_search.search_employees('quillon')] == ['Quillon Searchtest']
+
+        # The next change refills it
+        data_versions.bump(data_versions.MEMBERS)
+        db.session.commit()
+        names = sorted(r['name'] for r in employee_search.search_employees('quillon'))
+        assert names == ['Quillon Searchtest', 'Quillon Second']
+
+
+@pytest.mark.parametrize('step', ['rename_positions', 'migrate_admin_positions', 'cleanup_test_accounts'])
+def test_member_moving_steps_bump_members(app, step):
+    import app as app_module
+    from database import db
+    from models import Position
+
+    with app.app_context():
+        if step == 'rename_positions':
+            db.session.add(Position(name='CVI RNs', team='clinical'))
+            db.session.commit()
+            add_member('Renamed Position Member', 'renamed.position@mountsinai.org', 'CVI RNs')
+        elif step == 'migrate_admin_positions':
+            db.session.add(Position(name='CT Desk', team='admin'))
+            db.session.commit()
+            add_member('Old Desk Member', 'old.desk@mountsinai.org', 'CT Desk')
+        else:
+            add_member('Test Account', 'test.account@example.com')
+
+        before = members_version()
+        getattr(app_module, step)()
+        assert members_version() > before
+
+        # Nothing left to change: no bump
+        before = members_version()
+        getattr(app_module, step)()
+        assert members_version() == before
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
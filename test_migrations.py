@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Test the startup migration runner's lease.
+
+A step that outlives the lease keeps it through the heartbeat; a step whose
+lease is taken over by another process is not recorded and stays pending.
+
+Run with: python -m pytest test_migrations.py   (or python test_migrations.py)
+"""
+
+import sys
+import time
+
+import pytest
+from sqlalchemy import update
+
+import migrations
+
+VERSION = 100000  # Far past the app's own steps
+
+
+@pytest.fixture
+def fast_lease(app, monkeypatch):
+    monkeypatch.setattr(migrations, 'HEARTBEAT_SECONDS', 0.1)
+    yield
+    from database import db
+    from models import SchemaLock, SchemaVersion
+    with app.app_context():
+        db.session.query(SchemaVersion).filter(SchemaVersion.version >= VERSION).delete()
+        db.session.execute(update(SchemaLock).values(owner=None, expires_at=None))
+        db.session.commit()
+
+
+def lease_owner(app):
+    from database import db
+    from models import SchemaLock
+    with db.engine.connect() as connection:
+        return connection.execute(db.select(SchemaLock.owner)).scalar()
+
+
+def test_heartbeat_keeps_the_lease_during_a_long_step(app, fast_lease, monkeypatch):
+    monkeypatch.setattr(migrations, 'LEASE_SECONDS', 0.3)
+    owners = []
+
+    def slow_step():
+        for _ in range(4):
+            time.sleep(0.2)
+            owners.append(lease_owner(app))
+
+    with app.app_context():
+        assert migrations.run_pending([(VERSION, 'slow', slow_step)]) == 1
+        assert migrations.current_version() == VERSION
+    assert len(set(owners)) == 1 and owners[0] is not None
+
+
+def test_lost_lease_leaves_the_step_pending(app, fast_lease):
+    from database import db
+    from models import SchemaLock
+
+    def step_taken_over():
+        # Another process takes the lease while this step runs
+        with db.engine.begin() as connection:
+            connection.execute(update(SchemaLock).values(owner='other-process'))
+        time.sleep(0.5)
+
+    ran = []
+    with app.app_context():
+        before = migrations.current_version()
+        with pytest.raises(migrations.LeaseLost):
+            migrations.run_pending([
+                (VERSION, 'taken_over', step_taken_over),
+                (VERSION + 1, 'next', lambda: ran.append(True)),
+            ])
+        assert migrations.current_version() == before
+        assert lease_owner(app) == 'other-process'
+    assert ran == []
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
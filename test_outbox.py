@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""Test that outbox claims count as attempts.
+
+A dispatcher that dies mid-send leaves its message 'sending' until the claim
+expires. These checks make sure such a message is still counted towards
+MAX_ATTEMPTS and dead-lettered, instead of being re-sent forever.
+
+Run with: python -m pytest test_outbox.py   (or python test_outbox.py)
+"""
+
+import sys
+from datetime import timedelta
+
+import pytest
+
+
+@pytest.fixture
+def message(app):
+    """The only due message in the outbox, for a request that doesn't exist (so it is skipped if sent)"""
+    import outbox
+    from database import db
+    from models import OutboxMessage
+
+    with app.app_context():
+        db.session.query(OutboxMessage).filter(OutboxMessage.status.in_(('pending', 'sending'))).delete()
+        message = outbox.enqueue('submission_email', request_id=0)
+        db.session.commit()
+        message_id = message.id
+    yield message_id
+    with app.app_context():
+        db.session.query(OutboxMessage).filter_by(id=message_id).delete()
+        db.session.commit()
+
+
+def expire_claim(message_id):
+    from database import db
+    from models import OutboxMessage, get_eastern_time
+
+    message = db.session.get(OutboxMessage, message_id)
+    message.locked_until = get_eastern_time() - timedelta(seconds=1)
+    db.session.commit()
+
+
+def test_claim_counts_the_attempt(app, message):
+    import outbox
+    from database import db
+    from models import OutboxMessage
+
+    with app.app_context():
+        assert outbox._claim(10) == [message]
+        row = db.session.get(OutboxMessage, message)
+        assert (row.status, row.attempts) == ('sending', 1)
+
+        # Delivery doesn't count the attempt again
+        outbox._deliver(message)
+        db.session.refresh(row)
+        assert (row.status, row.attempts) == ('skipped', 1)
+
+
+def test_abandoned_claims_end_in_dead(app, message):
+    import outbox
+    from database import db
+    from models import OutboxMessage
+
+    with app.app_context():
+        # The dispatcher "dies" after every claim
+        for attempt in range(1, outbox.MAX_ATTEMPTS + 1):
+            assert outbox._claim(10) == [message]
+            assert db.session.get(OutboxMessage, message).attempts == attempt
+            expire_claim(message)
+
+        assert outbox._claim(10) == []
+        row = db.session.get(OutboxMessage, message)
+        db.session.refresh(row)
+        assert (row.status, row.attempts) == ('dead', outbox.MAX_ATTEMPTS)
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Test that keyset cursor walks return every row exactly once.
+
+Walks a member's requests page by page through keyset_page, the superadmin
+request feed and a role dashboard tab. Many rows share an updated_at value,
+so the id tie-breaker is exercised, and a row added mid-walk must not shift
+or repeat the pages after it.
+
+Run with: python -m pytest test_pagination.py   (or python test_pagination.py)
+"""
+
+import re
+import sys
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from pagination import decode_cursor, encode_cursor
+
+ROWS = 53
+
+
+@pytest.fixture(scope='module')
+def member(app):
+    """A member with ROWS pending requests whose updated_at values repeat in groups of five"""
+    import data_versions
+    from database import db
+    from models import Position, PTORequest, TeamMember
+
+    with app.app_context():
+        position = Position.query.filter_by(team='admin').first()
+        member = TeamMember(name='Paging Test Employee', email='paging.test@mswcvi.com', position_id=position.id)
+        db.session.add(member)
+        db.session.flush()
+        for i in range(ROWS):
+            day = date(2030, 1, 1) + timedelta(days=i)
+            db.session.add(PTORequest(
+                member_id=member.id, start_date=day, end_date=day, pto_type='Vacation',
+                manager_team='admin', status='pending', reason='Paging test',
+                updated_at=datetime(2030, 1, 1, 12, 0) + timedelta(minutes=i // 5),
+            ))
+        data_versions.bump_requests('admin')
+        db.session.commit()
+        return member.id
+
+
+def member_ids(app, member_id):
+    from models import PTORequest
+    with app.app_context():
+        return {r.id for r in PTORequest.query.filter_by(member_id=member_id)}
+
+
+def walk(fetch):
+    """Follow cursors from the first page to the last; returns the ids in order"""
+    seen, cursor = [], None
+    while True:
+        ids, cursor = fetch(cursor)
+        seen.extend(ids)
+        if cursor is None:
+            return seen
+
+
+def test_cursor_round_trip():
+    values = (datetime(2030, 1, 1, 12, 30, 15), 42)
+    assert decode_cursor(encode_cursor(values)) == values
+    assert decode_cursor(encode_cursor((date(2030, 1, 1), 7))) == (date(2030, 1, 1), 7)
+    with pytest.raises(ValueError):
+        decode_cursor('not a cursor')
+
+
+@pytest.mark.parametrize('descending', [True, False])
+@pytest.mark.parametrize('per_page', [1, 7, 25, 100])
+def test_keyset_walk_returns_every_row_once(app, member, descending, per_page):
+    from models import PTORequest
+    from pagination import keyset_page
+
+    def fetch(cursor):
+        with app.app_context():
+            page = keyset_page(PTORequest.query.filter_by(member_id=member), PTORequest.updated_at, PTORequest.id,
+                               cursor=cursor, per_page=per_page, descending=descending)
+            return [r.id for r in page.items], page.next_cursor
+
+    seen = walk(fetch)
+    assert len(seen) == len(set(seen)) == ROWS
+    assert set(seen) == member_ids(app, member)
+
+
+def test_walk_is_stable_when_rows_arrive(app, member):
+    from database import db
+    from models import PTORequest
+    from pagination import keyset_page
+
+    before = member_ids(app, member)
+    added = []
+
+    def fetch(cursor):
+        with app.app_context():
+            page = keyset_page(PTORequest.query.filter_by(member_id=member), PTORequest.updated_at, PTORequest.id,
+                               cursor=cursor, per_page=10)
+            if not added:
+                # Newest first, so a new row lands before the cursor and must not show up
+                new = PTORequest(member_id=member, start_date=date(2030, 6, 1), end_date=date(2030, 6, 1),
+                                 pto_type='Vacation', manager_team='admin', status='completed',
+                                 updated_at=datetime(2031, 1, 1))
+                db.session.add(new)
+                db.session.commit()
+                added.append(new.id)
+            return [r.id for r in page.items], page.next_cursor
+
+    try:
+        seen = walk(fetch)
+        assert len(seen) == len(set(seen)) == ROWS
+        assert set(seen) == before
+    finally:
+        with app.app_context():
+            db.session.delete(db.session.get(PTORequest, added[0]))
+            db.session.commit()
+
+
+@pytest.mark.parametrize('sort', ['submitted', 'start_date', 'employee', 'status'])
+def test_request_feed_walk(app, member, sort):
+    from dashboard_service import DashboardService
+
+    def fetch(cursor):
+        with app.app_context():
+            feed = DashboardService.get_request_feed(search='Paging Test Employee', sort=sort,
+                                                     cursor=cursor, per_page=10)
+            return [r.id for r in feed.items], feed.next_cursor
+
+    seen = walk(fetch)
+    assert len(seen) == len(set(seen)) == ROWS
+    assert set(seen) == member_ids(app, member)
+
+
+def test_dashboard_tab_walk(app, member, login):
+    from models import PTORequest
+
+    client = login('admin')
+
+    def fetch(cursor):
+        query = {'pending_cursor': cursor} if cursor else {}
+        html = client.get('/dashboard/admin', query_string=query).get_data(as_text=True)
+        tab = html.split('id="pending-pto"')[1].split('id="in-progress"')[0]
+        ids = [int(i) for i in re.findall(r'/approve_request/(\d+)"', tab)]
+        next_link = re.search(r'pending_cursor=([^"&]+)', tab)
+        return ids, next_link.group(1) if next_link else None
+
+    seen = walk(fetch)
+    with app.app_context():
+        expected = {r.id for r in PTORequest.query.filter_by(status='pending', manager_team='admin')}
+    assert len(seen) == len(set(seen))
+    assert set(seen) == expected
+
+    assert client.get('/dashboard/admin?pending_cursor=garbage').status_code == 302
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Test the parallel manager SMS fan-out against a local fake Twilio endpoint.
+
+Starts a fake Messages API on 127.0.0.1 that answers after a fixed delay,
+points an SMS service at it with TWILIO_API_BASE_URL, then checks that:
+- N messages take about one round trip, not N
+- connections are reused across messages (keep-alive)
+- failures and timeouts are reported per recipient
+- delivery log rows are written and a retry only re-sends the failures
+
+Run with: python -m pytest test_sms_fanout.py   (or python test_sms_fanout.py)
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+DELAY = 0.3           # Fake API latency per message
+TIMEOUT = 1.0         # Per-message timeout given to the app
+FAILING = '+15550009999'  # Fake API rejects this number
+SLOW = '+15550008888'     # Fake API answers this number after the timeout
+NUMBERS = [f'+1555000{i:04d}' for i in range(1, 9)]
+
+
+class FakeTwilio(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # Keep connections open between requests
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        to = form.get('To', [''])[0]
+        with self.server.received_lock:
+            self.server.received.append((to, self.client_address[1]))
+            count = len(self.server.received)
+
+        time.sleep(DELAY * 8 if to == SLOW else DELAY)
+        if to == FAILING:
+            status, body = 400, {'code': 21211, 'message': f"The 'To' number {to} is not valid."}
+        else:
+            status, body = 201, {'sid': f'SM{count:032d}', 'to': to, 'status': 'queued'}
+
+        payload = json.dumps(body).encode()
+        try:
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up on a SLOW answer
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def fake_twilio():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTwilio)
+    server.received = []  # (to, client port)
+    server.received_lock = threading.Lock()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+
+
+@pytest.fixture(scope='module')
+def app_and_sms(app, fake_twilio):
+    os.environ.update({
+        'TWILIO_ACCOUNT_SID': 'ACtest',
+        'TWILIO_AUTH_TOKEN': 'token',
+        'TWILIO_SMS_NUMBER': '+15550000000',
+        'TWILIO_API_BASE_URL': f'http://127.0.0.1:{fake_twilio.server_address[1]}',
+        'SMS_FANOUT_WORKERS': '8',
+        'SMS_TIMEOUT_SECONDS': str(TIMEOUT),
+    })
+
+    # A service of its own, so the settings above apply whatever ran first
+    from twilio_service import TwilioSMSService
+    return app, TwilioSMSService()
+
+
+@pytest.fixture
+def received(fake_twilio):
+    with fake_twilio.received_lock:
+        fake_twilio.received.clear()
+    return fake_twilio.received
+
+
+def test_fan_out_is_parallel(app_and_sms, received):
+    _, sms = app_and_sms
+    started = time.perf_counter()
+    results = sms.fan_out_sms(NUMBERS, 'test')
+    elapsed = time.perf_counter() - started
+
+    assert all(r['ok'] for r in results), results
+    assert elapsed < DELAY * 3, f"{elapsed:.2f}s for {len(NUMBERS)} messages (serial ~{DELAY * len(NUMBERS):.1f}s)"
+
+
+def test_connections_are_reused(app_and_sms, received):
+    _, sms = app_and_sms
+    sms.fan_out_sms(NUMBERS, 'test')
+    sms.fan_out_sms(NUMBERS, 'test again')
+
+    ports = {port for _, port in received}
+    assert len(ports) <= sms.fanout_workers, f"{len(ports)} connections for {len(received)} messages"
+
+
+def test_failures_and_timeouts_are_per_recipient(app_and_sms, received):
+    _, sms = app_and_sms
+    results = {r['to']: r for r in sms.fan_out_sms([NUMBERS[0], FAILING, SLOW], 'test')}
+
+    assert results[NUMBERS[0]]['ok']
+    assert not results[FAILING]['ok'] and 'HTTP 400' in (results[FAILING]['error'] or ''), results[FAILING]
+    assert not results[SLOW]['ok'] and results[SLOW]['duration_ms'] < TIMEOUT * 1000 * 2, results[SLOW]
+
+
+def test_delivery_log_and_retry(app_and_sms, received):
+    app, sms = app_and_sms
+    from database import db
+    from models import SMSDeliveryLog
+
+    recipients = [NUMBERS[0], NUMBERS[1], FAILING]
+    with app.app_context():
+        all_sent = sms.send_manager_notifications(recipients, 'Test Employee', 424242)
+        db.session.commit()
+        assert all_sent is False
+
+        logs = SMSDeliveryLog.query.filter_by(pto_request_id=424242).all()
+        assert sorted(l.to_number for l in logs) == sorted(recipients), [(l.to_number, l.status) for l in logs]
+
+        received.clear()
+        sms.send_manager_notifications(recipients, 'Test Employee', 424242)
+        db.session.commit()
+        assert [to for to, _ in received] == [FAILING]
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
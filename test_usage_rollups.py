@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Test that the usage rollup table stays in step with the raw rows.
+
+Drives the request and tardiness write paths through the app (create,
+approve, deny, edit, delete, call-out classification, tardiness) and checks
+after each one that usage_rollups.verify() finds nothing to fix.
+
+Run with: python -m pytest test_usage_rollups.py   (or python test_usage_rollups.py)
+"""
+
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def client(login):
+    return login('superadmin')
+
+
+@pytest.fixture(scope='module')
+def member(app):
+    from database import db
+    from models import Position, TeamMember
+
+    with app.app_context():
+        position = Position.query.filter_by(team='admin').first()
+        member = TeamMember(name='Rollup Test Employee', email='rollup.test@mswcvi.com', position_id=position.id)
+        db.session.add(member)
+        db.session.commit()
+        return member.id
+
+
+@pytest.fixture
+def assert_rollups_match(app):
+    import usage_rollups
+
+    def check():
+        with app.app_context():
+            assert usage_rollups.verify() == []
+    return check
+
+
+def add_pto(client, member_id, **fields):
+    response = client.post(f'/api/employee/{member_id}/add-pto', json=fields)
+    assert response.status_code == 200, response.get_json()
+    return response.get_json()['request_id']
+
+
+def test_create_approve_and_deny(client, member, assert_rollups_match):
+    request_id = add_pto(client, member, start_date='2025-12-29', end_date='2026-01-02',
+                         pto_type='Vacation', reason='Holidays')
+    assert_rollups_match()
+
+    client.get(f'/approve_request/{request_id}')
+    assert_rollups_match()
+
+    client.post(f'/deny_request/{request_id}', data={'denial_reason': 'Coverage'})
+    assert_rollups_match()
+
+
+def test_edit_approved_request(client, member, assert_rollups_match):
+    request_id = add_pto(client, member, start_date='2025-03-03', end_date='2025-03-04',
+                         pto_type='Vacation', reason='Trip')
+    client.get(f'/approve_request/{request_id}')
+
+    # Moves the request to another year and category
+    client.post(f'/edit_request/{request_id}', data={
+        'start_date': '2026-02-02', 'end_date': '2026-02-06', 'pto_type': 'Personal', 'reason': 'Moved',
+    })
+    assert_rollups_match()
+
+
+def test_call_out_classify_and_delete(client, member, assert_rollups_match):
+    request_id = add_pto(client, member, start_date='2025-11-03', end_date='2025-11-03',
+                         pto_type='Sick', is_call_out=True, reason='Fever')
+    assert_rollups_match()
+
+    client.post(f'/api/request/{request_id}/classify-callout', json={'classification': 'fmla'})
+    assert_rollups_match()
+
+    client.post(f'/delete_request/{request_id}')
+    assert_rollups_match()
+
+
+def test_tardiness_add_and_delete(client, member, assert_rollups_match):
+    response = client.post(f'/api/employee/{member}/tardiness', json={'date': '2025-10-01', 'minutes_late': 12})
+    assert response.status_code in (200, 201), response.get_json()
+    assert_rollups_match()
+
+    client.delete(f"/api/employee/{member}/tardiness/{response.get_json()['id']}")
+    assert_rollups_match()
+
+
+if __name__ == '__main__':
+    sys.exit(pytest.main([__file__, '-v']))
@@ -5,11 +5,15 @@ Handles SMS text messages for employee call-out reporting
 
 import os
 import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
-from twilio.rest import Client
-from twilio.twiml.messaging_response import MessagingResponse
-from models import TeamMember, PTORequest, CallOutRecord, get_eastern_time
+from models import TeamMember, PTORequest, CallOutRecord, SMSRecipient, SMSDeliveryLog, get_eastern_time, phone_to_e164
 from database import db
+import data_versions
+import usage_rollups
+import outbox
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -29,25 +33,71 @@ class TwilioSMSService:
         self.conversation_sid = os.getenv('GROUP_MMS_CONVERSATION_SID')
         self.group_participants = [p.strip() for p in os.getenv('GROUP_MMS_PARTICIPANTS', '').split(',') if p.strip()]
 
-        # Initialize Twilio client if credentials are available
-        if self.account_sid and self.auth_token:
-            self.client = Client(self.account_sid, self.auth_token)
-        else:
-            self.client = None
+        # Manager SMS fan-out: messages are POSTed straight to the REST API in parallel
+        # over one keep-alive session (TWILIO_API_BASE_URL points it at a test double)
+        self.api_base_url = os.getenv('TWILIO_API_BASE_URL', 'https://api.twilio.com').rstrip('/')
+        self.fanout_workers = int(os.getenv('SMS_FANOUT_WORKERS', '8'))
+        self.sms_timeout = float(os.getenv('SMS_TIMEOUT_SECONDS', '10'))
+
+        # Twilio client, HTTP session and fan-out pool, created on first use
+        self._client = None
+        self._http_session = None
+        self._fanout_pool = None
+        self._lazy_lock = threading.Lock()
+        if not self.configured:
             logger.warning("Twilio credentials not configured. SMS will not work.")
 
+    @property
+    def configured(self):
+        return bool(self.account_sid and self.auth_token)
+
+    @property
+    def client(self):
+        """Twilio REST client, or None without credentials. twilio.rest is imported
+        on first use so app startup (and the public pages) don't pay for it."""
+        if self._client is None and self.account_sid and self.auth_token:
+            from twilio.rest import Client
+            self._client = Client(self.account_sid, self.auth_token)
+        return self._client
+
+    @property
+    def http_session(self):
+        """Shared requests session for the REST API: pooled keep-alive connections,
+        sized for the fan-out pool and authenticated with the account credentials"""
+        if self._http_session is None:
+            with self._lazy_lock:
+                if self._http_session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    session.auth = (self.account_sid, self.auth_token)
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.fanout_workers)
+                    session.mount('https://', adapter)
+                    session.mount('http://', adapter)
+                    self._http_session = session
+        return self._http_session
+
+    @property
+    def fanout_pool(self):
+        """Bounded thread pool shared by every fan-out in this process"""
+        if self._fanout_pool is None:
+            with self._lazy_lock:
+                if self._fanout_pool is None:
+                    self._fanout_pool = ThreadPoolExecutor(
+                        max_workers=self.fanout_workers, thread_name_prefix='sms-fanout'
+                    )
+        return self._fanout_pool
+
     def authenticate_sender(self, from_number):
         """
         Authenticate SMS sender by phone number match
         Returns: (authenticated, member) tuple
         """
-        # Normalize phone number
-        normalized_number = from_number.replace('+1', '').replace(' ', '').replace('-', '').replace('(', '').replace(')', '')
+        # Normalize to E.164 so the lookup can use the phone_e164 index
+        e164 = phone_to_e164(from_number)
 
-        # Try phone number match
-        member = TeamMember.query.filter(
-            db.func.replace(db.func.replace(db.func.replace(TeamMember.phone, '-', ''), ' ', ''), '+1', '') == normalized_number
-        ).first()
+        member = TeamMember.query.filter_by(phone_e164=e164).first() if e164 else None
 
         if member:
             logger.info(f"Authenticated SMS from {member.name}: {from_number}")
@@ -83,6 +133,8 @@ class TwilioSMSService:
 
     def generate_sms_response(self, authenticated, member=None, request_id=None):
         """Generate TwiML response for SMS"""
+        from twilio.twiml.messaging_response import MessagingResponse
+
         response = MessagingResponse()
 
         if authenticated and member and request_id:
@@ -109,7 +161,6 @@ class TwilioSMSService:
         try:
             # Get today's date in Eastern time
             today = get_eastern_time().date()
-            today_str = today.strftime('%Y-%m-%d')
 
             # Extract reason from SMS
             reason = self.extract_reason(message_body)
@@ -122,8 +173,8 @@ class TwilioSMSService:
             # Auto-approve call-outs (no manager approval needed)
             pto_request = PTORequest(
                 member_id=member.id,
-                start_date=today_str,
-                end_date=today_str,
+                start_date=today,
+                end_date=today,
                 pto_type='Sick',
                 manager_team=member.team,
                 status='approved',  # Auto-approve call-outs
@@ -135,6 +186,7 @@ class TwilioSMSService:
 
             db.session.add(pto_request)
             db.session.flush()  # Get the PTO request ID
+            usage_rollups.apply_request(pto_request)
 
             # Deduct from sick balance immediately
             hours_to_deduct = pto_request.duration_hours
@@ -159,6 +211,8 @@ class TwilioSMSService:
             )
 
             db.session.add(call_out_record)
+            data_versions.bump_requests(pto_request.manager_team)
+            self.queue_call_out_notifications(pto_request, member, from_number)
             db.session.commit()
 
             logger.info(f"Created and auto-approved SMS call-out request #{pto_request.id} for {member.name}")
@@ -169,6 +223,33 @@ class TwilioSMSService:
             logger.error(f"Failed to create SMS call-out request: {str(e)}")
             raise
 
+    def manager_recipients(self, member):
+        """Active SMS recipients for the member's team"""
+        manager_team = member.position.team if member.position else None
+        if manager_team not in ('admin', 'clinical'):
+            return []
+        return SMSRecipient.query.filter(
+            SMSRecipient.active == True,
+            SMSRecipient.team.in_([manager_team, 'both'])
+        ).all()
+
+    def queue_call_out_notifications(self, pto_request, member, from_number):
+        """Queue the manager email, the employee's confirmation SMS and the manager SMS
+        fan-out in the current transaction (sent by the outbox dispatcher)"""
+        outbox.enqueue('submission_email', request_id=pto_request.id)
+        outbox.enqueue('employee_sms', to=from_number, employee_name=member.name, request_id=pto_request.id)
+
+        recipients = self.manager_recipients(member)
+        logger.info(f"Manager recipients: {[r.phone for r in recipients]}")
+        if recipients:
+            # One message for all managers, sent in parallel (see send_manager_notifications)
+            outbox.enqueue(
+                'manager_sms_fanout',
+                recipients=[r.phone for r in recipients],
+                employee_name=member.name,
+                request_id=pto_request.id,
+            )
+
     def send_employee_confirmation_sms(self, to_number, employee_name, request_id):
         """Send SMS confirmation to employee"""
         if not self.client or not to_number:
@@ -188,6 +269,9 @@ class TwilioSMSService:
             logger.error(f"Failed to send employee confirmation SMS: {str(e)}")
             return False
 
+    def manager_notification_body(self, employee_name):
+        return f"FYI: {employee_name} called out sick today. AUTO-APPROVED. Sick time deducted. Check email for details."
+
     def send_manager_notification_sms(self, manager_number, employee_name, request_id):
         """
         Send SMS notification to manager (DEPRECATED - use send_group_mms_notification instead)
@@ -198,7 +282,7 @@ class TwilioSMSService:
 
         try:
             message = self.client.messages.create(
-                body=f"FYI: {employee_name} called out sick today. AUTO-APPROVED. Sick time deducted. Check email for details.",
+                body=self.manager_notification_body(employee_name),
                 from_=self.sms_number,
                 to=manager_number
             )
@@ -208,6 +292,89 @@ class TwilioSMSService:
             logger.error(f"Failed to send manager SMS: {str(e)}")
             return False
 
+    def send_sms_message(self, to_number, body):
+        """
+        POST one SMS to the Messages API over the shared session.
+        Never raises: returns a result dict with to, ok, sid, error and duration_ms.
+        """
+        started = time.perf_counter()
+        result = {'to': to_number, 'ok': False, 'sid': None, 'error': None}
+        try:
+            response = self.http_session.post(
+                f"{self.api_base_url}/2010-04-01/Accounts/{self.account_sid}/Messages.json",
+                data={'To': to_number, 'From': self.sms_number, 'Body': body},
+                timeout=self.sms_timeout,
+            )
+            if response.status_code < 300:
+                # Accepted by Twilio; an unreadable body only means the SID is unknown
+                result['ok'] = True
+                try:
+                    result['sid'] = response.json().get('sid')
+                except (ValueError, AttributeError) as e:
+                    logger.warning(f"SMS to {to_number} sent but the response had no readable SID: {e}")
+            else:
+                result['error'] = f"HTTP {response.status_code}: {response.text[:200]}"
+        except Exception as e:
+            result['error'] = f"{type(e).__name__}: {e}"
+        result['duration_ms'] = int((time.perf_counter() - started) * 1000)
+        return result
+
+    def fan_out_sms(self, numbers, body):
+        """
+        Send the same SMS to every number in parallel on the fan-out pool, so N
+        messages take about as long as the slowest one rather than the sum.
+        Returns one result dict per number (see send_sms_message), in order.
+        """
+        numbers = [n for n in dict.fromkeys(numbers) if n]
+        if not numbers:
+            return []
+        if not self.configured:
+            return [{'to': n, 'ok': False, 'sid': None, 'error': 'Twilio is not configured', 'duration_ms': 0}
+                    for n in numbers]
+
+        started = time.perf_counter()
+        futures = [self.fanout_pool.submit(self.send_sms_message, number, body) for number in numbers]
+        results = [future.result() for future in futures]
+        sent = sum(1 for r in results if r['ok'])
+        logger.info(
+            f"SMS fan-out: {sent}/{len(results)} sent in "
+            f"{int((time.perf_counter() - started) * 1000)} ms"
+        )
+        return results
+
+    def send_manager_notifications(self, numbers, employee_name, request_id):
+        """
+        Notify managers of a call-out in parallel and record one SMSDeliveryLog row per
+        recipient in the current transaction (the caller commits). Numbers that already
+        have a successful delivery for this request are skipped, so a retry only
+        re-sends the failures. Returns True when every recipient has been reached.
+        """
+        delivered = {
+            row.to_number for row in SMSDeliveryLog.query.filter_by(
+                pto_request_id=request_id,
+                purpose=SMSDeliveryLog.MANAGER_CALLOUT,
+                status='sent',
+            )
+        }
+        pending = [n for n in numbers if n not in delivered]
+        results = self.fan_out_sms(pending, self.manager_notification_body(employee_name))
+
+        now = get_eastern_time()
+        for result in results:
+            db.session.add(SMSDeliveryLog(
+                pto_request_id=request_id,
+                purpose=SMSDeliveryLog.MANAGER_CALLOUT,
+                to_number=result['to'],
+                status='sent' if result['ok'] else 'failed',
+                message_sid=result['sid'],
+                error=result['error'],
+                duration_ms=result['duration_ms'],
+                created_at=now,
+            ))
+            if not result['ok']:
+                logger.error(f"Failed to send manager SMS to {result['to']}: {result['error']}")
+        return all(result['ok'] for result in results)
+
     def create_group_conversation(self, friendly_name="Manager Call-Out Notifications"):
         """
         One-time setup: Create a Twilio Conversation and add all manager participants.
@@ -278,12 +445,9 @@ class TwilioSMSService:
 
         if not self.conversation_sid:
             logger.warning("GROUP_MMS_CONVERSATION_SID not configured. Falling back to individual SMS.")
-            # Fallback: send individual SMS to each participant
-            success = False
-            for phone in self.group_participants:
-                if self.send_manager_notification_sms(phone, employee_name, request_id):
-                    success = True
-            return success
+            # Fallback: send individual SMS to each participant, in parallel
+            results = self.fan_out_sms(self.group_participants, self.manager_notification_body(employee_name))
+            return any(result['ok'] for result in results)
 
         try:
             # Build the notification message
@@ -312,8 +476,5 @@ class TwilioSMSService:
             logger.error(f"Failed to send group MMS notification: {str(e)}")
             # Fallback to individual SMS
             logger.info("Falling back to individual SMS notifications...")
-            success = False
-            for phone in self.group_participants:
-                if self.send_manager_notification_sms(phone, employee_name, request_id):
-                    success = True
-            return success
+            results = self.fan_out_sms(self.group_participants, self.manager_notification_body(employee_name))
+            return any(result['ok'] for result in results)
@@ -6,6 +6,8 @@ Run once with: python update_clinical_employees.py
 
 from app import app, db
 from models import TeamMember, Position, PTORequest
+import data_versions
+import usage_rollups
 
 # New clinical employees data
 NEW_EMPLOYEES = [
@@ -58,6 +60,7 @@ def update_clinical_employees():
         for emp in existing_clinical:
             # Delete their PTO requests first
             pto_count = PTORequest.query.filter_by(member_id=emp.id).delete()
+            usage_rollups.clear_member(emp.id)
             print(f"  - Deleting {emp.name} (removed {pto_count} PTO requests)")
             db.session.delete(emp)
 
@@ -95,6 +98,8 @@ def update_clinical_employees():
             db.session.add(new_emp)
             print(f"  + Added: {emp_data['name']} ({emp_data['position']})")
 
+        # Invalidate cached dashboards and API responses in running workers
+        data_versions.bump(data_versions.MEMBERS, *data_versions.ALL_REQUESTS)
         db.session.commit()
 
         # Verify
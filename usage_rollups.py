@@ -0,0 +1,196 @@
+"""
+Usage rollups
+Per-employee totals by year and category (PTO types, call-outs split into
+sick and FMLA, tardiness) stored in the usage_rollups table, so pages and
+reports read a few rows instead of re-summing every request.
+
+Writers keep the table in step in the same transaction as their change:
+call retract_request(req) before changing a request's status, dates, type
+or classification (or deleting it) and apply_request(req) after; likewise
+apply_tardiness/retract_tardiness for tardiness records. A request counts
+once it is charged against a balance (approved, in_progress or completed)
+and is booked to the year it starts in.
+
+rebuild_usage_rollups.py regenerates the table from the raw rows and checks
+it against them.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+
+from database import db
+from models import PTORequest, TardinessRecord, UsageRollup, get_eastern_time
+
+# Statuses that have been charged against a balance
+USED_STATUSES = ('approved', 'in_progress', 'completed')
+
+TARDINESS = 'tardiness'
+CALLOUT_SICK = 'callout_sick'
+CALLOUT_FMLA = 'callout_fmla'
+
+
+def request_category(req):
+    """Rollup category for a request: call-outs by classification, otherwise its PTO type"""
+    if req.is_call_out:
+        return CALLOUT_FMLA if req.callout_classification == 'fmla' else CALLOUT_SICK
+    return (req.pto_type or 'other').strip().lower().replace(' ', '_')
+
+
+def _request_totals(req):
+    """(key, count, days, hours, minutes) a request adds to the rollups, or None if it doesn't count"""
+    if req.status not in USED_STATUSES or req.member_id is None or req.start_date is None:
+        return None
+    key = (req.member_id, req.start_date.year, request_category(req))
+    return key, 1, req.duration_days, Decimal(str(round(req.duration_hours, 2))), 0
+
+
+def _tardiness_totals(record):
+    if record.member_id is None or record.date is None:
+        return None
+    key = (record.member_id, record.date.year, TARDINESS)
+    return key, 1, 0, Decimal('0'), record.minutes_late or 0
+
+
+def _adjust(totals, sign):
+    """Add (sign=1) or subtract (sign=-1) one row's totals in the current transaction"""
+    if totals is None:
+        return
+    (member_id, year, category), count, days, hours, minutes = totals
+    values = dict(
+        count=UsageRollup.count + sign * count,
+        days=UsageRollup.days + sign * days,
+        hours=UsageRollup.hours + sign * hours,
+        minutes=UsageRollup.minutes + sign * minutes,
+        updated_at=get_eastern_time(),
+    )
+    where = (
+        (UsageRollup.member_id == member_id)
+        & (UsageRollup.year == year)
+        & (UsageRollup.category == category)
+    )
+    if db.session.execute(update(UsageRollup).where(where).values(**values)).rowcount:
+        return
+    try:
+        with db.session.begin_nested():
+            db.session.add(UsageRollup(
+                member_id=member_id, year=year, category=category,
+                count=sign * count, days=sign * days, hours=sign * hours, minutes=sign * minutes,
+                updated_at=get_eastern_time(),
+            ))
+    except IntegrityError:
+        # Another worker created the row first; add onto it
+        db.session.execute(update(UsageRollup).where(where).values(**values))
+
+
+def apply_request(req):
+    """Count a request in the rollups as it is now"""
+    _adjust(_request_totals(req), 1)
+
+
+def retract_request(req):
+    """Remove a request's current contribution, before it is changed or deleted"""
+    _adjust(_request_totals(req), -1)
+
+
+def apply_tardiness(record):
+    _adjust(_tardiness_totals(record), 1)
+
+
+def retract_tardiness(record):
+    _adjust(_tardiness_totals(record), -1)
+
+
+def clear_member(member_id):
+    """Drop a member's rollups, for when the member and their history are deleted"""
+    db.session.execute(delete(UsageRollup).where(UsageRollup.member_id == member_id))
+
+
+def compute_rollups():
+    """Rollup totals recomputed from the raw requests and tardiness records:
+    {(member_id, year, category): (count, days, hours, minutes)}"""
+    totals = defaultdict(lambda: [0, 0, Decimal('0'), 0])
+
+    def add(row_totals):
+        if row_totals is None:
+            return
+        key, count, days, hours, minutes = row_totals
+        entry = totals[key]
+        entry[0] += count
+        entry[1] += days
+        entry[2] += hours
+        entry[3] += minutes
+
+    requests = PTORequest.query.filter(PTORequest.status.in_(USED_STATUSES)).all()
+    PTORequest.prime_durations(requests)
+    for req in requests:
+        add(_request_totals(req))
+    for record in TardinessRecord.query.all():
+        add(_tardiness_totals(record))
+
+    return {key: tuple(entry) for key, entry in totals.items()}
+
+
+def stored_rollups():
+    """The usage_rollups table in the same shape as compute_rollups(), without empty rows"""
+    return {
+        (r.member_id, r.year, r.category): (r.count, r.days, Decimal(str(r.hours or 0)), r.minutes)
+        for r in UsageRollup.query.all()
+        if r.count or r.days or r.hours or r.minutes
+    }
+
+
+def rebuild():
+    """Replace the table's contents with totals recomputed from the raw rows; the caller commits.
+    Returns the number of rows written."""
+    totals = compute_rollups()
+    db.session.execute(delete(UsageRollup))
+    now = get_eastern_time()
+    db.session.add_all(
+        UsageRollup(member_id=member_id, year=year, category=category,
+                    count=count, days=days, hours=hours, minutes=minutes, updated_at=now)
+        for (member_id, year, category), (count, days, hours, minutes) in totals.items()
+    )
+    return len(totals)
+
+
+def verify():
+    """Compare the table with the raw rows. Returns a list of
+    (key, stored totals, expected totals) for every row that differs."""
+    expected = compute_rollups()
+    stored = stored_rollups()
+    return [
+        (key, stored.get(key), expected.get(key))
+        for key in sorted(set(expected) | set(stored))
+        if stored.get(key) != expected.get(key)
+    ]
+
+
+def get_usage_by_year(member_id):
+    """A member's usage per year, newest first: days of PTO (every non-sick type), sick,
+    sick call-outs and FMLA call-outs, plus tardiness incidents and minutes"""
+    rows = UsageRollup.query.filter(
+        UsageRollup.member_id == member_id,
+        UsageRollup.count != 0,
+    ).order_by(UsageRollup.year.desc()).all()
+
+    years = {}
+    for row in rows:
+        year = years.setdefault(row.year, {
+            'year': row.year, 'pto_days': 0, 'sick_days': 0, 'callout_days': 0,
+            'fmla_days': 0, 'tardiness_count': 0, 'tardiness_minutes': 0,
+        })
+        if row.category == TARDINESS:
+            year['tardiness_count'] += row.count
+            year['tardiness_minutes'] += row.minutes
+        elif row.category == CALLOUT_FMLA:
+            year['fmla_days'] += row.days
+        elif row.category == CALLOUT_SICK:
+            year['callout_days'] += row.days
+        elif row.category == 'sick':
+            year['sick_days'] += row.days
+        else:
+            year['pto_days'] += row.days
+    return list(years.values())